@@ -1,26 +1,67 @@
+from config import Config
+from services.startup import startup_profile
+
+# With STARTUP_PROFILE on, time every import below and each create_app() phase
+if Config.STARTUP_PROFILE:
+    startup_profile.enable()
+
 from flask import Flask, render_template, jsonify
 from flask_cors import CORS
-from config import Config
 from models.db import db
 import os
 
 # Import routers
-from routers import contracts, verify, explain, dashboard, sign, auth, chat
+from routers import contracts, verify, explain, dashboard, sign, auth, chat, metrics
 
 def create_app():
     """Factory function to create Flask app"""
-    app = Flask(__name__)
-    app.config.from_object(Config)
+    startup_profile.phases.clear()
+    with startup_profile.phase('config'):
+        app = Flask(__name__)
+        app.config.from_object(Config)
     
     # Initialize extensions
-    db.init_app(app)
-    CORS(app)
-    
-    # Initialize JWT
-    from flask_jwt_extended import JWTManager
-    jwt = JWTManager(app)
+    with startup_profile.phase('extensions'):
+        db.init_app(app)
+        CORS(app)
+        
+        # Initialize JWT
+        from flask_jwt_extended import JWTManager
+        jwt = JWTManager(app)
     
     # Register blueprints
+    with startup_profile.phase('blueprints'):
+        register_blueprints(app)
+    
+    # Create directories if they don't exist
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
+    os.makedirs(app.config['VECTOR_DB_PATH'], exist_ok=True)
+    
+    register_pages(app)
+    
+    # Create database tables
+    with startup_profile.phase('database'):
+        with app.app_context():
+            db.create_all()
+    
+    # Warm the shared retrieval service so the first request doesn't pay for model load
+    if app.config.get('WARMUP_RETRIEVAL'):
+        with startup_profile.phase('retrieval warmup'):
+            try:
+                from services.retrieval import warmup_retrieval
+                warmup_retrieval()
+            except ImportError as e:
+                print(f"Retrieval warmup skipped: {e}")
+    
+    if startup_profile.enabled:
+        startup_profile.stop_import_timing()
+        startup_profile.print_report()
+    
+    return app
+
+def register_blueprints(app):
+    """Mount the API routers"""
     app.register_blueprint(auth.bp, url_prefix='/api/auth')
     app.register_blueprint(contracts.bp, url_prefix='/api/contracts')
     app.register_blueprint(verify.bp, url_prefix='/api/verify')
@@ -28,13 +69,10 @@ def create_app():
     app.register_blueprint(dashboard.bp, url_prefix='/api/dashboard')
     app.register_blueprint(sign.bp, url_prefix='/api/sign')
     app.register_blueprint(chat.bp, url_prefix='/api/chat')
-    
-    # Create directories if they don't exist
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    os.makedirs(app.config['EXPORT_FOLDER'], exist_ok=True)
-    os.makedirs(app.config['VECTOR_DB_PATH'], exist_ok=True)
-    
-    # Routes
+    app.register_blueprint(metrics.bp, url_prefix='/api/metrics')
+
+def register_pages(app):
+    """Page routes and JSON error handlers"""
     @app.route('/')
     def index():
         return render_template('index.html')
@@ -66,12 +104,6 @@ def create_app():
     @app.errorhandler(500)
     def internal_error(error):
         return jsonify({'error': 'Internal server error'}), 500
-    
-    # Create database tables
-    with app.app_context():
-        db.create_all()
-    
-    return app
 
 if __name__ == '__main__':
     app = create_app()
@@ -21,13 +21,62 @@ class Config:
     UPLOAD_FOLDER = BASE_DIR / 'data' / 'uploads'
     EXPORT_FOLDER = BASE_DIR / 'data' / 'exports'
     MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', '10485760'))  # 10MB
+    # Render contract PDF/DOCX in a background thread right after generation instead of on first download
+    EXPORT_PRERENDER = os.getenv('EXPORT_PRERENDER', 'False').lower() == 'true'
     
     # Vector Database
     VECTOR_DB_PATH = BASE_DIR / os.getenv('VECTOR_DB_PATH', 'data/vector_store')
+    VECTOR_BACKEND = os.getenv('VECTOR_BACKEND', 'chroma')  # chroma or numpy (memory-mapped, brute force)
+    VECTOR_QUANTIZE = os.getenv('VECTOR_QUANTIZE', '')  # numpy backend only: '' (float32) or int8
+    # Metadata fields the index is split on, e.g. 'jurisdiction' or 'jurisdiction,act_name'; '' (default) for one index
+    VECTOR_PARTITION_BY = [f.strip() for f in os.getenv('VECTOR_PARTITION_BY', '').split(',') if f.strip()]
     EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+    EMBEDDING_ARTIFACT_PATH = BASE_DIR / os.getenv('EMBEDDING_ARTIFACT_PATH', 'data/embeddings')  # precomputed section embeddings
+    EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', '64'))
+    # Unix socket of a shared embedding server (scripts/embedding_server.py); '' encodes in-process
+    EMBEDDING_SERVER_SOCKET = os.getenv('EMBEDDING_SERVER_SOCKET', '')
+    EMBEDDING_SERVER_TIMEOUT = float(os.getenv('EMBEDDING_SERVER_TIMEOUT', '5'))  # seconds
+    EMBEDDING_SERVER_MAX_WAIT_MS = float(os.getenv('EMBEDDING_SERVER_MAX_WAIT_MS', '5'))  # micro-batch window
+    INDEX_CHUNK_SIZE = int(os.getenv('INDEX_CHUNK_SIZE', '512'))  # sections embedded/written per chunk
+    # Long sections are indexed as passages of PASSAGE_WINDOW words (0, the default, disables chunking)
+    PASSAGE_WINDOW = int(os.getenv('PASSAGE_WINDOW', '0'))
+    PASSAGE_OVERLAP = int(os.getenv('PASSAGE_OVERLAP', '50'))  # words shared by consecutive passages
+    RETRIEVAL_MODE = os.getenv('RETRIEVAL_MODE', 'dense')  # dense, lexical or hybrid
+    HYBRID_ALPHA = float(os.getenv('HYBRID_ALPHA', '0.5'))  # weight of dense scores in hybrid mode
+    EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', '4096'))  # cached query embeddings
+    SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', '1024'))  # cached search results
+    SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', '600'))  # seconds
+    # LLM answers reused for near-identical questions (cosine >= threshold, same jurisdiction)
+    ANSWER_CACHE_SIZE = int(os.getenv('ANSWER_CACHE_SIZE', '1024'))  # 0 disables the cache
+    ANSWER_CACHE_TTL = int(os.getenv('ANSWER_CACHE_TTL', '86400'))  # seconds
+    ANSWER_CACHE_THRESHOLD = float(os.getenv('ANSWER_CACHE_THRESHOLD', '0.95'))
+    # Print per-module import times and create_app() phase timings at startup
+    STARTUP_PROFILE = os.getenv('STARTUP_PROFILE', 'False').lower() == 'true'
+    # Load the shared retrieval service (embedding model + index) in create_app()
+    WARMUP_RETRIEVAL = os.getenv('WARMUP_RETRIEVAL', 'False').lower() == 'true'
     
     # OpenAI
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY', '')
+    LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', '10'))  # keep-alive HTTP connections per process
+    LLM_KEEPALIVE_SECONDS = float(os.getenv('LLM_KEEPALIVE_SECONDS', '60'))  # idle time before a connection is closed
+    # Every LLM call goes through the gateway in services/llm.py
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))  # calls in flight per process
+    LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', '5'))  # seconds to wait for a free slot
+    LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '30'))  # default deadline per call, retries included
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))  # retries after a 429, 5xx or connection error
+    LLM_RETRY_BACKOFF = float(os.getenv('LLM_RETRY_BACKOFF', '0.5'))  # base of the jittered exponential backoff
+    LLM_BREAKER_THRESHOLD = int(os.getenv('LLM_BREAKER_THRESHOLD', '5'))  # consecutive failures that open the circuit
+    LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', '30'))  # seconds before a trial call is let through
+    EXPLAIN_TIMEOUT = float(os.getenv('EXPLAIN_TIMEOUT', '10'))  # clause explanations fall back rather than hang
+    # Polished contract text keyed by model, prompt and rendered markdown; '' disables the cache
+    POLISH_CACHE_PATH = os.getenv('POLISH_CACHE_PATH', str(BASE_DIR / 'data' / 'cache' / 'polish.sqlite3'))
+    POLISH_CACHE_MAX_MB = float(os.getenv('POLISH_CACHE_MAX_MB', '64'))
+    POLISH_WORKERS = int(os.getenv('POLISH_WORKERS', '4'))  # contract sections polished concurrently per process
+    POLISH_TIMEOUT = float(os.getenv('POLISH_TIMEOUT', '30'))  # seconds per draft; sections not polished by then stay as they are
+    # Server-side chat sessions: recent turns sent verbatim, older ones folded into a running summary
+    CHAT_HISTORY_TOKEN_BUDGET = int(os.getenv('CHAT_HISTORY_TOKEN_BUDGET', '3000'))
+    CHAT_SUMMARY_MAX_TOKENS = int(os.getenv('CHAT_SUMMARY_MAX_TOKENS', '300'))
+    CHAT_SUMMARY_TIMEOUT = float(os.getenv('CHAT_SUMMARY_TIMEOUT', '20'))  # seconds allowed to fold old turns
     
     # Jurisdiction
     DEFAULT_JURISDICTION = os.getenv('DEFAULT_JURISDICTION', 'IN')
@@ -49,5 +98,6 @@ class Config:
     # Paths
     LAWS_DATA_PATH = BASE_DIR / 'data' / 'laws'
     TEMPLATES_DATA_PATH = BASE_DIR / 'data' / 'templates'
+    TEMPLATE_CACHE_PATH = os.getenv('TEMPLATE_CACHE_PATH', '')  # compiled template bytecode; '' uses the temp dir
 
 
@@ -0,0 +1,30 @@
+"""Gunicorn settings: gunicorn -c gunicorn.conf.py
+
+The app is loaded and warmed up once in the master process and then forked, so the
+workers share the embedding model, compiled templates (and, with the numpy vector
+backend, the index) copy-on-write.
+"""
+
+import os
+
+# Retrieval warmup is left to warmup() below, which never opens Chroma's SQLite store in
+# the master: its connections must not be inherited by forked workers
+os.environ['WARMUP_RETRIEVAL'] = 'False'
+
+wsgi_app = 'app:create_app()'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+preload_app = True
+
+
+def when_ready(server):
+    """Runs in the master after the app is loaded, before any worker is forked"""
+    from services.startup import warmup
+    warmup(server.app.wsgi())
+
+
+def post_fork(server, worker):
+    """Drop database connections inherited from the master without closing them"""
+    from models.db import db
+    with worker.app.wsgi().app_context():
+        db.engine.dispose(close=False)
@@ -101,4 +101,29 @@ class AuditEvent(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     metadata_json = db.Column(db.Text)  # Additional context as JSON
 
+class Conversation(db.Model):
+    """Server-side chat session: turns, running summary and token totals"""
+    __tablename__ = 'conversations'
+    
+    id = db.Column(db.String(32), primary_key=True)  # random hex, so sessions can't be guessed
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    summary = db.Column(db.Text, default='')  # running summary of turns that left the prompt window
+    summarized_turns = db.Column(db.Integer, default=0)  # leading turns already folded into the summary
+    prompt_tokens = db.Column(db.Integer, default=0)  # totals reported by the API for this session
+    completion_tokens = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    turns = db.relationship('ConversationTurn', backref='conversation', lazy=True,
+                            order_by='ConversationTurn.id', cascade='all, delete-orphan')
 
+class ConversationTurn(db.Model):
+    """One user or assistant message in a conversation"""
+    __tablename__ = 'conversation_turns'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    conversation_id = db.Column(db.String(32), db.ForeignKey('conversations.id'), nullable=False, index=True)
+    role = db.Column(db.String(20))  # user, assistant
+    content = db.Column(db.Text)
+    tokens = db.Column(db.Integer, default=0)  # estimated prompt tokens of this message
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
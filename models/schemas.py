@@ -18,7 +18,7 @@ class UserResponse(BaseModel):
 
 # Contract Schemas
 class ContractGenerateRequest(BaseModel):
-    contract_type: str  # NDA, Employment, Service, etc.
+    contract_type: str = Field(..., min_length=1)  # NDA, Employment, Service, etc.
     parties: List[str] = []
     terms: Dict[str, Any] = {}
     language: str = "en"
@@ -60,6 +60,11 @@ class ExplainResponse(BaseModel):
     explanation: str
     refs: List[str] = []
 
+class ExplainBatchRequest(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=50)
+    jurisdiction: str = "IN"
+    limit: int = Field(3, ge=1, le=20)
+
 # Compliance Schemas
 class ComplianceCheck(BaseModel):
     category: str  # GST, TDS, Companies Act, etc.
@@ -1,36 +1,107 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from config import Config
+from services.answer_cache import get_answer_cache
+from services.conversations import get_conversation_store
+from services.llm import LLMUnavailable, get_llm_client, get_llm_gateway
+from services.streaming import SSE_HEADERS, STREAM_USAGE_BODY, CompletionStream, TextStream, sse_event
 import json
 
 bp = Blueprint('chat', __name__)
 
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    OpenAI = None
+CHAT_MODEL = "gpt-4o-mini"  # Using gpt-4o-mini for better performance and cost
+SYSTEM_PROMPT = """You are LawBot 360, an AI-powered legal assistant specializing in Indian laws. 
+You provide educational information about legal matters, rights, and procedures related to Indian law.
+You are helpful, clear, and always remind users that you provide educational information only, not legal advice.
+Always recommend consulting a qualified lawyer for specific legal matters.
+Keep responses conversational, clear, and easy to understand."""
 
-def get_openai_client():
-    """Get or create OpenAI client"""
-    if not OPENAI_AVAILABLE:
-        return None
+def build_conversation(data):
+    """System prompt, the client's history and the new user message as chat messages"""
+    conversation_messages = [{"role": "system", "content": SYSTEM_PROMPT}]
     
-    api_key = Config.OPENAI_API_KEY
-    if not api_key:
+    # Add conversation history
+    for msg in data.get('messages', []):
+        if msg.get('role') == 'user':
+            conversation_messages.append({"role": "user", "content": msg.get('content', '')})
+        elif msg.get('role') == 'assistant':
+            conversation_messages.append({"role": "assistant", "content": msg.get('content', '')})
+    
+    # Add current user message
+    user_message = data.get('message', '')
+    if user_message:
+        conversation_messages.append({"role": "user", "content": user_message})
+    return conversation_messages
+
+def request_user_id():
+    """Caller's user id from the X-User-Id header, or None"""
+    user_id = request.headers.get('X-User-Id')
+    return int(user_id) if user_id and user_id.isdigit() else None
+
+def find_conversation(conversation_id):
+    """The caller's conversation with this id; another user's is treated as missing"""
+    conversation = get_conversation_store().get(conversation_id)
+    if conversation is None or conversation.user_id != request_user_id():
         return None
+    return conversation
+
+def prepare_turn(data):
+    """Chat messages for this turn, plus the server-side conversation and user turn if any.
     
-    try:
-        return OpenAI(api_key=api_key)
-    except Exception as e:
-        print(f"OpenAI client initialization failed: {e}")
+    With a `conversation_id` the history comes from the store (bounded by the token
+    budget) and any client-sent `messages` are ignored.
+    """
+    conversation_id = data.get('conversation_id')
+    if not conversation_id:
+        return build_conversation(data), None, None
+    
+    store = get_conversation_store()
+    conversation = find_conversation(conversation_id)
+    if conversation is None:
+        raise LookupError('Conversation not found')
+    if not data.get('message'):
+        raise ValueError('message required')
+    turn = store.add_turn(conversation, 'user', data['message'])
+    return store.build_messages(conversation, SYSTEM_PROMPT), conversation, turn
+
+def finish_turn(conversation, user_turn, reply, usage):
+    """Store the assistant's reply and token usage; returns the session's token counts"""
+    if conversation is None:
         return None
+    store = get_conversation_store()
+    if reply is None:
+        # The call failed: drop the unanswered message so the history stays paired
+        store.remove_turn(user_turn)
+    else:
+        store.add_turn(conversation, 'assistant', reply)
+        store.record_usage(conversation, usage)
+    return store.stats(conversation)
+
+def answer_cache_for(data, conversation):
+    """The semantic answer cache if this question stands alone; follow-ups depend on their history"""
+    if conversation is not None:
+        standalone = len(conversation.turns) == 1
+    else:
+        standalone = not data.get('messages')
+    return get_answer_cache() if standalone and data.get('message') else None
+
+def friendly_error(e):
+    """Map OpenAI errors to a message the user can act on"""
+    error_msg = str(e)
+    if isinstance(e, LLMUnavailable):
+        error_msg = 'The assistant is busy or unavailable right now. Please try again in a few seconds.'
+    elif 'api_key' in error_msg.lower() or 'authentication' in error_msg.lower():
+        error_msg = 'OpenAI API key is invalid or missing. Please check your configuration.'
+    elif 'rate limit' in error_msg.lower():
+        error_msg = 'OpenAI API rate limit exceeded. Please try again later.'
+    elif 'insufficient_quota' in error_msg.lower():
+        error_msg = 'OpenAI API quota exceeded. Please check your OpenAI account billing.'
+    return error_msg
 
 @bp.route('/', methods=['POST'])
 def chat():
     """Chat endpoint that works like ChatGPT with conversation history"""
     try:
-        openai_client = get_openai_client()
+        openai_client = get_llm_client()
         
         if not openai_client:
             return jsonify({
@@ -38,64 +109,158 @@ def chat():
             }), 503
         
         data = request.json
-        messages = data.get('messages', [])
-        user_message = data.get('message', '')
+        try:
+            conversation_messages, conversation, user_turn = prepare_turn(data)
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Build conversation history
-        conversation_messages = [
-            {
-                "role": "system",
-                "content": """You are LawBot 360, an AI-powered legal assistant specializing in Indian laws. 
-You provide educational information about legal matters, rights, and procedures related to Indian law.
-You are helpful, clear, and always remind users that you provide educational information only, not legal advice.
-Always recommend consulting a qualified lawyer for specific legal matters.
-Keep responses conversational, clear, and easy to understand."""
-            }
-        ]
+        question = data.get('message', '')
+        jurisdiction = data.get('jurisdiction', Config.DEFAULT_JURISDICTION)
+        try:
+            # A near-identical stand-alone question may already have been answered
+            answer_cache = answer_cache_for(data, conversation)
+            cached = answer_cache.lookup('chat', question, jurisdiction) if answer_cache else None
+            if cached is not None:
+                usage = {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+                result = {'message': cached, 'usage': usage, 'cached': True}
+                if conversation is not None:
+                    result['conversation'] = finish_turn(conversation, user_turn, cached, usage)
+                return jsonify(result), 200
+            
+            # Call OpenAI API
+            response = get_llm_gateway().chat_completion(
+                openai_client,
+                model=CHAT_MODEL,
+                messages=conversation_messages,
+                temperature=0.7,
+                max_tokens=2000,
+                stream=False
+            )
+            ai_response = response.choices[0].message.content
+            if answer_cache:
+                answer_cache.store('chat', question, jurisdiction, ai_response)
+        except Exception:
+            # Drop the unanswered turn so it is not replayed into later prompts
+            finish_turn(conversation, user_turn, None, None)
+            raise
         
-        # Add conversation history
-        for msg in messages:
-            if msg.get('role') == 'user':
-                conversation_messages.append({"role": "user", "content": msg.get('content', '')})
-            elif msg.get('role') == 'assistant':
-                conversation_messages.append({"role": "assistant", "content": msg.get('content', '')})
+        usage = {
+            'prompt_tokens': response.usage.prompt_tokens,
+            'completion_tokens': response.usage.completion_tokens,
+            'total_tokens': response.usage.total_tokens
+        }
         
-        # Add current user message
-        if user_message:
-            conversation_messages.append({"role": "user", "content": user_message})
-        
-        # Call OpenAI API
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",  # Using gpt-4o-mini for better performance and cost
-            messages=conversation_messages,
-            temperature=0.7,
-            max_tokens=2000,
-            stream=False
-        )
-        
-        ai_response = response.choices[0].message.content
-        
-        return jsonify({
-            'message': ai_response,
-            'usage': {
-                'prompt_tokens': response.usage.prompt_tokens,
-                'completion_tokens': response.usage.completion_tokens,
-                'total_tokens': response.usage.total_tokens
-            }
-        }), 200
+        result = {'message': ai_response, 'usage': usage}
+        if conversation is not None:
+            result['conversation'] = finish_turn(conversation, user_turn, ai_response, usage)
+        return jsonify(result), 200
         
+    except LLMUnavailable as e:
+        return jsonify({'error': friendly_error(e)}), 503
     except Exception as e:
         import traceback
-        error_msg = str(e)
-        if 'api_key' in error_msg.lower() or 'authentication' in error_msg.lower():
-            error_msg = 'OpenAI API key is invalid or missing. Please check your configuration.'
-        elif 'rate limit' in error_msg.lower():
-            error_msg = 'OpenAI API rate limit exceeded. Please try again later.'
-        elif 'insufficient_quota' in error_msg.lower():
-            error_msg = 'OpenAI API quota exceeded. Please check your OpenAI account billing.'
-        
         return jsonify({
-            'error': error_msg,
+            'error': friendly_error(e),
             'details': traceback.format_exc() if Config.DEBUG else None
         }), 500
 
+@bp.route('/stream', methods=['POST'])
+def chat_stream():
+    """Chat endpoint that streams the reply as Server-Sent Events.
+    
+    Emits `token` events ({"content": ...}) as the model produces text, then one `done`
+    event with token usage, or an `error` event.
+    """
+    openai_client = get_llm_client()
+    if not openai_client:
+        return jsonify({
+            'error': 'OpenAI API key is not configured. Please set OPENAI_API_KEY in your environment variables or .env file.'
+        }), 503
+    
+    data = request.json or {}
+    try:
+        conversation_messages, conversation, user_turn = prepare_turn(data)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    question = data.get('message', '')
+    jurisdiction = data.get('jurisdiction', Config.DEFAULT_JURISDICTION)
+    try:
+        answer_cache = answer_cache_for(data, conversation)
+        cached = answer_cache.lookup('chat', question, jurisdiction) if answer_cache else None
+        if cached is not None:
+            completion = TextStream(cached)
+        else:
+            # Opened before the response starts, so setup errors still get a JSON status code
+            on_complete = (lambda answer: answer_cache.store('chat', question, jurisdiction, answer)) if answer_cache else None
+            completion = CompletionStream(get_llm_gateway().chat_completion(
+                openai_client,
+                model=CHAT_MODEL,
+                messages=conversation_messages,
+                temperature=0.7,
+                max_tokens=2000,
+                stream=True,
+                extra_body=STREAM_USAGE_BODY
+            ), on_complete=on_complete)
+    except Exception as e:
+        finish_turn(conversation, user_turn, None, None)
+        return jsonify({'error': friendly_error(e)}), 503 if isinstance(e, LLMUnavailable) else 500
+    
+    def events():
+        try:
+            for delta in completion:
+                yield sse_event('token', {'content': delta})
+            done = {'usage': completion.usage}
+            if cached is not None:
+                done['cached'] = True
+            if conversation is not None:
+                done['conversation'] = finish_turn(conversation, user_turn, completion.text, completion.usage)
+            yield sse_event('done', done)
+        except Exception as e:
+            yield sse_event('error', {'error': friendly_error(e)})
+        finally:
+            # Runs when the client disconnects too, cancelling the upstream completion
+            completion.close()
+            if conversation is not None and not completion.finished:
+                finish_turn(conversation, user_turn, None, None)
+    
+    # Keep the request (and database session) alive while the stream is consumed
+    response = Response(stream_with_context(events()), mimetype='text/event-stream', headers=SSE_HEADERS)
+    # The generator's finally never runs if the response is closed before the first chunk;
+    # the upstream stream (and its gateway slot) must be released either way
+    response.call_on_close(completion.close)
+    return response
+
+@bp.route('/conversations', methods=['POST'])
+def create_conversation():
+    """Start a server-side conversation; pass its id as `conversation_id` to chat"""
+    store = get_conversation_store()
+    conversation = store.create(user_id=request_user_id())
+    return jsonify(store.stats(conversation)), 201
+
+@bp.route('/conversations/<conversation_id>', methods=['GET'])
+def get_conversation(conversation_id):
+    """Turns and token counts of a conversation"""
+    store = get_conversation_store()
+    conversation = find_conversation(conversation_id)
+    if conversation is None:
+        return jsonify({'error': 'Conversation not found'}), 404
+    result = store.stats(conversation)
+    result['summary'] = conversation.summary
+    result['messages'] = [{'role': turn.role, 'content': turn.content} for turn in conversation.turns]
+    return jsonify(result), 200
+
+@bp.route('/conversations/<conversation_id>', methods=['DELETE'])
+def delete_conversation(conversation_id):
+    """Delete a conversation and its turns"""
+    store = get_conversation_store()
+    conversation = find_conversation(conversation_id)
+    if conversation is None:
+        return jsonify({'error': 'Conversation not found'}), 404
+    store.delete(conversation)
+    return jsonify({'deleted': conversation_id}), 200
+
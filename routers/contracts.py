@@ -5,7 +5,6 @@ from models.db import db, Contract, User, Artifact, AuditEvent
 from models.schemas import ContractGenerateRequest, ContractResponse
 from datetime import datetime
 import hashlib
-import os
 
 bp = Blueprint('contracts', __name__)
 
@@ -13,8 +12,8 @@ bp = Blueprint('contracts', __name__)
 def generate_contract():
     """Generate a contract from natural language or structured input"""
     try:
-        from services.generator import ContractGenerator
-        generator = ContractGenerator()
+        from services.generator import get_generator
+        generator = get_generator()
         
         data = request.json
         req = ContractGenerateRequest(**data)
@@ -95,20 +94,30 @@ def get_contract(contract_id):
 
 @bp.route('/<int:contract_id>/pdf', methods=['GET'])
 def download_pdf(contract_id):
-    """Download contract as PDF"""
+    """Download contract as PDF, rendering it on first request"""
     from flask import send_file
+    from services.exports import get_exports
     contract = Contract.query.get_or_404(contract_id)
-    if contract.pdf_path and os.path.exists(contract.pdf_path):
-        return send_file(contract.pdf_path, as_attachment=True, download_name=f'contract_{contract_id}.pdf')
+    try:
+        pdf_path = get_exports().ensure(contract.pdf_path)
+    except ImportError as e:
+        return jsonify({'error': f'Service not available: {str(e)}'}), 503
+    if pdf_path:
+        return send_file(pdf_path, as_attachment=True, download_name=f'contract_{contract_id}.pdf')
     return jsonify({'error': 'PDF not found'}), 404
 
 @bp.route('/<int:contract_id>/docx', methods=['GET'])
 def download_docx(contract_id):
-    """Download contract as DOCX"""
+    """Download contract as DOCX, rendering it on first request"""
     from flask import send_file
+    from services.exports import get_exports
     contract = Contract.query.get_or_404(contract_id)
-    if contract.docx_path and os.path.exists(contract.docx_path):
-        return send_file(contract.docx_path, as_attachment=True, download_name=f'contract_{contract_id}.docx')
+    try:
+        docx_path = get_exports().ensure(contract.docx_path)
+    except ImportError as e:
+        return jsonify({'error': f'Service not available: {str(e)}'}), 503
+    if docx_path:
+        return send_file(docx_path, as_attachment=True, download_name=f'contract_{contract_id}.docx')
     return jsonify({'error': 'DOCX not found'}), 404
 
 @bp.route('/list', methods=['GET'])
@@ -1,5 +1,6 @@
-from flask import Blueprint, request, jsonify
-from models.schemas import ExplainRequest, ExplainResponse
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from models.schemas import ExplainRequest, ExplainResponse, ExplainBatchRequest
+from services.streaming import SSE_HEADERS, sse_event
 
 bp = Blueprint('explain', __name__)
 
@@ -7,18 +8,18 @@ bp = Blueprint('explain', __name__)
 def explain_law():
     """Explain a legal clause or concept"""
     try:
-        from services.retrieval import KnowledgeRetrieval
-        from services.generator import ContractGenerator
+        from services.retrieval import get_retrieval
+        from services.generator import get_generator
         
         data = request.json
         req = ExplainRequest(**data)
         
         # Retrieve relevant sections from knowledge base
-        retrieval = KnowledgeRetrieval()
+        retrieval = get_retrieval()
         relevant_sections = retrieval.search(req.text, jurisdiction=req.jurisdiction, limit=3)
         
         # Generate explanation using LLM with RAG context
-        generator = ContractGenerator()
+        generator = get_generator()
         explanation = generator.explain_clause(
             text=req.text,
             context=relevant_sections,
@@ -40,4 +41,72 @@ def explain_law():
         import traceback
         return jsonify({'error': f'{str(e)}\n{traceback.format_exc()}'}), 400
 
+@bp.route('/stream', methods=['POST'])
+def explain_law_stream():
+    """Explain a legal clause, streaming the explanation as Server-Sent Events.
+    
+    Emits `token` events as text arrives, then a `done` event with refs and token usage.
+    """
+    try:
+        from services.retrieval import get_retrieval
+        from services.generator import get_generator
+        
+        req = ExplainRequest(**request.json)
+        relevant_sections = get_retrieval().search(req.text, jurisdiction=req.jurisdiction, limit=3)
+        explanation = get_generator().stream_explanation(
+            text=req.text,
+            context=relevant_sections,
+            language=req.language,
+            jurisdiction=req.jurisdiction
+        )
+    except ImportError as e:
+        return jsonify({'error': f'Service not available: {str(e)}'}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    
+    refs = [s.get('section_code', '') for s in relevant_sections if s.get('section_code')]
+    
+    def events():
+        try:
+            for delta in explanation:
+                yield sse_event('token', {'content': delta})
+            yield sse_event('done', {'refs': refs, 'usage': explanation.usage})
+        except Exception as e:
+            yield sse_event('error', {'error': str(e), 'refs': refs})
+        finally:
+            # Runs when the client disconnects too, cancelling the upstream completion
+            explanation.close()
+    
+    # Keep the request context alive while the stream is consumed
+    response = Response(stream_with_context(events()), mimetype='text/event-stream', headers=SSE_HEADERS)
+    # Also release the upstream stream if the response is closed before it is iterated
+    response.call_on_close(explanation.close)
+    return response
 
+@bp.route('/batch', methods=['POST'])
+def search_batch():
+    """Retrieve relevant law sections for several clauses in one call"""
+    try:
+        from services.retrieval import get_retrieval
+        
+        data = request.json
+        req = ExplainBatchRequest(**data)
+        
+        retrieval = get_retrieval()
+        results = retrieval.search_many(req.queries, jurisdiction=req.jurisdiction, limit=req.limit)
+        
+        return jsonify({
+            'results': [
+                {
+                    'query': query,
+                    'sections': sections,
+                    'refs': [s.get('section_code', '') for s in sections if s.get('section_code')]
+                }
+                for query, sections in zip(req.queries, results)
+            ]
+        }), 200
+        
+    except ImportError as e:
+        return jsonify({'error': f'Service not available: {str(e)}'}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
@@ -0,0 +1,36 @@
+import sys
+
+from flask import Blueprint, jsonify
+
+bp = Blueprint('metrics', __name__)
+
+@bp.route('/', methods=['GET'])
+def get_metrics():
+    """Runtime cache and service metrics for this worker process"""
+    metrics = {}
+    
+    # Only report services that are already loaded; never initialise one just to read its counters
+    retrieval_module = sys.modules.get('services.retrieval')
+    retrieval = retrieval_module.peek_retrieval() if retrieval_module else None
+    metrics['retrieval'] = retrieval.cache_stats() if retrieval else None
+    
+    exports_module = sys.modules.get('services.exports')
+    exports = exports_module.peek_exports() if exports_module else None
+    metrics['exports'] = exports.stats() if exports else None
+    
+    generator_module = sys.modules.get('services.generator')
+    generator = generator_module.peek_generator() if generator_module else None
+    polish_cache = generator.polish_cache if generator else None
+    metrics['polish_cache'] = polish_cache.stats() if polish_cache else None
+    
+    answer_cache_module = sys.modules.get('services.answer_cache')
+    answer_cache = answer_cache_module.peek_answer_cache() if answer_cache_module else None
+    metrics['answer_cache'] = answer_cache.stats() if answer_cache else None
+    
+    from services.llm import llm_client_stats
+    metrics['llm'] = llm_client_stats()
+    
+    from services.startup import startup_profile
+    metrics['startup'] = startup_profile.report() if startup_profile.enabled else None
+    
+    return jsonify(metrics), 200
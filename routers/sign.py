@@ -19,10 +19,14 @@ def create_envelope():
         contract = Contract.query.get_or_404(contract_id)
         user_id = request.headers.get('X-User-Id', 1)
         
+        # The PDF is rendered lazily, so make sure it exists before hashing it
+        from services.exports import get_exports
+        pdf_path = get_exports().ensure(contract.pdf_path)
+        
         # Create envelope (mock for now, can integrate DocuSign later)
         envelope_result = signer.create_envelope(
             contract_id=contract_id,
-            pdf_path=contract.pdf_path,
+            pdf_path=str(pdf_path) if pdf_path else contract.pdf_path,
             signer=signer_info
         )
         
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""Benchmark retrieval quality and latency over data/laws with a labelled query set.
+
+The index is built from scratch in a temporary VECTOR_DB_PATH, so the real vector
+store is never touched. Results are printed (and optionally written) as JSON, e.g.
+
+    python scripts/benchmark_retrieval.py --backend numpy --output bench.json
+"""
+
+import argparse
+import json
+import math
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import Config  # noqa: E402
+from services.retrieval import SEARCH_MODES, KnowledgeRetrieval  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_QUERIES = PROJECT_ROOT / "data" / "benchmarks" / "retrieval_queries.json"
+
+
+def load_queries(path: Path) -> List[Dict]:
+    """Read the labelled queries: query, expected section_code and optionally act_name"""
+    with path.open("r", encoding="utf-8") as handle:
+        queries = json.load(handle)
+    for item in queries:
+        if not item.get("query") or not item.get("section_code"):
+            raise ValueError(f"Labelled query needs 'query' and 'section_code': {item}")
+    return queries
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    """Nearest-rank p50/p95/p99 of latency samples, in milliseconds"""
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(samples)
+
+    def rank(p):
+        index = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+        return round(ordered[index] * 1000, 3)
+
+    return {"p50": rank(50), "p95": rank(95), "p99": rank(99)}
+
+
+def first_match(results: List[Dict], item: Dict) -> Optional[int]:
+    """1-based rank of the expected section in the results, or None"""
+    for rank, section in enumerate(results, start=1):
+        if section.get("section_code") != item["section_code"]:
+            continue
+        if item.get("act_name") and section.get("act_name") != item["act_name"]:
+            continue
+        return rank
+    return None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process so far"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
+
+
+def run_mode(retrieval, queries: List[Dict], mode: str, k: int, jurisdiction: Optional[str], repeat: int) -> Dict:
+    """Replay the query set in one search mode and collect quality and latency"""
+    cold, warm = [], []
+    hits = 0
+    reciprocal_ranks = 0.0
+    misses = []
+
+    for item in queries:
+        # Cold: nothing cached for this query
+        retrieval._embedding_cache.clear()
+        retrieval._result_cache.clear()
+        started = time.perf_counter()
+        results = retrieval.search(item["query"], jurisdiction=jurisdiction, limit=k, mode=mode)
+        cold.append(time.perf_counter() - started)
+
+        rank = first_match(results, item)
+        if rank:
+            hits += 1
+            reciprocal_ranks += 1.0 / rank
+        else:
+            misses.append(item["query"])
+
+    # Warm: the same queries again with the caches populated by a priming pass
+    for item in queries:
+        retrieval.search(item["query"], jurisdiction=jurisdiction, limit=k, mode=mode)
+    for _ in range(repeat):
+        for item in queries:
+            started = time.perf_counter()
+            retrieval.search(item["query"], jurisdiction=jurisdiction, limit=k, mode=mode)
+            warm.append(time.perf_counter() - started)
+
+    return {
+        f"recall@{k}": round(hits / len(queries), 4),
+        "mrr": round(reciprocal_ranks / len(queries), 4),
+        "cold_latency_ms": percentiles(cold),
+        "warm_latency_ms": percentiles(warm),
+        "misses": misses
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval over data/laws")
+    parser.add_argument("--queries", default=str(DEFAULT_QUERIES), help="Labelled query set (JSON list)")
+    parser.add_argument("--mode", dest="modes", action="append", help="Search mode(s) to run (default: all)")
+    parser.add_argument("-k", dest="k", type=int, default=5, help="Results per query (default: 5)")
+    parser.add_argument("--jurisdiction", default="IN", help="Jurisdiction filter; 'any' searches everything")
+    parser.add_argument("--repeat", type=int, default=5, help="Warm passes over the query set (default: 5)")
+    parser.add_argument("--backend", help="Vector backend (default: VECTOR_BACKEND)")
+    parser.add_argument("--quantize", help="NumPy backend quantization (default: VECTOR_QUANTIZE)")
+    parser.add_argument("--partition-by", help="Comma-separated partition fields; '' for none")
+    parser.add_argument("--use-artifact", action="store_true", help="Load precomputed embeddings during the build")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    queries = load_queries(Path(args.queries))
+    jurisdiction = None if args.jurisdiction.lower() == "any" else args.jurisdiction
+    temp_dir = Path(tempfile.mkdtemp(prefix="retrieval-bench-"))
+
+    Config.VECTOR_DB_PATH = temp_dir / "vector_store"
+    if not args.use_artifact:
+        Config.EMBEDDING_ARTIFACT_PATH = temp_dir / "embeddings"
+    if args.backend:
+        Config.VECTOR_BACKEND = args.backend
+    if args.quantize is not None:
+        Config.VECTOR_QUANTIZE = args.quantize
+    if args.partition_by is not None:
+        Config.VECTOR_PARTITION_BY = [f.strip() for f in args.partition_by.split(",") if f.strip()]
+
+    try:
+        started = time.perf_counter()
+        retrieval = KnowledgeRetrieval()
+        build_seconds = time.perf_counter() - started
+
+        report = {
+            "config": {
+                "backend": Config.VECTOR_BACKEND,
+                "quantize": Config.VECTOR_QUANTIZE,
+                "partition_by": Config.VECTOR_PARTITION_BY,
+                "embedding_model": Config.EMBEDDING_MODEL,
+                "embedding_cache_size": Config.EMBEDDING_CACHE_SIZE,
+                "search_cache_size": Config.SEARCH_CACHE_SIZE,
+                "hybrid_alpha": Config.HYBRID_ALPHA,
+                "k": args.k,
+                "jurisdiction": jurisdiction,
+                "queries": len(queries),
+                "repeat": args.repeat
+            },
+            "build": {
+                "seconds": round(build_seconds, 3),
+                "sections": retrieval.collection.count(),
+                "stats": retrieval.index_stats
+            },
+            "modes": {
+                mode: run_mode(retrieval, queries, mode, args.k, jurisdiction, args.repeat)
+                for mode in (args.modes or SEARCH_MODES)
+            },
+            "peak_rss_mb": peak_rss_mb()
+        }
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
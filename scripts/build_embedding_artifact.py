@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+"""Precompute law section embeddings so a fresh deployment can skip embedding the corpus."""
+
+import argparse
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from services.retrieval import build_embedding_artifact  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precomputed embedding artifact for data/laws")
+    parser.add_argument("--laws", dest="laws_path", help="Directory of law CSVs (default: LAWS_DATA_PATH)")
+    parser.add_argument("--output", dest="output_path", help="Artifact directory (default: EMBEDDING_ARTIFACT_PATH)")
+    parser.add_argument("--model", dest="model_name", help="Embedding model (default: EMBEDDING_MODEL)")
+    args = parser.parse_args()
+
+    print("Embedding law sections...")
+    path = build_embedding_artifact(args.laws_path, args.output_path, args.model_name)
+    print(f"Embedding artifact written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""Run the shared embedding server that app workers use when EMBEDDING_SERVER_SOCKET is set."""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from config import Config  # noqa: E402
+from services.embedding_server import EmbeddingServer  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve sentence embeddings over a Unix socket")
+    parser.add_argument("--socket", default=Config.EMBEDDING_SERVER_SOCKET or "/tmp/lawbot-embeddings.sock",
+                        help="Socket path (default: EMBEDDING_SERVER_SOCKET)")
+    parser.add_argument("--model", default=Config.EMBEDDING_MODEL, help="Embedding model (default: EMBEDDING_MODEL)")
+    parser.add_argument("--max-wait-ms", type=float, default=Config.EMBEDDING_SERVER_MAX_WAIT_MS,
+                        help="How long to wait for more requests to join a batch")
+    parser.add_argument("--max-batch", type=int, default=256, help="Texts per micro-batch before it runs early")
+    args = parser.parse_args()
+
+    if EmbeddingServer is None:
+        sys.exit("Unix sockets are not available on this platform")
+
+    from sentence_transformers import SentenceTransformer
+
+    print(f"Loading {args.model}...")
+    model = SentenceTransformer(args.model)
+    server = EmbeddingServer(
+        args.socket,
+        model,
+        args.model,
+        batch_size=Config.EMBEDDING_BATCH_SIZE,
+        max_batch=args.max_batch,
+        max_wait=args.max_wait_ms / 1000
+    )
+    print(f"Embedding server listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,9 @@ import requests
 from dotenv import load_dotenv
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
 DATA_DIR = PROJECT_ROOT / "data" / "laws"
 CONFIG_PATH = DATA_DIR / "sources.json"
 
@@ -125,11 +128,23 @@ def ingest_source(source: Dict, headers: Dict[str, str]) -> int:
     return count
 
 
+def reindex_vector_store():
+    """Apply only the changed sections to the vector store"""
+    from services.retrieval import KnowledgeRetrieval
+
+    stats = KnowledgeRetrieval(force_reindex=True).index_stats
+    print(
+        f"Vector store synced: {stats['added']} added, {stats['updated']} updated, "
+        f"{stats['deleted']} deleted, {stats['unchanged']} unchanged"
+    )
+
+
 def main():
     load_dotenv()
     parser = argparse.ArgumentParser(description="Ingest law sections from external APIs")
     parser.add_argument("--source", dest="source_ids", action="append", help="Specific source id(s) to ingest")
     parser.add_argument("--config", dest="config_path", default=str(CONFIG_PATH), help="Path to sources.json")
+    parser.add_argument("--reindex", action="store_true", help="Sync the vector store with the new CSVs afterwards")
 
     args = parser.parse_args()
 
@@ -157,6 +172,9 @@ def main():
 
     print(f"Completed ingestion. Total sections processed: {total}")
 
+    if args.reindex:
+        reindex_vector_store()
+
 
 if __name__ == "__main__":
     main()
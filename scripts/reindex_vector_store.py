@@ -1,6 +1,7 @@
 #!/usr/bin/env python
-"""Force rebuild of the legal knowledge vector store."""
+"""Sync the legal knowledge vector store with the CSV sources."""
 
+import argparse
 import sys
 from pathlib import Path
 
@@ -12,9 +13,21 @@ from services.retrieval import KnowledgeRetrieval  # noqa: E402
 
 
 def main():
-    print("Rebuilding vector store from CSV sources...")
-    KnowledgeRetrieval(force_reindex=True)
-    print("Reindex complete.")
+    parser = argparse.ArgumentParser(description="Sync the vector store with the law CSVs")
+    parser.add_argument("--rollback", action="store_true", help="Re-activate the index generation the last rebuild replaced")
+    args = parser.parse_args()
+
+    if args.rollback:
+        name = KnowledgeRetrieval().rollback()
+        print(f"Active index generation: {name or '(original)'}")
+        return
+
+    print("Syncing vector store with CSV sources...")
+    stats = KnowledgeRetrieval(force_reindex=True).index_stats
+    print(
+        f"Reindex complete: {stats['added']} added, {stats['updated']} updated, "
+        f"{stats['deleted']} deleted, {stats['unchanged']} unchanged."
+    )
 
 
 if __name__ == "__main__":
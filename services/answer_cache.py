@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
+
+from config import Config
+
+_answer_cache: Optional['SemanticAnswerCache'] = None
+_answer_cache_lock = threading.Lock()
+_answer_cache_failed = False
+
+
+def normalise_question(question: str) -> str:
+    """Lower-case, collapse whitespace and drop trailing punctuation before embedding"""
+    return ' '.join(question.lower().split()).strip(' ?.!')
+
+
+class SemanticAnswerCache:
+    """LLM answers reused for questions whose embeddings are nearly identical.
+
+    An entry matches when its scope (chat, explain) and jurisdiction are the same and the
+    cosine similarity of the normalised questions reaches `threshold`. Entries expire after
+    `ttl` seconds, the least recently used go beyond `max_size`, and everything is dropped
+    when the knowledge-base index generation changes.
+    """
+
+    def __init__(self, embed: Callable[[str], Any], version: Callable[[], Any],
+                 max_size: int = 1024, ttl: Optional[float] = None, threshold: float = 0.95):
+        self.embed = embed
+        self.version = version
+        self.max_size = max_size
+        self.ttl = ttl
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._generation = None
+        self._next_id = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, scope: str, question: str, jurisdiction: Optional[str]) -> Optional[str]:
+        """Cached answer to a near-identical question, or None"""
+        if self.max_size <= 0 or not question.strip():
+            return None
+        vector = self._vector(question)
+        generation = self.version()
+        now = time.monotonic()
+        with self._lock:
+            self._check_generation(generation)
+            best_id, best_score = None, self.threshold
+            for entry_id, (entry_scope, entry_jurisdiction, entry_vector, answer, expires_at) in list(self._entries.items()):
+                if expires_at is not None and expires_at <= now:
+                    del self._entries[entry_id]
+                    continue
+                if entry_scope != scope or entry_jurisdiction != jurisdiction:
+                    continue
+                score = float(np.dot(entry_vector, vector))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return self._entries[best_id][3]
+
+    def store(self, scope: str, question: str, jurisdiction: Optional[str], answer: str):
+        if self.max_size <= 0 or not question.strip() or not answer:
+            return
+        vector = self._vector(question)
+        generation = self.version()
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._check_generation(generation)
+            self._entries[self._next_id] = (scope, jurisdiction, vector, answer, expires_at)
+            self._next_id += 1
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'threshold': self.threshold,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def _vector(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embed(normalise_question(question)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_generation(self, generation):
+        # Answers quote the knowledge base, so a reindex makes every one of them suspect
+        if generation != self._generation:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._generation = generation
+
+
+def get_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Shared answer cache backed by the retrieval embedding model; None if disabled or unavailable"""
+    global _answer_cache, _answer_cache_failed
+    if Config.ANSWER_CACHE_SIZE <= 0 or _answer_cache_failed:
+        return None
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None and not _answer_cache_failed:
+                try:
+                    from services.retrieval import get_retrieval
+                    retrieval = get_retrieval()
+                except Exception as e:
+                    # Don't retry the model load on every request
+                    _answer_cache_failed = True
+                    print(f"Semantic answer cache disabled: {e}")
+                    return None
+                _answer_cache = SemanticAnswerCache(
+                    embed=retrieval.embed_query,
+                    version=retrieval.index_version,
+                    max_size=Config.ANSWER_CACHE_SIZE,
+                    ttl=Config.ANSWER_CACHE_TTL,
+                    threshold=Config.ANSWER_CACHE_THRESHOLD
+                )
+    return _answer_cache
+
+
+def peek_answer_cache() -> Optional[SemanticAnswerCache]:
+    """Return the shared cache only if it has already been created"""
+    return _answer_cache
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """Thread-safe LRU cache with an optional per-entry TTL and hit/miss counters"""
+    
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value, or `default` if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+    
+    def set(self, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries beyond max_size"""
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+def content_key(*parts: Any) -> str:
+    """Stable SHA-256 key for JSON-serialisable parts (model, prompt, inputs, ...)"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SQLiteCache:
+    """Persistent string cache in one SQLite file, shared by every worker process.
+    
+    Entries are evicted least recently used once their total size passes max_bytes.
+    Hit/miss counters are per process.
+    """
+    
+    def __init__(self, path: Path, max_bytes: int = 64 * 1024 * 1024):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, accessed REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+    
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(str(self.path), timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+    
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Return the cached value, or `default` if it is missing"""
+        try:
+            with self._connection() as conn:
+                row = conn.execute('SELECT value FROM entries WHERE key = ?', (key,)).fetchone()
+                if row is not None:
+                    conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (time.time(), key))
+        except sqlite3.Error as e:
+            print(f"Cache read failed ({self.path.name}): {e}")
+            row = None
+        if row is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return row[0]
+    
+    def set(self, key: str, value: str):
+        """Store a value, then evict the oldest entries beyond max_bytes"""
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO entries (key, value, size, accessed) VALUES (?, ?, ?, ?)',
+                    (key, value, size, time.time())
+                )
+                self._evict(conn)
+        except sqlite3.Error as e:
+            print(f"Cache write failed ({self.path.name}): {e}")
+    
+    def _evict(self, conn: sqlite3.Connection):
+        excess = (conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]) - self.max_bytes
+        if excess <= 0:
+            return
+        stale = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY accessed'):
+            stale.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany('DELETE FROM entries WHERE key = ?', stale)
+        self.evictions += len(stale)
+    
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM entries')
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        try:
+            size, total_bytes = self._connection().execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+            ).fetchone()
+        except sqlite3.Error:
+            size, total_bytes = None, None
+        return {
+            'size': size,
+            'bytes': total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
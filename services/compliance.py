@@ -1,41 +1,55 @@
 import re
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Pattern
 from models.schemas import ComplianceCheck, ComplianceResponse
 
+def _compile(patterns: Dict[str, str]) -> Dict[str, Pattern]:
+    return {name: re.compile(pattern) for name, pattern in patterns.items()}
+
+# Rule patterns are compiled once at import, so a pre-fork warmup shares them with every worker
+
+# GST compliance rules
+GST_PATTERNS = _compile({
+    'registration_required': r'gstin|gst\s+registration|goods\s+and\s+services\s+tax',
+    'invoice_fields': r'invoice|tax\s+invoice|gstin|hsn|sac',
+    'payment_timeline': r'payment\s+within|days\s+of\s+invoice|credit\s+period'
+})
+
+# TDS compliance
+TDS_PATTERNS = _compile({
+    'threshold_mention': r'tds|tax\s+deducted\s+at\s+source|withholding',
+    'rates': r'\d+%\s+tds|tds\s+at\s+\d+%'
+})
+
+# Companies Act (India)
+COMPANIES_ACT_PATTERNS = _compile({
+    'board_approval': r'board\s+approval|board\s+resolution',
+    'related_party': r'related\s+party|related\s+person'
+})
+
+# MSME Act
+MSME_PATTERNS = _compile({
+    'payment_rule': r'45\s+days|msme|micro.*small.*medium',
+    'supplier_relation': r'supplier|vendor|service\s+provider'
+})
+
+# IT Act / Data Protection
+DATA_PROTECTION_PATTERNS = _compile({
+    'data_processing': r'data\s+processing|personal\s+data|personal\s+information',
+    'breach_notification': r'data\s+breach|breach\s+notification|security\s+incident'
+})
+
+# Rupee amounts, for the large-payment heuristic
+AMOUNT_PATTERN = re.compile(r'[₹]\s*(\d+(?:,\d{3})*(?:\.\d{2})?)')
+
 class ComplianceChecker:
     """Checks financial and statutory compliance"""
     
     def __init__(self):
-        # GST compliance rules
-        self.gst_patterns = {
-            'registration_required': r'gstin|gst\s+registration|goods\s+and\s+services\s+tax',
-            'invoice_fields': r'invoice|tax\s+invoice|gstin|hsn|sac',
-            'payment_timeline': r'payment\s+within|days\s+of\s+invoice|credit\s+period'
-        }
-        
-        # TDS compliance
-        self.tds_patterns = {
-            'threshold_mention': r'tds|tax\s+deducted\s+at\s+source|withholding',
-            'rates': r'\d+%\s+tds|tds\s+at\s+\d+%'
-        }
-        
-        # Companies Act (India)
-        self.companies_act_patterns = {
-            'board_approval': r'board\s+approval|board\s+resolution',
-            'related_party': r'related\s+party|related\s+person'
-        }
-        
-        # MSME Act
-        self.msme_patterns = {
-            'payment_rule': r'45\s+days|msme|micro.*small.*medium',
-            'supplier_relation': r'supplier|vendor|service\s+provider'
-        }
-        
-        # IT Act / Data Protection
-        self.data_protection_patterns = {
-            'data_processing': r'data\s+processing|personal\s+data|personal\s+information',
-            'breach_notification': r'data\s+breach|breach\s+notification|security\s+incident'
-        }
+        self.gst_patterns = GST_PATTERNS
+        self.tds_patterns = TDS_PATTERNS
+        self.companies_act_patterns = COMPANIES_ACT_PATTERNS
+        self.msme_patterns = MSME_PATTERNS
+        self.data_protection_patterns = DATA_PROTECTION_PATTERNS
     
     def check(self, text: str, jurisdiction: str = 'IN') -> Dict[str, Any]:
         """Check compliance for given text"""
@@ -81,9 +95,9 @@ class ComplianceChecker:
         checks = []
         
         # Check if GST mentioned
-        has_gst = bool(re.search(self.gst_patterns['registration_required'], text))
-        has_invoice_fields = bool(re.search(self.gst_patterns['invoice_fields'], text))
-        has_payment_timeline = bool(re.search(self.gst_patterns['payment_timeline'], text))
+        has_gst = bool(self.gst_patterns['registration_required'].search(text))
+        has_invoice_fields = bool(self.gst_patterns['invoice_fields'].search(text))
+        has_payment_timeline = bool(self.gst_patterns['payment_timeline'].search(text))
         
         if self._has_commercial_transaction(text):
             if not has_gst:
@@ -114,8 +128,8 @@ class ComplianceChecker:
         """Check TDS compliance"""
         checks = []
         
-        has_tds_mention = bool(re.search(self.tds_patterns['threshold_mention'], text))
-        has_tds_rates = bool(re.search(self.tds_patterns['rates'], text))
+        has_tds_mention = bool(self.tds_patterns['threshold_mention'].search(text))
+        has_tds_rates = bool(self.tds_patterns['rates'].search(text))
         
         # If payment amount > threshold likely, check for TDS
         # For MVP, just check if mentioned
@@ -149,8 +163,8 @@ class ComplianceChecker:
         checks = []
         
         # Check for related party transactions
-        has_related_party = bool(re.search(self.companies_act_patterns['related_party'], text))
-        has_board_approval = bool(re.search(self.companies_act_patterns['board_approval'], text))
+        has_related_party = bool(self.companies_act_patterns['related_party'].search(text))
+        has_board_approval = bool(self.companies_act_patterns['board_approval'].search(text))
         
         if has_related_party and not has_board_approval:
             checks.append({
@@ -166,8 +180,8 @@ class ComplianceChecker:
         """Check MSME Act compliance"""
         checks = []
         
-        has_msme = bool(re.search(self.msme_patterns['payment_rule'], text))
-        has_supplier = bool(re.search(self.msme_patterns['supplier_relation'], text))
+        has_msme = bool(self.msme_patterns['payment_rule'].search(text))
+        has_supplier = bool(self.msme_patterns['supplier_relation'].search(text))
         
         if has_supplier and not has_msme:
             checks.append({
@@ -190,8 +204,8 @@ class ComplianceChecker:
         """Check data protection compliance"""
         checks = []
         
-        has_data_processing = bool(re.search(self.data_protection_patterns['data_processing'], text))
-        has_breach_notification = bool(re.search(self.data_protection_patterns['breach_notification'], text))
+        has_data_processing = bool(self.data_protection_patterns['data_processing'].search(text))
+        has_breach_notification = bool(self.data_protection_patterns['breach_notification'].search(text))
         
         if has_data_processing:
             if not has_breach_notification:
@@ -214,8 +228,7 @@ class ComplianceChecker:
     def _has_large_payment(self, text: str) -> bool:
         """Heuristic to detect large payments (>1 lakh)"""
         # Look for amounts
-        amount_pattern = r'[₹]\s*(\d+(?:,\d{3})*(?:\.\d{2})?)'
-        amounts = re.findall(amount_pattern, text)
+        amounts = AMOUNT_PATTERN.findall(text)
         
         for amount_str in amounts:
             try:
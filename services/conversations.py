@@ -0,0 +1,162 @@
+import threading
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+from config import Config
+from models.db import db, Conversation, ConversationTurn
+from services.llm import get_llm_client, get_llm_gateway
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding('cl100k_base')
+except Exception:  # tiktoken is optional; fall back to ~4 characters per token
+    _encoding = None
+
+SUMMARY_MODEL = "gpt-4o-mini"
+# Rough per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_store: Optional['ConversationStore'] = None
+_store_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens a message costs, exact with tiktoken and estimated without it"""
+    if not text:
+        return MESSAGE_OVERHEAD_TOKENS
+    if _encoding is not None:
+        return len(_encoding.encode(text)) + MESSAGE_OVERHEAD_TOKENS
+    return len(text) // 4 + 1 + MESSAGE_OVERHEAD_TOKENS
+
+
+class ConversationStore:
+    """Chat sessions kept server side, sent to the model as a bounded prompt.
+
+    The newest turns that fit `token_budget` are sent verbatim. Older turns are folded into
+    a running summary, stored on the conversation, so it is only recomputed when more turns
+    leave the window.
+    """
+
+    def __init__(self, token_budget: int, summary_tokens: int):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+
+    def create(self, user_id: Optional[int] = None) -> Conversation:
+        conversation = Conversation(id=uuid4().hex, user_id=user_id, summary='', summarized_turns=0,
+                                    prompt_tokens=0, completion_tokens=0)
+        db.session.add(conversation)
+        db.session.commit()
+        return conversation
+
+    def get(self, conversation_id: str) -> Optional[Conversation]:
+        return db.session.get(Conversation, conversation_id) if conversation_id else None
+
+    def delete(self, conversation: Conversation):
+        db.session.delete(conversation)
+        db.session.commit()
+
+    def add_turn(self, conversation: Conversation, role: str, content: str) -> ConversationTurn:
+        turn = ConversationTurn(conversation_id=conversation.id, role=role, content=content,
+                                tokens=count_tokens(content))
+        conversation.turns.append(turn)
+        db.session.commit()
+        return turn
+
+    def remove_turn(self, turn: ConversationTurn):
+        turn.conversation.turns.remove(turn)
+        db.session.commit()
+
+    def record_usage(self, conversation: Conversation, usage: Optional[Dict[str, Any]]):
+        if not usage:
+            return
+        conversation.prompt_tokens = (conversation.prompt_tokens or 0) + (usage.get('prompt_tokens') or 0)
+        conversation.completion_tokens = (conversation.completion_tokens or 0) + (usage.get('completion_tokens') or 0)
+        db.session.commit()
+
+    def build_messages(self, conversation: Conversation, system_prompt: str) -> List[Dict[str, str]]:
+        """Prompt for the next reply: system prompt, running summary and the recent turns"""
+        recent = self._fit_window(conversation)
+        messages = [{"role": "system", "content": system_prompt}]
+        if conversation.summary:
+            messages.append({
+                "role": "system",
+                "content": f"Summary of the earlier conversation:\n{conversation.summary}"
+            })
+        messages.extend({"role": turn.role, "content": turn.content} for turn in recent)
+        return messages
+
+    def stats(self, conversation: Conversation) -> Dict[str, Any]:
+        """Per-session token counts"""
+        window = conversation.turns[conversation.summarized_turns or 0:]
+        prompt_tokens = conversation.prompt_tokens or 0
+        completion_tokens = conversation.completion_tokens or 0
+        return {
+            'conversation_id': conversation.id,
+            'turns': len(conversation.turns),
+            'summarized_turns': conversation.summarized_turns or 0,
+            'history_tokens': sum(turn.tokens or 0 for turn in window),
+            'summary_tokens': count_tokens(conversation.summary) if conversation.summary else 0,
+            'token_budget': self.token_budget,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens
+        }
+
+    def _fit_window(self, conversation: Conversation) -> List[ConversationTurn]:
+        turns = conversation.turns[conversation.summarized_turns or 0:]
+        budget = self.token_budget
+        if conversation.summary or sum(turn.tokens or 0 for turn in turns) > budget:
+            # Leave room for the summary at its maximum size
+            budget -= self.summary_tokens + MESSAGE_OVERHEAD_TOKENS + 1
+
+        # Newest first; the latest turn is always kept, however long it is
+        kept, used = [], 0
+        for turn in reversed(turns):
+            if kept and used + (turn.tokens or 0) > budget:
+                break
+            kept.append(turn)
+            used += turn.tokens or 0
+        kept.reverse()
+
+        overflow = turns[:len(turns) - len(kept)]
+        if overflow:
+            conversation.summary = self._summarize(conversation.summary, overflow)
+            conversation.summarized_turns = (conversation.summarized_turns or 0) + len(overflow)
+            db.session.commit()
+        return kept
+
+    def _summarize(self, summary: str, turns: List[ConversationTurn]) -> str:
+        """Fold turns into the running summary, with the LLM when available"""
+        transcript = "\n".join(f"{turn.role}: {turn.content}" for turn in turns)
+        client = get_llm_client()
+        if client:
+            try:
+                response = get_llm_gateway().chat_completion(
+                    client,
+                    deadline=Config.CHAT_SUMMARY_TIMEOUT,
+                    model=SUMMARY_MODEL,
+                    messages=[
+                        {"role": "system", "content": "You maintain a running summary of a conversation between a user and a legal assistant about Indian law. Keep facts, parties, amounts, dates, jurisdictions and open questions. Reply with the updated summary only."},
+                        {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"}
+                    ],
+                    temperature=0,
+                    max_tokens=self.summary_tokens
+                )
+                return response.choices[0].message.content.strip()
+            except Exception as exc:
+                print(f"Conversation summary failed, keeping an excerpt: {exc}")
+
+        # Without the LLM keep the start of each turn, bounded to the summary size
+        excerpt = "\n".join(f"{turn.role}: {turn.content[:200]}" for turn in turns)
+        combined = f"{summary}\n{excerpt}".strip()
+        return combined[-self.summary_tokens * 4:]
+
+
+def get_conversation_store() -> ConversationStore:
+    """Return the shared ConversationStore, creating it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ConversationStore(Config.CHAT_HISTORY_TOKEN_BUDGET, Config.CHAT_SUMMARY_MAX_TOKENS)
+    return _store
@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Bump when the on-disk layout changes; older artifacts are then ignored and rebuilt
+ARTIFACT_VERSION = 1
+
+
+def corpus_hash(laws_path: Path) -> str:
+    """Hash of every law CSV's name and bytes, in a stable order"""
+    digest = hashlib.sha256()
+    for file_path in sorted(Path(laws_path).glob("*.csv")):
+        digest.update(file_path.name.encode('utf-8'))
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def artifact_dir(root: Path, model_name: str) -> Path:
+    """Directory holding the artifact for one embedding model"""
+    return Path(root) / (re.sub(r'[^A-Za-z0-9]+', '_', model_name).strip('_') or 'model')
+
+
+class EmbeddingArtifact:
+    """Section embeddings precomputed for one model and one version of the law CSVs.
+
+    The manifest records the model, the CSV hash, the name of the embeddings matrix and,
+    per row of that matrix, the section id and content hash it was computed from.
+    """
+
+    def __init__(self, manifest: Dict[str, Any], embeddings: np.ndarray):
+        self.manifest = manifest
+        self.embeddings = embeddings
+        self._rows = {
+            doc_id: (row, digest)
+            for row, (doc_id, digest) in enumerate(zip(manifest['ids'], manifest['content_hashes']))
+        }
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def model_name(self) -> str:
+        return self.manifest['model']
+
+    @property
+    def csv_hash(self) -> str:
+        return self.manifest['csv_hash']
+
+    @classmethod
+    def load(cls, root: Path, model_name: str) -> Optional['EmbeddingArtifact']:
+        """Open the artifact for `model_name`, or None if there is no usable one"""
+        directory = artifact_dir(root, model_name)
+        manifest_path = directory / 'manifest.json'
+        if not manifest_path.exists():
+            return None
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('version') != ARTIFACT_VERSION or manifest.get('model') != model_name:
+                return None
+            embeddings_file = manifest.get('embeddings_file', 'embeddings.npy')
+            embeddings = np.load(directory / embeddings_file, mmap_mode='r')
+            if embeddings.shape[0] != len(manifest['ids']):
+                raise ValueError(f"{embeddings_file} does not match the manifest")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring embedding artifact in {directory}: {e}")
+            return None
+        return cls(manifest, embeddings)
+
+    def lookup(self, doc_id: str, content_hash: str) -> Optional[List[float]]:
+        """Precomputed embedding for a section, or None if it is missing or out of date"""
+        entry = self._rows.get(doc_id)
+        if entry is None or entry[1] != content_hash:
+            return None
+        return self.embeddings[entry[0]].tolist()
+
+
+def write_artifact(root: Path, model_name: str, csv_hash: str, ids: Sequence[str],
+                   content_hashes: Sequence[str], embeddings: np.ndarray) -> Path:
+    """Write the embeddings and their manifest, replacing any earlier artifact for the model"""
+    directory = artifact_dir(root, model_name)
+    directory.mkdir(parents=True, exist_ok=True)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+
+    # Every write gets its own matrix file, so the manifest in place keeps pointing at the
+    # matrix it was written with until the new manifest replaces it
+    embeddings_file = f"embeddings-{uuid.uuid4().hex}.npy"
+    with open(directory / embeddings_file, 'wb') as f:
+        np.save(f, embeddings)
+
+    # The manifest goes last so a half-written artifact never looks valid
+    manifest = {
+        'version': ARTIFACT_VERSION,
+        'model': model_name,
+        'csv_hash': csv_hash,
+        'embeddings_file': embeddings_file,
+        'dimension': int(embeddings.shape[1]) if embeddings.ndim == 2 else 0,
+        'ids': list(ids),
+        'content_hashes': list(content_hashes)
+    }
+    tmp_path = directory / 'manifest.tmp.json'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, directory / 'manifest.json')
+
+    # Matrices of earlier writes (or of writes that died before their manifest) are unused now
+    for old_path in directory.glob('embeddings*.npy'):
+        if old_path.name != embeddings_file:
+            try:
+                old_path.unlink()
+            except OSError:
+                pass
+    return directory
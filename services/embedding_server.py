@@ -0,0 +1,217 @@
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Frame: 8-byte big-endian (header length, payload length), JSON header, raw payload
+_FRAME = struct.Struct('!II')
+
+
+class EmbeddingServerError(RuntimeError):
+    """The embedding server could not be reached or failed to encode a request"""
+
+
+def _send_frame(sock: socket.socket, header: Dict[str, Any], payload: bytes = b''):
+    header_bytes = json.dumps(header).encode('utf-8')
+    sock.sendall(_FRAME.pack(len(header_bytes), len(payload)) + header_bytes + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv_frame(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    header_size, payload_size = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    header = json.loads(_recv_exact(sock, header_size).decode('utf-8'))
+    return header, _recv_exact(sock, payload_size) if payload_size else b''
+
+
+# One process owns the sentence-transformers model and serves encode requests over a Unix
+# socket, so N gunicorn workers don't each hold a copy of the model and torch. Requests that
+# arrive together from different workers are coalesced into one micro-batch.
+
+
+class _Request:
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.vectors: Optional[np.ndarray] = None
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+
+
+class _MicroBatcher:
+    """Collects concurrent encode requests and runs them through the model together"""
+
+    def __init__(self, model, batch_size: int, max_batch: int, max_wait: float):
+        self.model = model
+        self.batch_size = batch_size
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = 0
+        self.batches = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self._thread.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        request = _Request(texts)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error:
+            raise EmbeddingServerError(request.error)
+        return request.vectors
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0].texts)
+            deadline = time.monotonic() + self.max_wait
+            # Wait briefly for requests from other workers to share the forward pass
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+            self._encode_batch(batch)
+
+    def _encode_batch(self, batch: List[_Request]):
+        texts = [text for request in batch for text in request.texts]
+        try:
+            vectors = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+                show_progress_bar=False
+            ).astype(np.float32)
+        except Exception as e:
+            for request in batch:
+                request.error = f"encode failed: {e}"
+                request.done.set()
+            return
+
+        self.requests += len(batch)
+        self.batches += 1
+        offset = 0
+        for request in batch:
+            request.vectors = vectors[offset:offset + len(request.texts)]
+            offset += len(request.texts)
+            request.done.set()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # Connections are persistent: serve requests until the client hangs up
+        while True:
+            try:
+                header, _ = _recv_frame(self.request)
+            except (ConnectionError, OSError, struct.error):
+                return
+            server = self.server
+            if header.get('model') != server.model_name:
+                _send_frame(self.request, {'error': f"server runs {server.model_name}, not {header.get('model')}"})
+                continue
+            try:
+                vectors = server.batcher.encode(header.get('texts') or [])
+            except EmbeddingServerError as e:
+                _send_frame(self.request, {'error': str(e)})
+                continue
+            _send_frame(self.request, {'shape': list(vectors.shape)}, vectors.astype('<f4').tobytes())
+
+
+if hasattr(socketserver, 'ThreadingUnixStreamServer'):
+    class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+        """Unix socket server that encodes texts with one shared model"""
+
+        daemon_threads = True
+        # Every worker thread keeps a connection open, so allow a burst of connects
+        request_queue_size = 128
+
+        def __init__(self, socket_path: str, model, model_name: str, batch_size: int = 64,
+                     max_batch: int = 256, max_wait: float = 0.005):
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+            self.model_name = model_name
+            self.batcher = _MicroBatcher(model, batch_size, max_batch, max_wait)
+            super().__init__(socket_path, _Handler)
+else:  # pragma: no cover - Windows has no Unix sockets
+    EmbeddingServer = None
+
+
+class EmbeddingClient:
+    """Sends encode requests to the embedding server, one persistent connection per thread.
+
+    After a failure the server is skipped for `retry_after` seconds, so callers fall back
+    to in-process encoding without paying a connect timeout on every request.
+    """
+
+    def __init__(self, socket_path: str, model_name: str, timeout: float = 5.0, retry_after: float = 30.0):
+        self.socket_path = socket_path
+        self.model_name = model_name
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._down_until = 0.0
+        self._local = threading.local()
+
+    def available(self) -> bool:
+        return hasattr(socket, 'AF_UNIX') and time.monotonic() >= self._down_until
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts on the server; raises EmbeddingServerError if that is not possible"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        try:
+            sock = self._connection()
+            _send_frame(sock, {'model': self.model_name, 'texts': list(texts)})
+            header, payload = _recv_frame(sock)
+        except (OSError, ValueError, struct.error) as e:
+            self._close()
+            self._down_until = time.monotonic() + self.retry_after
+            raise EmbeddingServerError(f"{self.socket_path}: {e}") from e
+        if header.get('error'):
+            self._down_until = time.monotonic() + self.retry_after
+            raise EmbeddingServerError(header['error'])
+        return np.frombuffer(payload, dtype='<f4').reshape(header['shape'])
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None and self._local.pid != os.getpid():
+            # Inherited across a fork: the parent keeps using it, so this process needs its own
+            self._close()
+            sock = None
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+            self._local.pid = os.getpid()
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from config import Config
+from services.pdf_styles import pdf_styles
+
+EXPORT_FORMATS = ('pdf', 'docx')
+# Renders of the same file serialise on one of a fixed set of locks, so memory stays bounded
+RENDER_LOCK_STRIPES = 64
+
+_exports: Optional['ContractExports'] = None
+_exports_lock = threading.Lock()
+
+
+def markdown_to_plaintext_lines(markdown_content: str) -> List[str]:
+    """Convert markdown into human-readable lines for exports"""
+    lines = []
+    for raw_line in markdown_content.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        # Headings
+        if line.startswith('#'):
+            line = line.lstrip('#').strip().upper()
+
+        # Bullet points
+        if line.startswith(('- ', '* ')):
+            line = f"• {line[2:].strip()}"
+
+        line = line.replace('**', '').replace('__', '')
+        lines.append(line)
+    return lines
+
+
+def render_pdf(markdown_content: str, pdf_path: Path):
+    """Generate PDF from markdown content"""
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+    doc = SimpleDocTemplate(str(pdf_path), pagesize=letter)
+    styles = pdf_styles()
+    story = []
+
+    for line in markdown_to_plaintext_lines(markdown_content):
+        story.append(Paragraph(line, styles['Normal']))
+        story.append(Spacer(1, 12))
+
+    doc.build(story)
+
+
+def render_docx(markdown_content: str, docx_path: Path):
+    """Generate DOCX from markdown content"""
+    from docx import Document
+
+    doc = Document()
+    for line in markdown_to_plaintext_lines(markdown_content):
+        doc.add_paragraph(line)
+    doc.save(str(docx_path))
+
+
+_RENDERERS = {'pdf': render_pdf, 'docx': render_docx}
+
+
+class ContractExports:
+    """Contract documents stored by the hash of their markdown.
+
+    Generation only saves the markdown (and HTML preview); PDF and DOCX files are rendered
+    the first time they are requested, so identical contracts share one set of files.
+    """
+
+    def __init__(self, root: Path, prerender: bool = False):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.prerender = prerender
+        self.rendered = 0
+        self.reused = 0
+        self._locks = [threading.Lock() for _ in range(RENDER_LOCK_STRIPES)]
+        self._executor_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def path(self, digest: str, fmt: str) -> Path:
+        return self.root / f"{digest}.{fmt}"
+
+    def save(self, markdown_content: str, html_content: str) -> str:
+        """Store a contract's markdown and HTML; returns the content hash naming its files"""
+        digest = hashlib.sha256(markdown_content.encode('utf-8')).hexdigest()
+        self._write(self.path(digest, 'md'), markdown_content)
+        self._write(self.path(digest, 'html'), html_content)
+        if self.prerender:
+            self._submit(digest)
+        return digest
+
+    def ensure(self, file_path: Optional[str]) -> Optional[Path]:
+        """Path of an export, rendering it first if needed; None if it cannot be produced.
+
+        Files from before exports were lazy are returned as they are.
+        """
+        if not file_path:
+            return None
+        path = Path(file_path)
+        if path.exists():
+            self.reused += 1
+            return path
+        fmt = path.suffix.lstrip('.')
+        if path.parent.resolve() != self.root.resolve() or fmt not in _RENDERERS:
+            return None
+        return self.render(path.stem, fmt)
+
+    def render(self, digest: str, fmt: str) -> Optional[Path]:
+        """Render one format from the stored markdown, once per content hash"""
+        target = self.path(digest, fmt)
+        source = self.path(digest, 'md')
+        with self._lock_for(f"{digest}.{fmt}"):
+            if target.exists():
+                self.reused += 1
+                return target
+            if not source.exists():
+                return None
+            markdown_content = source.read_text(encoding='utf-8')
+            # Render to a private name and rename, so other processes never serve a partial file
+            tmp_path = target.with_name(f"{target.stem}.{uuid4().hex}.tmp.{fmt}")
+            try:
+                _RENDERERS[fmt](markdown_content, tmp_path)
+                os.replace(tmp_path, target)
+            finally:
+                if tmp_path.exists():
+                    tmp_path.unlink()
+            self.rendered += 1
+        return target
+
+    def stats(self) -> Dict[str, int]:
+        return {'rendered': self.rendered, 'reused': self.reused}
+
+    def _submit(self, digest: str):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='export-render')
+        for fmt in EXPORT_FORMATS:
+            self._executor.submit(self._render_quietly, digest, fmt)
+
+    def _render_quietly(self, digest: str, fmt: str):
+        try:
+            self.render(digest, fmt)
+        except Exception as e:
+            print(f"Background {fmt} render of {digest[:12]} failed: {e}")
+
+    def _lock_for(self, key: str) -> threading.Lock:
+        return self._locks[hash(key) % len(self._locks)]
+
+    @staticmethod
+    def _write(path: Path, content: str):
+        if path.exists():
+            return
+        tmp_path = path.with_name(f"{path.stem}.{uuid4().hex}.tmp{path.suffix}")
+        tmp_path.write_text(content, encoding='utf-8')
+        os.replace(tmp_path, path)
+
+
+def get_exports() -> ContractExports:
+    """Return the shared ContractExports store, creating it on first use"""
+    global _exports
+    if _exports is None:
+        with _exports_lock:
+            if _exports is None:
+                _exports = ContractExports(Path(Config.EXPORT_FOLDER) / 'contracts', prerender=Config.EXPORT_PRERENDER)
+    return _exports
+
+
+def peek_exports() -> Optional[ContractExports]:
+    """Return the shared store only if it has already been created"""
+    return _exports
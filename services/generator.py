@@ -1,38 +1,62 @@
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
-from pathlib import Path
-from uuid import uuid4
+from typing import List, Optional
 
 from config import Config
-from jinja2 import Template
-from markdown import markdown
-from docx import Document
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
-
-try:
-    from openai import OpenAI
-except ImportError:  # pragma: no cover - fallback for older SDKs
-    OpenAI = None
+from services.answer_cache import get_answer_cache
+from services.cache import SQLiteCache, content_key
+from services.exports import get_exports
+from services.llm import get_llm_client, get_llm_gateway
+from services.streaming import STREAM_USAGE_BODY, CompletionStream, TextStream
+from services.template_registry import get_template_registry
+
+EXPLAIN_MODEL = "gpt-3.5-turbo"
+POLISH_MODEL = "gpt-3.5-turbo"
+POLISH_SYSTEM_PROMPT = "You are a legal drafting assistant. Provide educational outputs only."
+
+_generator = None
+_generator_lock = threading.Lock()
+
+def split_sections(markdown_text: str) -> List[str]:
+    """Split markdown before each '## ' heading; joining the parts gives back the text"""
+    sections, current = [], []
+    for line in markdown_text.splitlines(keepends=True):
+        if line.startswith('## ') and current:
+            sections.append(''.join(current))
+            current = []
+        current.append(line)
+    if current:
+        sections.append(''.join(current))
+    return sections
+
+def _keep_spacing(polished: str, original: str) -> str:
+    """Give a polished section the trailing blank lines of the original, so sections rejoin cleanly"""
+    return polished.strip() + original[len(original.rstrip()):]
+
+def _section_excerpt(section):
+    """Text of a retrieved section to quote in a prompt: its matching passages if it has them"""
+    passages = section.get('passages') or [section.get('text', '')]
+    return '\n...\n'.join(passages)
 
 class ContractGenerator:
     """Generates contracts from templates and natural language inputs"""
     
     def __init__(self):
-        self.templates_path: Path = Path(Config.TEMPLATES_DATA_PATH)
-        self.export_path: Path = Path(Config.EXPORT_FOLDER)
-        self.export_path.mkdir(parents=True, exist_ok=True)
-
-        self.openai_api_key = Config.OPENAI_API_KEY
-        self.client = None
-        if self.openai_api_key and OpenAI:
-            try:
-                self.client = OpenAI(api_key=self.openai_api_key)
-            except Exception as exc:
-                # Fail gracefully if SDK initialisation fails; downstream calls will use fallbacks
-                print(f"OpenAI client initialisation failed: {exc}")
-                self.client = None
+        self.templates = get_template_registry()
+        self.exports = get_exports()
+
+        # Shared, pooled client; None (no key or SDK) makes every call use its fallback
+        self.client = get_llm_client()
+        self._polish_executor = None
+        self.polish_cache = None
+        if Config.POLISH_CACHE_PATH:
+            self.polish_cache = SQLiteCache(
+                Config.POLISH_CACHE_PATH,
+                max_bytes=int(Config.POLISH_CACHE_MAX_MB * 1024 * 1024)
+            )
         
         # Jurisdiction profiles
         self.jurisdiction_profiles = {
@@ -55,13 +79,8 @@ class ContractGenerator:
     
     def generate(self, contract_type, parties, terms, jurisdiction='IN', language='en'):
         """Generate a contract"""
-        # Load template
-        template_path = self.templates_path / f"{contract_type.lower()}.md"
-        if not template_path.exists():
-            template_content = self._get_default_template(contract_type)
-        else:
-            with open(template_path, 'r', encoding='utf-8') as f:
-                template_content = f.read()
+        # Compiled template (recompiled only when its file changes)
+        template = self.templates.get(contract_type)
         
         # Get jurisdiction profile
         profile = self.jurisdiction_profiles.get(jurisdiction, self.jurisdiction_profiles['IN'])
@@ -86,7 +105,6 @@ class ContractGenerator:
         }
         
         # Render template
-        template = Template(template_content)
         rendered_markdown = template.render(**template_vars)
 
         # LLM polish (if API key available)
@@ -97,23 +115,11 @@ class ContractGenerator:
             except Exception as exc:
                 print(f"LLM polish failed: {exc}")
 
+        from markdown import markdown
         html_content = markdown(polished_markdown, extensions=["extra", "sane_lists"])
 
-        # Generate file paths
-        contract_id = uuid4().hex
-        html_path = self.export_path / f"contract_{contract_id}.html"
-        pdf_path = self.export_path / f"contract_{contract_id}.pdf"
-        docx_path = self.export_path / f"contract_{contract_id}.docx"
-
-        # Save HTML
-        with open(html_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-
-        # Generate PDF (using markdown text for readability)
-        self._generate_pdf(polished_markdown, pdf_path)
-
-        # Generate DOCX
-        self._generate_docx(polished_markdown, docx_path)
+        # Save the markdown and HTML; PDF and DOCX are rendered when first downloaded
+        digest = self.exports.save(polished_markdown, html_content)
         
         # Generate summary
         summary = {
@@ -128,9 +134,10 @@ class ContractGenerator:
         
         return {
             'html': html_content,
-            'html_path': str(html_path),
-            'pdf_path': str(pdf_path),
-            'docx_path': str(docx_path),
+            'html_path': str(self.exports.path(digest, 'html')),
+            'pdf_path': str(self.exports.path(digest, 'pdf')),
+            'docx_path': str(self.exports.path(digest, 'docx')),
+            'content_hash': digest,
             'summary': summary,
             'markdown': polished_markdown
         }
@@ -139,7 +146,62 @@ class ContractGenerator:
         """Explain a legal clause using RAG context"""
         if not context:
             context = []
+
+        # Use LLM if available, otherwise return a simple explanation
+        if self.client:
+            answer_cache = get_answer_cache()
+            cached = answer_cache.lookup('explain', text, jurisdiction) if answer_cache else None
+            if cached is not None:
+                return cached
+            try:
+                response = get_llm_gateway().chat_completion(
+                    self.client,
+                    deadline=Config.EXPLAIN_TIMEOUT,  # Fall back rather than keep the request hanging
+                    model=EXPLAIN_MODEL,
+                    messages=self._explain_messages(text, context),
+                    temperature=0.2,
+                    max_tokens=1000
+                )
+                explanation = response.choices[0].message.content
+                if answer_cache:
+                    answer_cache.store('explain', text, jurisdiction, explanation)
+                return explanation
+            except Exception as exc:
+                print(f"OpenAI API call failed: {exc}")
+                # Fall through to fallback response
         
+        return self._explain_fallback(text, context)
+    
+    def stream_explanation(self, text, context=None, language='en', jurisdiction='IN'):
+        """Explain a clause as a stream of text chunks (CompletionStream or TextStream)"""
+        if not context:
+            context = []
+
+        if self.client:
+            answer_cache = get_answer_cache()
+            cached = answer_cache.lookup('explain', text, jurisdiction) if answer_cache else None
+            if cached is not None:
+                return TextStream(cached)
+            try:
+                stream = get_llm_gateway().chat_completion(
+                    self.client,
+                    deadline=Config.EXPLAIN_TIMEOUT,
+                    model=EXPLAIN_MODEL,
+                    messages=self._explain_messages(text, context),
+                    temperature=0.2,
+                    max_tokens=1000,
+                    stream=True,
+                    extra_body=STREAM_USAGE_BODY
+                )
+                on_complete = (lambda answer: answer_cache.store('explain', text, jurisdiction, answer)) if answer_cache else None
+                return CompletionStream(stream, on_complete=on_complete)
+            except Exception as exc:
+                print(f"OpenAI streaming call failed: {exc}")
+        
+        return TextStream(self._explain_fallback(text, context))
+    
+    def _explain_messages(self, text, context):
+        """Chat messages asking the LLM to explain a query with the retrieved sections"""
         # Build context prompt
         context_text = ""
         if context:
@@ -147,7 +209,7 @@ class ContractGenerator:
             for section in context:
                 act = section.get('act_name', 'Unknown Act')
                 section_code = section.get('section_code', '')
-                content = section.get('content', '')
+                content = _section_excerpt(section)
                 context_text += f"\n{act} - {section_code}:\n{content}\n"
         
         prompt = f"""Explain the following legal query in plain language, focusing on Indian law:
@@ -158,31 +220,20 @@ Query: {text}
 Provide a clear, educational explanation. Include relevant legal provisions if available. 
 Remember: This is educational information only, not legal advice."""
 
-        # Use LLM if available, otherwise return a simple explanation
-        if self.client:
-            try:
-                response = self.client.chat.completions.create(
-                    model="gpt-3.5-turbo",
-                    messages=[
-                        {"role": "system", "content": "You are a legal assistant providing educational information about Indian laws. Always remind users to consult a lawyer for specific legal matters."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.2,
-                    max_tokens=1000,
-                    timeout=10  # Add timeout to prevent hanging
-                )
-                return response.choices[0].message.content
-            except Exception as exc:
-                print(f"OpenAI API call failed: {exc}")
-                # Fall through to fallback response
-        
+        return [
+            {"role": "system", "content": "You are a legal assistant providing educational information about Indian laws. Always remind users to consult a lawyer for specific legal matters."},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _explain_fallback(self, text, context):
+        """Explanation built from the retrieved sections alone, used without an LLM"""
         # Fallback: Return explanation based on context
         if context:
             explanations = []
             for section in context:
                 act = section.get('act_name', 'Unknown Act')
                 section_code = section.get('section_code', '')
-                content = section.get('content', '')
+                content = _section_excerpt(section)
                 explanations.append(f"According to {act}, {section_code}: {content}")
             
             return f"""Based on relevant legal sections, here's what you should know about "{text}":
@@ -196,111 +247,100 @@ Remember: This is educational information only, not legal advice."""
 **Important:** This is educational information only. For specific legal advice, please consult a qualified lawyer. You can also try rephrasing your question or being more specific about which law or act you're asking about."""
     
     def _polish_with_llm(self, content, contract_type, jurisdiction):
-        """Polish contract language using LLM"""
-        prompt = f"""Review and polish this {contract_type} contract for {jurisdiction} jurisdiction.
-Ensure legal consistency, proper terminology, and completeness.
-Return only the polished contract text, no additional commentary.
-
-Contract:
-{content[:3000]}
-"""
+        """Polish contract language using LLM, one '##' section at a time and in parallel"""
         if not self.client:
             return content
 
-        response = self.client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a legal drafting assistant. Provide educational outputs only."},
-                {"role": "user", "content": prompt}
-            ],
+        sections = split_sections(content)
+        executor = self._polish_pool()
+        # One deadline for the whole contract: sections still queued in the shared pool
+        # when it passes are skipped, running ones only get the time that is left
+        expires_at = time.monotonic() + Config.POLISH_TIMEOUT
+        futures = [
+            executor.submit(self._polish_section, section, contract_type, jurisdiction, expires_at)
+            if section.strip() else None
+            for section in sections
+        ]
+        done, _ = wait([f for f in futures if f is not None], timeout=Config.POLISH_TIMEOUT)
+
+        polished = []
+        for section, future in zip(sections, futures):
+            text = section
+            if future is not None and future in done and future.exception() is None and future.result():
+                text = _keep_spacing(future.result(), section)
+            elif future is not None:
+                # Keep the unpolished section if its call failed, replied empty or ran out of time
+                if future not in done:
+                    reason = 'timed out in the queue' if future.cancel() else 'timed out'
+                elif future.exception() is not None:
+                    reason = future.exception()
+                else:
+                    reason = 'empty reply'
+                print(f"LLM polish of section {section.strip().splitlines()[0][:60]!r} skipped: {reason}")
+            polished.append(text)
+        return ''.join(polished)
+
+    def _polish_section(self, section, contract_type, jurisdiction, expires_at=None):
+        """Polish one section of a contract, served from the polish cache when possible.
+
+        `expires_at` (time.monotonic()) bounds the LLM call; past it the section is not sent.
+        """
+        prompt = f"""Review and polish this section of a {contract_type} contract for {jurisdiction} jurisdiction.
+Ensure legal consistency, proper terminology, and completeness.
+Keep its markdown heading and formatting. Return only the polished section text, no additional commentary.
+
+Section:
+{section}
+"""
+        messages = [
+            {"role": "system", "content": POLISH_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        # The prompt embeds the rendered markdown, so identical sections share a key
+        cache_key = content_key(POLISH_MODEL, 0.2, 2000, messages)
+        if self.polish_cache is not None:
+            cached = self.polish_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        deadline = Config.POLISH_TIMEOUT if expires_at is None else expires_at - time.monotonic()
+        if deadline <= 0:
+            raise TimeoutError("polish deadline passed before the section was sent")
+        response = get_llm_gateway().chat_completion(
+            self.client,
+            deadline=deadline,
+            model=POLISH_MODEL,
+            messages=messages,
             temperature=0.2,
             max_tokens=2000
         )
-        return response.choices[0].message.content
-    
-    def _generate_pdf(self, markdown_content: str, pdf_path: Path):
-        """Generate PDF from markdown content"""
-        doc = SimpleDocTemplate(str(pdf_path), pagesize=letter)
-        styles = getSampleStyleSheet()
-        story = []
-
-        for line in self._markdown_to_plaintext_lines(markdown_content):
-            para = Paragraph(line, styles['Normal'])
-            story.append(para)
-            story.append(Spacer(1, 12))
-
-        doc.build(story)
-    
-    def _generate_docx(self, markdown_content: str, docx_path: Path):
-        """Generate DOCX from markdown content"""
-        doc = Document()
-        for line in self._markdown_to_plaintext_lines(markdown_content):
-            doc.add_paragraph(line)
-        doc.save(str(docx_path))
-
-    def _markdown_to_plaintext_lines(self, markdown_content: str):
-        """Convert markdown into human-readable lines for exports"""
-        lines = []
-        for raw_line in markdown_content.splitlines():
-            line = raw_line.strip()
-            if not line:
-                continue
-
-            # Headings
-            if line.startswith('#'):
-                line = line.lstrip('#').strip().upper()
-
-            # Bullet points
-            if line.startswith(('- ', '* ')):
-                line = f"• {line[2:].strip()}"
-
-            line = line.replace('**', '').replace('__', '')
-            lines.append(line)
-        return lines
-    
-    def _get_default_template(self, contract_type):
-        """Default template if file doesn't exist"""
-        return """# {contract_type} AGREEMENT
-
-**Date:** {{ effective_date }}
-
-## PARTIES
-{% for party in parties %}
-- {{ party }}
-{% endfor %}
-
-## CONSIDERATION
-{{ consideration }}
-
-## SCOPE OF WORK
-{{ scope }}
-
-## PAYMENT TERMS
-{{ payment }}
-
-## INTELLECTUAL PROPERTY
-{{ ip }}
-
-## CONFIDENTIALITY
-{{ confidentiality }}
-
-## TERMINATION
-{{ termination }}
-
-## GOVERNING LAW
-This agreement shall be governed by the laws of {{ governing_law }}.
-
-## DISPUTE RESOLUTION
-{{ dispute_resolution }}
-
-## SIGNATURES
-
-Party A: _________________    Date: _________
-
-Party B: _________________    Date: _________
-
----
-*This document is generated for educational purposes only. Consult a qualified lawyer for legal advice.*
-""".format(contract_type=contract_type.upper())
-
-
+        polished = response.choices[0].message.content
+        if polished and self.polish_cache is not None:
+            self.polish_cache.set(cache_key, polished)
+        return polished
+
+    def _polish_pool(self) -> ThreadPoolExecutor:
+        # Shared by all requests in this process, so POLISH_WORKERS bounds concurrent calls
+        if self._polish_executor is None:
+            with _generator_lock:
+                if self._polish_executor is None:
+                    self._polish_executor = ThreadPoolExecutor(
+                        max_workers=max(1, Config.POLISH_WORKERS),
+                        thread_name_prefix='llm-polish'
+                    )
+        return self._polish_executor
+
+
+def get_generator() -> ContractGenerator:
+    """Return the shared ContractGenerator, creating it on first use"""
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = ContractGenerator()
+    return _generator
+
+
+def peek_generator() -> Optional[ContractGenerator]:
+    """Return the shared generator only if it has already been created"""
+    return _generator
@@ -0,0 +1,182 @@
+import csv
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+# Columns a law CSV must have; the rest fall back to defaults when absent
+REQUIRED_COLUMNS = ('text',)
+OPTIONAL_COLUMNS = ('title', 'section_code', 'act_name', 'jurisdiction')
+
+
+class LawFileError(ValueError):
+    """A law CSV that cannot be loaded as a whole (e.g. a required column is missing)"""
+
+
+def content_hash(text: str, metadata: Dict[str, Any]) -> str:
+    """Stable hash of a section's indexed text and metadata"""
+    fields = {key: value for key, value in metadata.items() if key != 'content_hash'}
+    payload = json.dumps([text, fields], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class LawSection:
+    """One statutory section as read from a law CSV"""
+    id: str
+    title: str
+    section_code: str
+    jurisdiction: str
+    act_name: str
+    body: str
+    source: str
+
+    def __post_init__(self):
+        self.content_hash = content_hash(self.text, self._fields())
+
+    @property
+    def text(self) -> str:
+        """Document text that gets embedded and indexed"""
+        return f"{self.title} {self.body}"
+
+    def metadata(self) -> Dict[str, Any]:
+        """Index metadata for the section, including its content hash"""
+        metadata = self._fields()
+        metadata['content_hash'] = self.content_hash
+        return metadata
+
+    def passages(self, window: int, overlap: int = 0) -> List[Union['LawSection', 'LawPassage']]:
+        """Split the section into overlapping passages of at most `window` words.
+
+        A section that fits in one window is returned as is, keeping its id, so short
+        sections are indexed exactly as they were before chunking.
+        """
+        spans = split_passages(self.body, window, overlap)
+        if len(spans) <= 1:
+            return [self]
+        return [
+            LawPassage(section=self, index=index, start=start, body=body)
+            for index, (start, body) in enumerate(spans)
+        ]
+
+    def _fields(self) -> Dict[str, Any]:
+        return {
+            'section_code': self.section_code,
+            'jurisdiction': self.jurisdiction,
+            'act_name': self.act_name,
+            'title': self.title,
+            'source': self.source
+        }
+
+
+@dataclass
+class LawPassage:
+    """A window of a long section's text, indexed as its own document"""
+    section: LawSection
+    index: int
+    start: int
+    body: str
+
+    def __post_init__(self):
+        self.id = f"{self.section.id}#{self.index}"
+        self.content_hash = content_hash(self.text, self._fields())
+
+    @property
+    def text(self) -> str:
+        # Keep the title on every passage so each one embeds with the section's topic
+        return f"{self.section.title} {self.body}"
+
+    def metadata(self) -> Dict[str, Any]:
+        metadata = self._fields()
+        metadata['content_hash'] = self.content_hash
+        return metadata
+
+    def _fields(self) -> Dict[str, Any]:
+        fields = self.section._fields()
+        fields.update(section_id=self.section.id, passage=self.index, passage_start=self.start)
+        return fields
+
+
+def split_passages(text: str, window: int, overlap: int = 0) -> List[Tuple[int, str]]:
+    """Split text into (word offset, passage) windows of `window` words overlapping by `overlap`"""
+    words = text.split()
+    if window <= 0 or len(words) <= window:
+        return [(0, text)]
+    step = max(1, window - max(0, overlap))
+    spans = []
+    for start in range(0, len(words), step):
+        spans.append((start, ' '.join(words[start:start + window])))
+        if start + window >= len(words):
+            break
+    return spans
+
+
+def join_passages(passages: List[Tuple[int, str]]) -> str:
+    """Reassemble a section body from (word offset, passage) pairs, dropping the overlaps"""
+    words: List[str] = []
+    for start, body in sorted(passages):
+        passage_words = body.split()
+        words[start:start + len(passage_words)] = passage_words
+    return ' '.join(words)
+
+
+def iter_law_sections(laws_path: Path, failed_sources: Optional[set] = None) -> Iterator[LawSection]:
+    """Lazily yield a LawSection for every non-empty row of the law CSVs in `laws_path`.
+
+    A file that fails to load is reported and, if given, added to `failed_sources`.
+    """
+    # Ids are act + section + occurrence so they stay stable when rows are inserted elsewhere
+    occurrences: Dict[str, int] = {}
+
+    for file_path in sorted(Path(laws_path).glob("*.csv")):
+        try:
+            yield from iter_law_file(file_path, occurrences)
+        except Exception as e:
+            print(f"Error loading {file_path}: {e}")
+            if failed_sources is not None:
+                failed_sources.add(file_path.name)
+
+
+def iter_law_file(file_path: Path, occurrences: Optional[Dict[str, int]] = None) -> Iterator[LawSection]:
+    """Stream the sections of one law CSV, checking its header once up front"""
+    if occurrences is None:
+        occurrences = {}
+
+    with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = [column.strip() for column in next(reader, [])]
+        missing = [column for column in REQUIRED_COLUMNS if column not in header]
+        if missing:
+            raise LawFileError(f"missing column(s): {', '.join(missing)}")
+
+        # Resolve column positions once instead of building a dict per row
+        positions = {column: header.index(column) for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS if column in header}
+        text_at = positions['text']
+
+        for row in reader:
+            body = row[text_at] if text_at < len(row) else ''
+            # Skip empty rows
+            if not body.strip():
+                continue
+
+            def value(column: str, default: str) -> str:
+                at = positions.get(column)
+                cell = row[at].strip() if at is not None and at < len(row) else ''
+                return cell or default
+
+            act_name = value('act_name', file_path.stem)
+            section_code = value('section_code', '')
+            base_id = f"{act_name}_{section_code}"
+            occurrence = occurrences.get(base_id, 0)
+            occurrences[base_id] = occurrence + 1
+
+            yield LawSection(
+                id=f"{base_id}_{occurrence}",
+                title=value('title', ''),
+                section_code=section_code,
+                jurisdiction=value('jurisdiction', 'IN'),
+                act_name=act_name,
+                body=body,
+                source=file_path.name
+            )
@@ -0,0 +1,328 @@
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from config import Config
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_gateway: Optional['LLMGateway'] = None
+_gateway_pid = None
+
+
+def _create_client():
+    try:
+        import httpx
+        from openai import OpenAI
+    except ImportError:
+        return None
+
+    # One keep-alive pool per process: every LLM call reuses warm TLS connections
+    pool_size = max(1, Config.LLM_POOL_SIZE)
+    http_client = httpx.Client(limits=httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=Config.LLM_KEEPALIVE_SECONDS
+    ))
+    try:
+        # Retries are the gateway's job, so the SDK must not retry on its own as well
+        return OpenAI(api_key=Config.OPENAI_API_KEY, http_client=http_client, max_retries=0)
+    except Exception as e:
+        http_client.close()
+        print(f"OpenAI client initialisation failed: {e}")
+        return None
+
+
+def get_llm_client():
+    """Shared OpenAI client for this process, or None without an API key or the SDK.
+
+    The client is thread-safe. It is recreated after a fork so workers never share
+    sockets with the master.
+    """
+    global _client, _client_pid
+    if not Config.OPENAI_API_KEY:
+        return None
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = _create_client()
+                _client_pid = pid
+    return _client
+
+
+def reset_llm_client():
+    """Close and drop the shared client (used by tests and after config changes)"""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+
+def llm_client_stats() -> Dict[str, Any]:
+    gateway = _gateway if _gateway_pid == os.getpid() else None
+    return {
+        'configured': bool(Config.OPENAI_API_KEY),
+        'connected': _client is not None and _client_pid == os.getpid(),
+        'pool_size': Config.LLM_POOL_SIZE,
+        'gateway': gateway.stats() if gateway else None
+    }
+
+
+class LLMUnavailable(RuntimeError):
+    """The gateway refused a call: the circuit is open or no slot freed up in time"""
+
+
+def _retryable(exc: Exception) -> bool:
+    """Whether a failed call is worth another try (rate limit, server error, lost connection)"""
+    status = getattr(exc, 'status_code', None)
+    if status is not None:
+        return status == 429 or status >= 500
+    # The SDK's APITimeoutError subclasses APIConnectionError
+    return isinstance(exc, (ConnectionError, TimeoutError)) or any(
+        cls.__name__ == 'APIConnectionError' for cls in type(exc).__mro__
+    )
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    headers = getattr(getattr(exc, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _percentiles(samples) -> Dict[str, Optional[float]]:
+    """Nearest-rank p50/p95/p99 of durations in seconds, in milliseconds"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {'p50': None, 'p95': None, 'p99': None}
+    return {
+        f'p{p}': round(ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] * 1000, 1)
+        for p in (50, 95, 99)
+    }
+
+
+class LLMGateway:
+    """Concurrency limit, queue deadline, retries and circuit breaker for one process's LLM calls.
+
+    At most `max_concurrency` calls run at once; the others queue for up to `queue_timeout`
+    seconds. 429, 5xx and connection errors are retried with jittered exponential backoff
+    within the call's deadline. After `breaker_threshold` consecutive failed calls the
+    circuit opens and calls fail fast with LLMUnavailable, so callers go straight to their
+    non-LLM fallbacks. After `breaker_reset` seconds one trial call is let through, and its
+    success closes the circuit again.
+    """
+
+    def __init__(self, max_concurrency: int = 8, queue_timeout: float = 5.0, timeout: float = 30.0,
+                 max_retries: int = 2, retry_backoff: float = 0.5, breaker_threshold: int = 5,
+                 breaker_reset: float = 30.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.breaker_threshold = max(1, breaker_threshold)
+        self.breaker_reset = breaker_reset
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.queue_timeouts = 0
+        self.waiting = 0
+        self.in_flight = 0
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._latencies: deque = deque(maxlen=1000)
+        self._queue_waits: deque = deque(maxlen=1000)
+
+    def chat_completion(self, client, deadline: Optional[float] = None, **kwargs):
+        """client.chat.completions.create(**kwargs) under the gateway's limits.
+
+        `deadline` is the total number of seconds allowed, queueing and retries included
+        (default LLM_TIMEOUT); each attempt gets what is left as its timeout. A stream
+        (stream=True) holds its slot until it is closed or fully read.
+        """
+        started = time.monotonic()
+        expires_at = started + (deadline or self.timeout)
+        with self._lock:
+            self.calls += 1
+        self._admit()
+        self._acquire(expires_at)
+        release = True
+        try:
+            attempt = 0
+            while True:
+                try:
+                    result = client.chat.completions.create(
+                        timeout=max(0.1, expires_at - time.monotonic()), **kwargs
+                    )
+                    break
+                except Exception as exc:
+                    if not _retryable(exc):
+                        # e.g. a bad request: upstream answered, so it says nothing about its health
+                        self._record(True)
+                        raise
+                    delay = self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                    delay = max(delay, _retry_after(exc) or 0)
+                    if attempt >= self.max_retries or time.monotonic() + delay >= expires_at:
+                        self._record(False)
+                        raise
+                    attempt += 1
+                    with self._lock:
+                        self.retries += 1
+                    time.sleep(delay)
+            latency = time.monotonic() - started
+            if kwargs.get('stream'):
+                # Judged once it has been read: a stream can still break after it opens
+                release = False
+                return _GovernedStream(result, self._release, lambda success: self._record(success, latency))
+            self._record(True, latency)
+            return result
+        finally:
+            if release:
+                self._release()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        return 'half-open' if self._trial or time.monotonic() - self._opened_at >= self.breaker_reset else 'open'
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = list(self._latencies)
+            queue_waits = list(self._queue_waits)
+            stats = {
+                'state': self.state,
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self.in_flight,
+                'queue_depth': self.waiting,
+                'calls': self.calls,
+                'retries': self.retries,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'queue_timeouts': self.queue_timeouts
+            }
+        stats['latency_ms'] = _percentiles(latencies)
+        stats['queue_wait_ms'] = _percentiles(queue_waits)
+        return stats
+
+    def _admit(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._trial or time.monotonic() - self._opened_at < self.breaker_reset:
+                self.rejected += 1
+                raise LLMUnavailable("LLM circuit is open after repeated upstream failures")
+            # Half-open: this call is the trial, everyone else keeps failing fast
+            self._trial = True
+
+    def _acquire(self, expires_at: float):
+        started = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=max(0.0, min(self.queue_timeout, expires_at - started)))
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        with self._lock:
+            if not acquired:
+                self.queue_timeouts += 1
+                self._trial = False
+                raise LLMUnavailable(f"No LLM slot free after {time.monotonic() - started:.1f}s")
+            self.in_flight += 1
+            self._queue_waits.append(time.monotonic() - started)
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def _record(self, success: bool, latency: Optional[float] = None):
+        with self._lock:
+            self._trial = False
+            if success:
+                self._consecutive_failures = 0
+                self._opened_at = None
+                if latency is not None:
+                    self._latencies.append(latency)
+                return
+            self.failures += 1
+            self._consecutive_failures += 1
+            if self._opened_at is not None or self._consecutive_failures >= self.breaker_threshold:
+                if self._opened_at is None:
+                    print(f"LLM circuit opened after {self._consecutive_failures} failed calls")
+                self._opened_at = time.monotonic()
+
+
+class _GovernedStream:
+    """An SDK stream that gives its gateway slot back, and reports its outcome, once closed or fully read"""
+
+    def __init__(self, stream, release, record):
+        self._stream = stream
+        self._release = release
+        self._record = record
+        self._released = False
+        self._release_lock = threading.Lock()
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        except Exception:
+            self._give_back(success=False)
+            raise
+        finally:
+            self._give_back()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def close(self):
+        try:
+            close = getattr(self._stream, 'close', None)
+            if callable(close):
+                close()
+            elif getattr(self._stream, 'response', None) is not None:
+                self._stream.response.close()
+        finally:
+            self._give_back()
+
+    def _give_back(self, success: bool = True):
+        with self._release_lock:
+            if self._released:
+                return
+            self._released = True
+        self._record(success)
+        self._release()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Shared gateway for this process; recreated after a fork like the client"""
+    global _gateway, _gateway_pid
+    pid = os.getpid()
+    if _gateway is None or _gateway_pid != pid:
+        with _client_lock:
+            if _gateway is None or _gateway_pid != pid:
+                _gateway = LLMGateway(
+                    max_concurrency=Config.LLM_MAX_CONCURRENCY,
+                    queue_timeout=Config.LLM_QUEUE_TIMEOUT,
+                    timeout=Config.LLM_TIMEOUT,
+                    max_retries=Config.LLM_MAX_RETRIES,
+                    retry_backoff=Config.LLM_RETRY_BACKOFF,
+                    breaker_threshold=Config.LLM_BREAKER_THRESHOLD,
+                    breaker_reset=Config.LLM_BREAKER_RESET
+                )
+                _gateway_pid = pid
+    return _gateway
@@ -1,29 +1,18 @@
+import importlib.util
 from typing import Dict, Any
 
-# Optional imports - service will work without OCR dependencies
-try:
-    import pytesseract
-    PYTESSERACT_AVAILABLE = True
-except ImportError:
-    PYTESSERACT_AVAILABLE = False
+# Optional imports - service will work without OCR dependencies. They are only located
+# here and imported on first use: easyocr alone pulls in torch.
+def _installed(module: str) -> bool:
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
 
-try:
-    from PIL import Image
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
-
-try:
-    import fitz  # PyMuPDF
-    PYMUPDF_AVAILABLE = True
-except ImportError:
-    PYMUPDF_AVAILABLE = False
-
-try:
-    import easyocr
-    EASYOCR_AVAILABLE = True
-except ImportError:
-    EASYOCR_AVAILABLE = False
+PYTESSERACT_AVAILABLE = _installed('pytesseract')
+PIL_AVAILABLE = _installed('PIL')
+PYMUPDF_AVAILABLE = _installed('fitz')  # PyMuPDF
+EASYOCR_AVAILABLE = _installed('easyocr')
 
 class OCRService:
     """OCR service for scanned documents"""
@@ -52,6 +41,7 @@ class OCRService:
             if not PYMUPDF_AVAILABLE:
                 return "PyMuPDF not available."
             
+            import fitz
             doc = fitz.open(file_path)
             all_text = []
             
@@ -85,6 +75,8 @@ class OCRService:
             else:
                 if not PYTESSERACT_AVAILABLE or not PIL_AVAILABLE:
                     return "Tesseract or PIL not available."
+                import pytesseract
+                from PIL import Image
                 img = Image.open(file_path)
                 return pytesseract.image_to_string(img)
         except Exception as e:
@@ -97,12 +89,14 @@ class OCRService:
                 return "EasyOCR or PIL not available."
             
             if self.reader is None:
+                import easyocr
                 self.reader = easyocr.Reader(['en', 'hi'])  # English and Hindi
             
             # EasyOCR expects file path or numpy array
             # For in-memory, we'd need to convert bytes to PIL Image first
             import io
             import numpy as np
+            from PIL import Image
             img = Image.open(io.BytesIO(img_data))
             img_array = np.array(img)
             
@@ -118,6 +112,7 @@ class OCRService:
                 return "EasyOCR not available."
             
             if self.reader is None:
+                import easyocr
                 self.reader = easyocr.Reader(['en', 'hi'])
             
             results = self.reader.readtext(file_path)
@@ -132,6 +127,8 @@ class OCRService:
                 return "Tesseract or PIL not available."
             
             import io
+            import pytesseract
+            from PIL import Image
             img = Image.open(io.BytesIO(img_data))
             return pytesseract.image_to_string(img)
         except Exception as e:
@@ -0,0 +1,8 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def pdf_styles():
+    """reportlab's sample stylesheet, built once per process and shared by every PDF export"""
+    from reportlab.lib.styles import getSampleStyleSheet
+    return getSampleStyleSheet()
@@ -1,11 +1,255 @@
 import os
 import json
+import heapq
+import math
+import re
+import shutil
+import threading
+import time
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
 from config import Config
-import chromadb
-from sentence_transformers import SentenceTransformer
-import pandas as pd
+from services.cache import LRUCache
+from services.embedding_server import EmbeddingClient, EmbeddingServerError
+from services.embedding_artifacts import EmbeddingArtifact, corpus_hash, write_artifact
+from services.law_loader import LawPassage, LawSection, content_hash, iter_law_sections, join_passages, split_passages
+from services.vector_store import IndexGenerations, create_vector_store
+import numpy as np
+
+# Metadata `source` for sections added through add_section(); a CSV sync never deletes these
+MANUAL_SOURCE = 'manual'
+
+SEARCH_MODES = ('dense', 'lexical', 'hybrid')
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_CITATION_PREFIX_RE = re.compile(r"^(?:section|sec\.?|s\.|article|art\.?|rule|order)\s*")
+_CITATION_RE = re.compile(r"\b(?:section|sec\.?|s\.|article|art\.?|rule|order)\s*(\d+[a-z]*(?:\s*\([a-z0-9]+\))*)")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens used by the lexical index"""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def normalise_citation(section_code: str) -> str:
+    """Reduce a section code like 'Section 2(h)' to its bare reference '2(h)'"""
+    code = _CITATION_PREFIX_RE.sub('', str(section_code or '').strip().lower())
+    return code.replace(' ', '')
+
+
+def extract_citations(query: str) -> List[str]:
+    """Section references named in a free-text query"""
+    return [match.replace(' ', '') for match in _CITATION_RE.findall(query.lower())]
+
+
+def _format_section(text: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Shape an indexed document the way search() callers expect"""
+    metadata = metadata or {}
+    return {
+        'text': text,
+        'section_code': metadata.get('section_code', ''),
+        'jurisdiction': metadata.get('jurisdiction', 'IN'),
+        'act_name': metadata.get('act_name', ''),
+        'title': metadata.get('title', ''),
+        'distance': None
+    }
+
+
+def _normalise_query(query: str) -> str:
+    """Collapse whitespace so trivially different spellings share cache entries"""
+    return ' '.join(query.split())
+
+
+def _min_max(scores: Dict[str, float]) -> Dict[str, float]:
+    """Scale scores into [0, 1]; a single score maps to 1"""
+    if not scores:
+        return {}
+    low, high = min(scores.values()), max(scores.values())
+    if high == low:
+        return {key: 1.0 for key in scores}
+    return {key: (value - low) / (high - low) for key, value in scores.items()}
+
+
+@lru_cache(maxsize=None)
+def load_embedding_model(model_name: str):
+    """Load a sentence-transformers model once per process; the library (and torch) is
+    imported on first use. Loaded before a fork, the model is shared by every worker."""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+class _IndexProgress:
+    """Prints embedding progress and throughput while the index is being written"""
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.written = 0
+    
+    def update(self, count: int):
+        self.written += count
+        elapsed = time.perf_counter() - self.started
+        print(f"  embedded {self.written} sections ({self.rate(elapsed):.1f} sections/s)")
+    
+    def rate(self, elapsed: float) -> float:
+        return self.written / elapsed if elapsed > 0 else 0.0
+    
+    def summary(self) -> str:
+        if not self.written:
+            return ""
+        elapsed = time.perf_counter() - self.started
+        return f" in {elapsed:.1f}s ({self.rate(elapsed):.1f} sections/s)"
+
+
+class LexicalIndex:
+    """In-memory BM25 inverted index over the same section texts as the vector store"""
+    
+    K1 = 1.5
+    B = 0.75
+    
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.citations: Dict[str, set] = {}
+        self.total_length = 0
+        self.dirty = False
+        self._lock = threading.RLock()
+    
+    def __len__(self) -> int:
+        return len(self.docs)
+    
+    def content_hash(self, doc_id: str) -> Optional[str]:
+        doc = self.docs.get(doc_id)
+        return doc['metadata'].get('content_hash') if doc else None
+    
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        return self.docs.get(doc_id)
+    
+    def add(self, doc_id: str, text: str, metadata: Dict[str, Any]):
+        """Index (or re-index) a document"""
+        with self._lock:
+            self.remove(doc_id)
+            terms = self._terms(text, metadata)
+            counts: Dict[str, int] = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, count in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = count
+            
+            self.docs[doc_id] = {'text': text, 'metadata': dict(metadata)}
+            self.doc_lengths[doc_id] = len(terms)
+            self.total_length += len(terms)
+            self._add_citation(doc_id, metadata)
+            self.dirty = True
+    
+    def remove(self, doc_id: str):
+        """Drop a document from the index if present"""
+        with self._lock:
+            doc = self.docs.pop(doc_id, None)
+            if doc is None:
+                return
+            for term in set(self._terms(doc['text'], doc['metadata'])):
+                postings = self.postings.get(term)
+                if postings is not None:
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self.postings[term]
+            self.total_length -= self.doc_lengths.pop(doc_id, 0)
+            citation = normalise_citation(doc['metadata'].get('section_code', ''))
+            if citation in self.citations:
+                self.citations[citation].discard(doc_id)
+                if not self.citations[citation]:
+                    del self.citations[citation]
+            self.dirty = True
+    
+    def search(self, query: str, jurisdiction: Optional[str] = None, limit: int = 5) -> List[tuple]:
+        """Return (doc_id, score) pairs ranked by BM25, best first"""
+        with self._lock:
+            if not self.docs:
+                return []
+            total_docs = len(self.docs)
+            avg_length = self.total_length / total_docs or 1.0
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (total_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, freq in postings.items():
+                    norm = self.K1 * (1 - self.B + self.B * self.doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (self.K1 + 1) / (freq + norm)
+            
+            if jurisdiction:
+                scores = {
+                    doc_id: score for doc_id, score in scores.items()
+                    if self.docs[doc_id]['metadata'].get('jurisdiction') == jurisdiction
+                }
+            return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+    
+    def search_citations(self, query: str, jurisdiction: Optional[str] = None, limit: int = 5) -> List[tuple]:
+        """Resolve section citations in the query ("Section 73", "s. 2(h)") straight from the index"""
+        with self._lock:
+            matches = set()
+            for citation in extract_citations(query):
+                matches.update(self.citations.get(citation, ()))
+            if jurisdiction:
+                matches = {
+                    doc_id for doc_id in matches
+                    if self.docs[doc_id]['metadata'].get('jurisdiction') == jurisdiction
+                }
+            if not matches:
+                return []
+            # Rank the cited sections by how well the rest of the query matches them
+            ranked = dict(self.search(query, jurisdiction, limit=len(self.docs)))
+            scored = ((doc_id, ranked.get(doc_id, 0.0)) for doc_id in matches)
+            return heapq.nlargest(limit, scored, key=lambda item: item[1])
+    
+    def load(self) -> bool:
+        """Load the persisted index; returns False if there is nothing usable on disk"""
+        if not self.path or not self.path.exists():
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self._lock:
+                self.docs = data['docs']
+                self.postings = data['postings']
+                self.doc_lengths = data['doc_lengths']
+                self.total_length = sum(self.doc_lengths.values())
+                self.citations = {}
+                for doc_id, doc in self.docs.items():
+                    self._add_citation(doc_id, doc['metadata'])
+                self.dirty = False
+            return True
+        except Exception as exc:
+            print(f"Failed loading lexical index: {exc}")
+            return False
+    
+    def save(self):
+        """Persist the index next to the vector store"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {'docs': self.docs, 'postings': self.postings, 'doc_lengths': self.doc_lengths}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+    
+    @staticmethod
+    def _terms(text: str, metadata: Dict[str, Any]) -> List[str]:
+        # Act name and section code are searchable alongside the section text
+        return tokenize(f"{metadata.get('act_name', '')} {metadata.get('section_code', '')} {text}")
+    
+    def _add_citation(self, doc_id: str, metadata: Dict[str, Any]):
+        citation = normalise_citation(metadata.get('section_code', ''))
+        if citation:
+            self.citations.setdefault(citation, set()).add(doc_id)
+
 
 class KnowledgeRetrieval:
     """RAG-based knowledge retrieval for legal sections"""
@@ -14,121 +258,608 @@ class KnowledgeRetrieval:
         self.laws_path = Config.LAWS_DATA_PATH
         self.vector_db_path = Config.VECTOR_DB_PATH
         self.embedding_model_name = Config.EMBEDDING_MODEL
+        self.embedding_artifact_path = Config.EMBEDDING_ARTIFACT_PATH
+        self.embedding_batch_size = Config.EMBEDDING_BATCH_SIZE
+        self.index_chunk_size = Config.INDEX_CHUNK_SIZE
+        self.search_mode = Config.RETRIEVAL_MODE
+        self.hybrid_alpha = Config.HYBRID_ALPHA
+        self.passage_window = Config.PASSAGE_WINDOW
+        self.passage_overlap = Config.PASSAGE_OVERLAP
+        self._write_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
         
-        # Initialize embedding model
-        self.embedding_model = SentenceTransformer(self.embedding_model_name)
+        # Query caches. Cached results are keyed by index generation, which every
+        # write bumps, so a reindex or add_section() invalidates them.
+        self.generation = 0
+        self._embedding_cache = LRUCache(Config.EMBEDDING_CACHE_SIZE)
+        self._result_cache = LRUCache(Config.SEARCH_CACHE_SIZE, ttl=Config.SEARCH_CACHE_TTL)
         
-        # Initialize ChromaDB
-        self.client = chromadb.PersistentClient(path=str(self.vector_db_path))
-        self.collection = self._get_or_create_collection()
+        # Initialize embedding model. With a shared embedding server configured the local
+        # copy is only loaded if the server cannot be reached.
+        self._embedding_model = None
+        self._model_lock = threading.Lock()
+        self.embedding_client = None
+        if Config.EMBEDDING_SERVER_SOCKET:
+            self.embedding_client = EmbeddingClient(
+                Config.EMBEDDING_SERVER_SOCKET,
+                self.embedding_model_name,
+                timeout=Config.EMBEDDING_SERVER_TIMEOUT
+            )
+        else:
+            self._embedding_model = load_embedding_model(self.embedding_model_name)
+        
+        # Open the active index generation; forced rebuilds go into a shadow generation
+        # that is swapped in once complete, so searches never see a partial index
+        self.vector_backend = Config.VECTOR_BACKEND
+        self.generations = IndexGenerations(self.vector_db_path)
+        self._index_stamp = self.generations.stamp()
+        self.index_path = self.generations.active_path()
+        self.collection, self.lexical_index = self._open_index(self.index_path)
         
         # Load laws if not already indexed
-        self._load_and_index_laws(force_reindex)
+        self.index_stats = self._load_and_index_laws(force_reindex)
+        if len(self.lexical_index) == 0 and self.collection.count() > 0:
+            self._rebuild_lexical_index()
     
-    def _get_or_create_collection(self):
-        """Get or create ChromaDB collection"""
+    def _open_index(self, path: Path):
+        """Open the vector store (Chroma or memory-mapped NumPy, optionally partitioned) and
+        the BM25 index persisted next to it"""
+        collection = create_vector_store(
+            path,
+            backend=self.vector_backend,
+            quantize=Config.VECTOR_QUANTIZE,
+            partition_by=Config.VECTOR_PARTITION_BY
+        )
+        lexical_index = LexicalIndex(Path(path) / 'lexical_index.json')
+        lexical_index.load()
+        return collection, lexical_index
+    
+    def _load_and_index_laws(self, force: bool = False) -> Dict[str, int]:
+        """Sync the index with the CSV sources, touching only rows whose content changed"""
+        # A first build or an unforced sync edits the live index in place; a first build
+        # has nothing to serve yet
+        if not force or self.collection.count() == 0:
+            return self._sync(self.collection, self.lexical_index)
+        return self._rebuild_generation()
+    
+    def _rebuild_generation(self) -> Dict[str, int]:
+        """Sync a copy of the live index in a shadow generation, then promote it atomically.
+        
+        The live index keeps serving searches throughout; the generation it replaces is
+        kept for rollback().
+        """
+        name = self.generations.create()
+        path = self.generations.path(name)
         try:
-            return self.client.get_collection("law_sections")
-        except:
-            return self.client.create_collection("law_sections")
-    
-    def _load_and_index_laws(self, force: bool = False):
-        """Load law sections from CSV/JSON and index them"""
-        # Check if already indexed
-        if not force and self.collection.count() > 0:
+            # Start from a copy of the live index so unchanged sections are not re-embedded
+            collection, lexical_index = self._open_index(path)
+            self._copy_vectors(self.collection, collection)
+            if self.lexical_index.path.exists():
+                shutil.copyfile(self.lexical_index.path, lexical_index.path)
+                lexical_index.load()
+            stats = self._sync(collection, lexical_index)
+        except Exception:
+            self.generations.discard(name)
+            raise
+        
+        if not (stats['added'] or stats['updated'] or stats['deleted']):
+            # Nothing changed: keep the live generation (and the rollback target) as they are
+            self.generations.discard(name)
+            return stats
+        
+        self.generations.promote(name)
+        self._swap_index(path, collection, lexical_index)
+        self.generations.prune()
+        print(f"Promoted index generation {name}")
+        return stats
+    
+    def _copy_vectors(self, source, target):
+        """Copy every document and its embedding from one vector store into another"""
+        total = source.count()
+        for offset in range(0, total, self.index_chunk_size):
+            page = source.get(
+                include=['documents', 'metadatas', 'embeddings'],
+                limit=self.index_chunk_size,
+                offset=offset
+            )
+            if page['ids']:
+                target.upsert(
+                    ids=page['ids'],
+                    embeddings=np.asarray(page['embeddings'], dtype=np.float64).tolist(),
+                    documents=page['documents'],
+                    metadatas=page['metadatas']
+                )
+    
+    def _swap_index(self, path: Path, collection, lexical_index):
+        self.index_path = path
+        self.lexical_index = lexical_index
+        self.collection = collection
+        self._index_stamp = self.generations.stamp()
+        self.generation += 1
+    
+    def _refresh_index(self):
+        """Pick up a generation promoted or rolled back by another process"""
+        if self.generations.stamp() == self._index_stamp:
             return
+        # Never make a search wait: if another thread is already switching, keep serving
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            stamp = self.generations.stamp()
+            path = self.generations.active_path()
+            if path != self.index_path:
+                self._swap_index(path, *self._open_index(path))
+            self._index_stamp = stamp
+        finally:
+            self._refresh_lock.release()
+    
+    def _sync(self, collection, lexical_index: 'LexicalIndex') -> Dict[str, int]:
+        """Bring one vector store and lexical index in line with the CSV sources"""
+        # Hashes of what is currently indexed, keyed by document id
+        indexed = self._get_indexed_metadata(collection)
+        stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'deleted': 0, 'precomputed': 0}
+        artifact = self._load_embedding_artifact()
+        seen_ids = set()
+        seen_sections = set()
+        failed_sources = set()
+        pending = []
+        progress = _IndexProgress()
         
-        if force:
-            try:
-                existing_ids = self.collection.get()['ids']
-                if existing_ids:
-                    self.collection.delete(ids=existing_ids)
-            except Exception as exc:
-                print(f"Failed clearing existing index: {exc}")
-        
-        # Load from CSV files
-        law_files = list(self.laws_path.glob("*.csv"))
-        all_sections = []
+        for section in iter_law_sections(self.laws_path, failed_sources):
+            # The lexical index holds whole sections, the vector store their passages
+            seen_sections.add(section.id)
+            if lexical_index.content_hash(section.id) != section.content_hash:
+                lexical_index.add(section.id, section.text, section.metadata())
+            
+            for document in section.passages(self.passage_window, self.passage_overlap):
+                seen_ids.add(document.id)
+                current = indexed.get(document.id)
+                if (
+                    current
+                    and current.get('content_hash') == document.content_hash
+                    and current.get('embedding_model') == self.embedding_model_name
+                ):
+                    stats['unchanged'] += 1
+                    continue
+                stats['updated' if current else 'added'] += 1
+                pending.append(document)
+            
+            # Flush in bounded chunks so memory doesn't grow with the corpus
+            if len(pending) >= self.index_chunk_size:
+                stats['precomputed'] += self._write_sections(pending, artifact, collection)
+                progress.update(len(pending))
+                pending = []
         
-        for file_path in law_files:
+        if pending:
+            stats['precomputed'] += self._write_sections(pending, artifact, collection)
+            progress.update(len(pending))
+        
+        # Drop rows that disappeared from the CSVs. Manually added sections are kept, and
+        # so are rows from files that failed to load this time round.
+        stale_ids = [
+            doc_id for doc_id, metadata in indexed.items()
+            if doc_id not in seen_ids
+            and metadata.get('source') != MANUAL_SOURCE
+            and metadata.get('source') not in failed_sources
+        ]
+        for start in range(0, len(stale_ids), self.index_chunk_size):
+            collection.delete(ids=stale_ids[start:start + self.index_chunk_size])
+        stats['deleted'] = len(stale_ids)
+        
+        for doc_id, doc in list(lexical_index.docs.items()):
+            source = doc['metadata'].get('source')
+            if doc_id not in seen_sections and source != MANUAL_SOURCE and source not in failed_sources:
+                lexical_index.remove(doc_id)
+        if lexical_index.dirty:
+            lexical_index.save()
+        
+        print(
+            f"Indexed law sections: {stats['added']} added, {stats['updated']} updated, "
+            f"{stats['deleted']} deleted, {stats['unchanged']} unchanged "
+            f"({stats['precomputed']} precomputed embeddings used){progress.summary()}"
+        )
+        return stats
+    
+    def _write_sections(self, sections: List[Union[LawSection, LawPassage]],
+                        artifact: Optional[EmbeddingArtifact] = None, collection=None) -> int:
+        """Embed a chunk of sections or passages with the configured model and upsert them.
+        
+        Embeddings found in `artifact` for an unchanged document are used as is; only the
+        rest are encoded. Returns how many came from the artifact.
+        """
+        embeddings = [None] * len(sections)
+        metadatas = []
+        for i, section in enumerate(sections):
+            metadatas.append(dict(section.metadata(), embedding_model=self.embedding_model_name))
+            if artifact is not None:
+                embeddings[i] = artifact.lookup(section.id, section.content_hash)
+        
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if missing:
+            for i, embedding in zip(missing, self._embed([sections[i].text for i in missing])):
+                embeddings[i] = embedding
+        
+        (collection or self.collection).upsert(
+            ids=[s.id for s in sections],
+            embeddings=embeddings,
+            documents=[s.text for s in sections],
+            metadatas=metadatas
+        )
+        return len(sections) - len(missing)
+    
+    def _load_embedding_artifact(self) -> Optional[EmbeddingArtifact]:
+        """Open the precomputed embeddings for the configured model, if any were shipped"""
+        artifact = EmbeddingArtifact.load(self.embedding_artifact_path, self.embedding_model_name)
+        if artifact is None:
+            return None
+        if artifact.csv_hash == corpus_hash(self.laws_path):
+            print(f"Using precomputed embeddings for {len(artifact)} sections")
+        else:
+            # Sections that did not change since the build still match by content hash
+            print("Precomputed embeddings are from older law CSVs; changed sections will be re-embedded")
+        return artifact
+    
+    @property
+    def embedding_model(self):
+        """In-process embedding model, loaded on first use"""
+        if self._embedding_model is None:
+            with self._model_lock:
+                if self._embedding_model is None:
+                    self._embedding_model = load_embedding_model(self.embedding_model_name)
+        return self._embedding_model
+    
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        """Encode texts with the configured embedding model in batches"""
+        if self.embedding_client is not None and self.embedding_client.available():
             try:
-                df = pd.read_csv(file_path)
-                for idx, row in df.iterrows():
-                    # Skip empty rows
-                    if pd.isna(row.get('text', '')) or str(row.get('text', '')).strip() == '':
-                        continue
-                    
-                    section_text = f"{row.get('title', '')} {row.get('text', '')}"
-                    section_code = row.get('section_code', '')
-                    jurisdiction = row.get('jurisdiction', 'IN')
-                    act_name = row.get('act_name', file_path.stem)
-                    title = row.get('title', '')
-                    
-                    # Create unique ID: act_name + section_code + row_index to handle duplicates
-                    unique_id = f"{act_name}_{section_code}_{idx}"
-                    
-                    all_sections.append({
-                        'id': unique_id,
-                        'text': section_text,
-                        'metadata': {
-                            'section_code': section_code,
-                            'jurisdiction': jurisdiction,
-                            'act_name': act_name,
-                            'title': title
-                        }
-                    })
-            except Exception as e:
-                print(f"Error loading {file_path}: {e}")
-        
-        # Index in ChromaDB
-        if all_sections:
-            self.collection.add(
-                ids=[s['id'] for s in all_sections],
-                documents=[s['text'] for s in all_sections],
-                metadatas=[s['metadata'] for s in all_sections]
+                return self.embedding_client.encode(texts).tolist()
+            except EmbeddingServerError as e:
+                print(f"Embedding server unavailable, encoding in-process: {e}")
+        vectors = self.embedding_model.encode(
+            texts,
+            batch_size=self.embedding_batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return vectors.tolist()
+    
+    def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed search queries in one batch, reusing embeddings of identical earlier queries"""
+        keys = [_normalise_query(query) for query in queries]
+        embeddings = [self._embedding_cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, embedding in zip(keys, embeddings) if embedding is None))
+        if missing:
+            fresh = dict(zip(missing, self._embed(missing)))
+            for key, embedding in fresh.items():
+                self._embedding_cache.set(key, embedding)
+            embeddings = [embedding if embedding is not None else fresh[key] for key, embedding in zip(keys, embeddings)]
+        return embeddings
+    
+    def _get_indexed_metadata(self, collection=None) -> Dict[str, Dict[str, Any]]:
+        """Return the sync-relevant metadata of every indexed document keyed by id"""
+        collection = collection or self.collection
+        indexed = {}
+        total = collection.count()
+        for offset in range(0, total, self.index_chunk_size):
+            page = collection.get(
+                include=['metadatas'],
+                limit=self.index_chunk_size,
+                offset=offset
             )
-            print(f"Indexed {len(all_sections)} law sections")
+            for doc_id, metadata in zip(page['ids'], page['metadatas']):
+                metadata = metadata or {}
+                indexed[doc_id] = {
+                    key: metadata.get(key)
+                    for key in ('content_hash', 'embedding_model', 'source')
+                }
+        return indexed
     
-    def search(self, query: str, jurisdiction: str = 'IN', limit: int = 5) -> List[Dict]:
-        """Search for relevant law sections"""
-        # Query ChromaDB
+    def _rebuild_lexical_index(self):
+        """Populate the lexical index from documents already in the vector store"""
+        passages: Dict[str, list] = {}
+        section_metadata: Dict[str, Dict[str, Any]] = {}
+        total = self.collection.count()
+        for offset in range(0, total, self.index_chunk_size):
+            page = self.collection.get(
+                include=['documents', 'metadatas'],
+                limit=self.index_chunk_size,
+                offset=offset
+            )
+            for doc_id, doc, metadata in zip(page['ids'], page['documents'], page['metadatas']):
+                metadata = metadata or {}
+                section_id = metadata.get('section_id')
+                if not section_id:
+                    self.lexical_index.add(doc_id, doc or '', metadata)
+                    continue
+                # Passages of a long section: stitch the section back together below
+                title = metadata.get('title', '')
+                body = (doc or '')[len(title) + 1:] if (doc or '').startswith(f"{title} ") else (doc or '')
+                passages.setdefault(section_id, []).append((metadata.get('passage_start', 0), body))
+                section_metadata[section_id] = metadata
+        
+        for section_id, spans in passages.items():
+            metadata = {
+                key: value for key, value in section_metadata[section_id].items()
+                if key not in ('section_id', 'passage', 'passage_start', 'content_hash')
+            }
+            text = f"{metadata.get('title', '')} {join_passages(spans)}"
+            self.lexical_index.add(section_id, text, metadata)
+        self.lexical_index.save()
+    
+    def search(self, query: str, jurisdiction: str = 'IN', limit: int = 5, mode: Optional[str] = None) -> List[Dict]:
+        """Search for relevant law sections.
+        
+        `mode` is 'dense' (embedding similarity), 'lexical' (BM25) or 'hybrid' (both, fused)
+        and defaults to Config.RETRIEVAL_MODE. In lexical and hybrid mode a query that cites a
+        section ("Section 73") is answered straight from the lexical index.
+        """
+        return self.search_many([query], jurisdiction=jurisdiction, limit=limit, mode=mode)[0]
+    
+    def search_many(self, queries: List[str], jurisdiction: str = 'IN', limit: int = 5,
+                    mode: Optional[str] = None) -> List[List[Dict]]:
+        """Search for several queries at once, returning one result list per query in order.
+        
+        Uncached queries are embedded in a single batch and sent to the vector store as one
+        query, instead of one embed and one round trip per query.
+        """
+        mode = mode or self.search_mode
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        self._refresh_index()
+        
+        results: List[Optional[List[Dict]]] = [None] * len(queries)
+        cache_keys = [(self.generation, _normalise_query(q), jurisdiction, limit, mode) for q in queries]
+        misses = []
+        for i, key in enumerate(cache_keys):
+            cached = self._result_cache.get(key)
+            if cached is not None:
+                results[i] = [dict(section) for section in cached]
+            else:
+                misses.append(i)
+        
+        if misses:
+            found = self._search_uncached([queries[i] for i in misses], jurisdiction, limit, mode)
+            for i, sections in zip(misses, found):
+                self._result_cache.set(cache_keys[i], [dict(section) for section in sections])
+                results[i] = sections
+        return results
+    
+    def _search_uncached(self, queries: List[str], jurisdiction: Optional[str], limit: int,
+                         mode: str) -> List[List[Dict]]:
+        """Run searches against the indexes, bypassing the result cache"""
+        if mode == 'dense':
+            return self._dense_search(queries, jurisdiction, limit)
+        
+        results: List[Optional[List[Dict]]] = [None] * len(queries)
+        needs_dense = []
+        for i, query in enumerate(queries):
+            cited = self.lexical_index.search_citations(query, jurisdiction, limit)
+            if cited:
+                results[i] = [self._lexical_section(doc_id, score, query) for doc_id, score in cited]
+            elif mode == 'lexical':
+                results[i] = [
+                    self._lexical_section(doc_id, score, query)
+                    for doc_id, score in self.lexical_index.search(query, jurisdiction, limit)
+                ]
+            else:
+                needs_dense.append(i)
+        
+        if needs_dense:
+            candidates = limit * 3
+            dense = self._dense_search([queries[i] for i in needs_dense], jurisdiction, candidates)
+            for i, dense_sections in zip(needs_dense, dense):
+                lexical = self.lexical_index.search(queries[i], jurisdiction, candidates)
+                results[i] = self._fuse(dense_sections, lexical, limit, queries[i])
+        return results
+    
+    def _dense_search(self, queries: List[str], jurisdiction: Optional[str], limit: int) -> List[List[Dict]]:
+        """Embedding similarity search against the vector store, one vectorised query for all.
+        
+        The store holds passages; they are rolled up to their parent section, which is
+        ranked by its best passage and carries the passages that matched.
+        """
+        # Long sections contribute several passages, so over-fetch before rolling up
+        n_results = limit * 3 if self.passage_window > 0 else limit
+        # Query the vector store with embeddings from the same model the index was built with
         results = self.collection.query(
-            query_texts=[query],
-            n_results=limit,
+            query_embeddings=self._embed_queries(queries),
+            n_results=n_results,
             where={"jurisdiction": jurisdiction} if jurisdiction else None
         )
         
         # Format results
-        sections = []
-        if results['documents'] and len(results['documents']) > 0:
-            for i, doc in enumerate(results['documents'][0]):
-                sections.append({
-                    'text': doc,
-                    'section_code': results['metadatas'][0][i].get('section_code', ''),
-                    'jurisdiction': results['metadatas'][0][i].get('jurisdiction', 'IN'),
-                    'act_name': results['metadatas'][0][i].get('act_name', ''),
-                    'title': results['metadatas'][0][i].get('title', ''),
-                    'distance': results['distances'][0][i] if results.get('distances') else None
-                })
+        all_sections = []
+        for q in range(len(queries)):
+            sections: Dict[str, Dict[str, Any]] = {}
+            if results['documents'] and len(results['documents']) > q:
+                for i, doc in enumerate(results['documents'][q]):
+                    metadata = results['metadatas'][q][i] or {}
+                    section_id = metadata.get('section_id') or results['ids'][q][i]
+                    section = sections.get(section_id)
+                    if section is None:
+                        if len(sections) >= limit:
+                            continue
+                        section = self._section_for_passage(section_id, doc, metadata)
+                        section['distance'] = results['distances'][q][i] if results.get('distances') else None
+                        sections[section_id] = section
+                    section['passages'].append(doc)
+            all_sections.append(list(sections.values()))
+        
+        return all_sections
+    
+    def _section_for_passage(self, section_id: str, doc: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Result entry for the section a matching passage belongs to"""
+        if metadata.get('section_id'):
+            full = self.lexical_index.get(section_id)
+            section = _format_section(full['text'] if full else doc, metadata)
+        else:
+            section = _format_section(doc, metadata)
+        section['id'] = section_id
+        section['passages'] = []
+        return section
+    
+    def _lexical_section(self, doc_id: str, score: float, query: str = '') -> Dict[str, Any]:
+        doc = self.lexical_index.get(doc_id) or {'text': '', 'metadata': {}}
+        section = _format_section(doc['text'], doc['metadata'])
+        section['id'] = doc_id
+        section['score'] = score
+        section['passages'] = self._matching_passages(doc['text'], query)
+        return section
+    
+    def _matching_passages(self, text: str, query: str) -> List[str]:
+        """The passage of a lexically matched section that shares most terms with the query"""
+        spans = split_passages(text, self.passage_window, self.passage_overlap)
+        if len(spans) <= 1:
+            return [text]
+        terms = set(tokenize(query))
+        best = max(spans, key=lambda span: len(terms.intersection(tokenize(span[1]))))
+        return [best[1]]
+    
+    def _fuse(self, dense: List[Dict], lexical: List[tuple], limit: int, query: str = '') -> List[Dict]:
+        """Blend min-max normalised dense and BM25 scores, weighted by hybrid_alpha"""
+        dense_scores = _min_max({s['id']: -(s['distance'] or 0.0) for s in dense})
+        lexical_scores = _min_max(dict(lexical))
+        
+        fused = {}
+        for doc_id in set(dense_scores) | set(lexical_scores):
+            fused[doc_id] = (
+                self.hybrid_alpha * dense_scores.get(doc_id, 0.0)
+                + (1 - self.hybrid_alpha) * lexical_scores.get(doc_id, 0.0)
+            )
         
+        by_id = {s['id']: s for s in dense}
+        sections = []
+        for doc_id, score in heapq.nlargest(limit, fused.items(), key=lambda item: item[1]):
+            section = by_id.get(doc_id) or self._lexical_section(doc_id, score, query)
+            section['score'] = score
+            sections.append(section)
         return sections
     
     def add_section(self, title: str, section_code: str, text: str, jurisdiction: str = 'IN', act_name: str = ''):
         """Add a new law section to the index"""
-        doc_id = f"{act_name}_{section_code}"
-        self.collection.add(
-            ids=[doc_id],
-            documents=[f"{title} {text}"],
-            metadatas=[{
-                'section_code': section_code,
-                'jurisdiction': jurisdiction,
-                'act_name': act_name,
-                'title': title
-            }]
+        section = LawSection(
+            id=f"{act_name}_{section_code}",
+            title=title,
+            section_code=section_code,
+            jurisdiction=jurisdiction,
+            act_name=act_name,
+            body=text,
+            source=MANUAL_SOURCE
         )
+        with self._write_lock:
+            self._write_sections(section.passages(self.passage_window, self.passage_overlap))
+            self.lexical_index.add(section.id, section.text, section.metadata())
+            self.lexical_index.save()
+            self.generation += 1
+
+    def reindex(self, force: bool = True) -> Dict[str, int]:
+        """Bring the vector index in line with the CSV sources and return change counts.
+        
+        An unforced reindex syncs the live index in place; a forced one builds a new
+        generation and swaps it in when it is complete.
+        """
+        with self._write_lock:
+            stats = self._load_and_index_laws(force=force)
+            self.generation += 1
+            return stats
+    
+    def rollback(self) -> Optional[str]:
+        """Re-activate the index generation that the last rebuild replaced"""
+        with self._write_lock:
+            name = self.generations.rollback()
+            path = self.generations.path(name)
+            self._swap_index(path, *self._open_index(path))
+            print(f"Rolled back to index generation {name or '(original)'}")
+            return name
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Embedding of one query, cached like search query embeddings"""
+        return self._embed_queries([query])[0]
+    
+    def index_version(self) -> int:
+        """Generation of the index being served, after picking up a reindex by another process"""
+        self._refresh_index()
+        return self.generation
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for the query embedding and search result caches"""
+        return {
+            'generation': self.generation,
+            'index_generation': self.index_path.name if self.index_path != Path(self.vector_db_path) else None,
+            'embeddings': self._embedding_cache.stats(),
+            'results': self._result_cache.stats()
+        }
+
+
+# Process-wide retrieval service. Loading the embedding model and opening the
+# vector store is expensive, so every request shares one instance.
+_retrieval: Optional[KnowledgeRetrieval] = None
+_retrieval_lock = threading.Lock()
+
+
+def build_embedding_artifact(laws_path: Optional[Path] = None, output_path: Optional[Path] = None,
+                             model_name: Optional[str] = None) -> Path:
+    """Embed every law section and write the result as a precomputed artifact"""
+    laws_path = Path(laws_path or Config.LAWS_DATA_PATH)
+    output_path = Path(output_path or Config.EMBEDDING_ARTIFACT_PATH)
+    model_name = model_name or Config.EMBEDDING_MODEL
+    model = load_embedding_model(model_name)
+    
+    ids, hashes, chunks, texts = [], [], [], []
+    
+    def flush():
+        chunks.append(model.encode(
+            texts,
+            batch_size=Config.EMBEDDING_BATCH_SIZE,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        ).astype(np.float32))
+        texts.clear()
+    
+    for section in iter_law_sections(laws_path):
+        for document in section.passages(Config.PASSAGE_WINDOW, Config.PASSAGE_OVERLAP):
+            ids.append(document.id)
+            hashes.append(document.content_hash)
+            texts.append(document.text)
+        if len(texts) >= Config.INDEX_CHUNK_SIZE:
+            flush()
+    if texts:
+        flush()
+    
+    embeddings = np.vstack(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+    return write_artifact(output_path, model_name, corpus_hash(laws_path), ids, hashes, embeddings)
+
+
+def get_retrieval() -> KnowledgeRetrieval:
+    """Return the shared KnowledgeRetrieval instance, creating it on first use"""
+    global _retrieval
+    if _retrieval is None:
+        with _retrieval_lock:
+            if _retrieval is None:
+                _retrieval = KnowledgeRetrieval()
+    return _retrieval
+
+
+def warmup_retrieval() -> bool:
+    """Eagerly initialise the shared retrieval service; returns False if unavailable"""
+    try:
+        get_retrieval()
+        return True
+    except Exception as exc:
+        print(f"Retrieval warmup failed: {exc}")
+        return False
+
+
+def peek_retrieval() -> Optional[KnowledgeRetrieval]:
+    """Return the shared instance only if it has already been created"""
+    return _retrieval
 
-    def reindex(self, force: bool = True):
-        """Rebuild the vector index from CSV sources"""
-        self._load_and_index_laws(force=force)
 
+def reset_retrieval():
+    """Drop the shared instance so the next call rebuilds it (used by tests and scripts)"""
+    global _retrieval
+    with _retrieval_lock:
+        _retrieval = None
 
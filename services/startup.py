@@ -0,0 +1,158 @@
+import builtins
+import gc
+import sys
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from typing import Any, Dict, List, Tuple
+
+
+class StartupProfile:
+    """Per-module import times and create_app() phase timings for one worker process.
+
+    Import timing wraps builtins.__import__ and only records modules the first time they
+    load, so each entry is that module's cumulative import time (dependencies included),
+    like the second column of `python -X importtime`.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.imports: Dict[str, float] = {}
+        self.phases: List[Tuple[str, float]] = []
+        self._original_import = None
+        self._started = time.perf_counter()
+
+    def enable(self):
+        """Start recording imports made from now on"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._started = time.perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def stop_import_timing(self):
+        """Put the normal import function back once startup is done"""
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self.imports.setdefault(name, time.perf_counter() - started)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time one step of app startup"""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def report(self, top: int = 20) -> Dict[str, Any]:
+        slowest = sorted(self.imports.items(), key=lambda item: item[1], reverse=True)[:top]
+        return {
+            'total_ms': round((time.perf_counter() - self._started) * 1000, 1),
+            'phases_ms': {name: round(seconds * 1000, 1) for name, seconds in self.phases},
+            'imports_ms': {name: round(seconds * 1000, 1) for name, seconds in slowest},
+            'modules_loaded': len(sys.modules)
+        }
+
+    def print_report(self, top: int = 20):
+        report = self.report(top)
+        print(f"Startup profile: {report['total_ms']} ms, {report['modules_loaded']} modules loaded")
+        for name, ms in report['phases_ms'].items():
+            print(f"  phase  {ms:>9.1f} ms  {name}")
+        for name, ms in report['imports_ms'].items():
+            print(f"  import {ms:>9.1f} ms  {name}")
+
+
+startup_profile = StartupProfile()
+
+
+def warmup(app=None, freeze: bool = True) -> Dict[str, float]:
+    """Load everything requests share before the server forks its workers.
+
+    Meant for the master process (gunicorn.conf.py calls it with preload_app), so every
+    worker inherits the embedding model, index, compiled templates and regexes
+    copy-on-write instead of loading its own on first request. Returns step timings in ms.
+    """
+    from config import Config
+
+    steps = [('embedding model', _warm_embedding_model)]
+    # Chroma's SQLite connections must not cross the fork, so with Chroma each worker
+    # opens the index itself (reusing the inherited model); the numpy index is shared
+    if Config.VECTOR_BACKEND == 'numpy':
+        steps.append(('retrieval', _warm_retrieval))
+    if app is not None:
+        steps.append(('page templates', lambda: _warm_page_templates(app)))
+    steps += [
+        ('contract templates', _warm_contract_templates),
+        ('compliance rules', _warm_compliance),
+        ('pdf styles', _warm_pdf)
+    ]
+
+    timings = {}
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            print(f"Warmup step '{name}' failed: {e}")
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    if freeze:
+        # Move everything loaded so far out of the collector's reach; otherwise each GC
+        # pass in a worker writes to those objects and un-shares their pages
+        gc.collect()
+        gc.freeze()
+    print(f"Warmup done: {timings}")
+    return timings
+
+
+def _warm_embedding_model():
+    from config import Config
+    from services.retrieval import load_embedding_model
+    # With an embedding server the model lives in that process instead
+    if Config.EMBEDDING_SERVER_SOCKET:
+        return
+    # One encode initialises the model's kernels
+    load_embedding_model(Config.EMBEDDING_MODEL).encode(['warmup'], show_progress_bar=False)
+
+
+def _warm_retrieval():
+    from services.retrieval import get_retrieval
+    get_retrieval()
+
+
+def _warm_page_templates(app):
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+
+def _warm_contract_templates():
+    from services.template_registry import get_template_registry
+    get_template_registry().warm()
+
+
+def _warm_compliance():
+    # Importing the verifier compiles its metadata patterns and the compliance rules
+    import services.verifier  # noqa: F401
+
+
+def _warm_pdf():
+    from reportlab.platypus import Paragraph, SimpleDocTemplate
+    from services.pdf_styles import pdf_styles
+
+    # Rendering one paragraph also loads the standard font metrics
+    styles = pdf_styles()
+    SimpleDocTemplate(BytesIO()).build([Paragraph('warmup', styles['Normal'])])
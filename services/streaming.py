@@ -0,0 +1,89 @@
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Asks the API to append a final chunk carrying token usage. Sent as extra_body so it also
+# works with SDK versions whose create() predates the stream_options argument.
+STREAM_USAGE_BODY = {'stream_options': {'include_usage': True}}
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'  # stop nginx from buffering the stream
+}
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """One Server-Sent Event frame with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _usage_dict(usage: Any) -> Optional[Dict[str, int]]:
+    if usage is None:
+        return None
+    if not isinstance(usage, dict):
+        usage = {key: getattr(usage, key, None) for key in ('prompt_tokens', 'completion_tokens', 'total_tokens')}
+    return {key: usage.get(key) for key in ('prompt_tokens', 'completion_tokens', 'total_tokens')}
+
+
+class CompletionStream:
+    """Text deltas of a streamed chat completion, plus its usage once the stream ends.
+
+    Closing it, or abandoning the iteration (e.g. the HTTP client went away), closes the
+    upstream response so the model stops generating and billing tokens.
+    """
+
+    def __init__(self, stream, on_complete: Optional[Callable[[str], None]] = None):
+        self.stream = stream
+        self.on_complete = on_complete
+        self.usage: Optional[Dict[str, int]] = None
+        self.parts: List[str] = []
+        self.finished = False
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            for chunk in self.stream:
+                usage = getattr(chunk, 'usage', None)
+                if usage:
+                    self.usage = _usage_dict(usage)
+                for choice in chunk.choices or []:
+                    delta = choice.delta.content if choice.delta else None
+                    if delta:
+                        self.parts.append(delta)
+                        yield delta
+            self.finished = True
+        finally:
+            self.close()
+        # Only a complete answer is worth keeping (e.g. in the answer cache)
+        if self.on_complete is not None:
+            self.on_complete(self.text)
+
+    @property
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+    def close(self):
+        close = getattr(self.stream, 'close', None)
+        if callable(close):
+            close()
+            return
+        response = getattr(self.stream, 'response', None)
+        if response is not None:
+            response.close()
+
+
+class TextStream:
+    """A ready-made answer (e.g. a non-LLM fallback) with the CompletionStream interface"""
+
+    def __init__(self, text: str):
+        self.parts = [text] if text else []
+        self.usage = None
+        self.finished = True
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.parts)
+
+    @property
+    def text(self) -> str:
+        return ''.join(self.parts)
+
+    def close(self):
+        pass
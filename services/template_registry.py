@@ -0,0 +1,109 @@
+import threading
+from pathlib import Path
+from typing import Optional
+
+from jinja2 import (ChoiceLoader, DictLoader, Environment, FileSystemBytecodeCache,
+                    FileSystemLoader, Template, TemplateNotFound)
+
+from config import Config
+
+# Name of the built-in template used for contract types without a file in TEMPLATES_DATA_PATH
+DEFAULT_TEMPLATE_NAME = '__default__.md'
+
+DEFAULT_TEMPLATE = """# {{ contract_type | upper }} AGREEMENT
+
+**Date:** {{ effective_date }}
+
+## PARTIES
+{% for party in parties %}
+- {{ party }}
+{% endfor %}
+
+## CONSIDERATION
+{{ consideration }}
+
+## SCOPE OF WORK
+{{ scope }}
+
+## PAYMENT TERMS
+{{ payment }}
+
+## INTELLECTUAL PROPERTY
+{{ ip }}
+
+## CONFIDENTIALITY
+{{ confidentiality }}
+
+## TERMINATION
+{{ termination }}
+
+## GOVERNING LAW
+This agreement shall be governed by the laws of {{ governing_law }}.
+
+## DISPUTE RESOLUTION
+{{ dispute_resolution }}
+
+## SIGNATURES
+
+Party A: _________________    Date: _________
+
+Party B: _________________    Date: _________
+
+---
+*This document is generated for educational purposes only. Consult a qualified lawyer for legal advice.*
+"""
+
+_registry: Optional['TemplateRegistry'] = None
+_registry_lock = threading.Lock()
+
+
+class TemplateRegistry:
+    """Contract templates compiled once into a shared jinja2 Environment.
+
+    Compiled templates stay in memory and are recompiled only when their file's mtime
+    changes; the bytecode cache lets a fresh process skip compilation too.
+    """
+
+    def __init__(self, templates_path: Path, bytecode_cache_path: Optional[Path] = None):
+        self.templates_path = Path(templates_path)
+        if bytecode_cache_path is None:
+            # Per-user directory under the system temp dir
+            bytecode_cache = FileSystemBytecodeCache()
+        else:
+            Path(bytecode_cache_path).mkdir(parents=True, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(str(bytecode_cache_path))
+        self.env = Environment(
+            loader=ChoiceLoader([
+                FileSystemLoader(str(self.templates_path), encoding='utf-8'),
+                DictLoader({DEFAULT_TEMPLATE_NAME: DEFAULT_TEMPLATE})
+            ]),
+            bytecode_cache=bytecode_cache,
+            auto_reload=True,
+            cache_size=-1
+        )
+
+    def get(self, contract_type: str) -> Template:
+        """Compiled template for a contract type, falling back to the built-in default"""
+        try:
+            return self.env.get_template(f"{contract_type.lower()}.md")
+        except TemplateNotFound:
+            # Also covers names the loader refuses, such as paths containing '..'
+            return self.env.get_template(DEFAULT_TEMPLATE_NAME)
+
+    def warm(self) -> int:
+        """Compile every template up front; returns how many were loaded"""
+        names = self.env.list_templates(extensions=['md'])
+        for name in names:
+            self.env.get_template(name)
+        return len(names)
+
+
+def get_template_registry() -> TemplateRegistry:
+    """Return the shared TemplateRegistry, creating it on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                cache_path = Config.TEMPLATE_CACHE_PATH
+                _registry = TemplateRegistry(Config.TEMPLATES_DATA_PATH, Path(cache_path) if cache_path else None)
+    return _registry
@@ -0,0 +1,527 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+COLLECTION_NAME = 'law_sections'
+VECTOR_BACKENDS = ('chroma', 'numpy')
+
+
+def create_vector_store(path: Path, backend: str = 'chroma', quantize: Optional[str] = None,
+                        partition_by: Sequence[str] = ()):
+    """Open the vector store for `path`.
+
+    Every backend exposes the subset of the Chroma collection API that KnowledgeRetrieval
+    uses: count(), get(), upsert(), delete() and query(). With `partition_by` (metadata
+    fields such as jurisdiction and act_name) documents are split into one store per
+    distinct value, so filtered queries only scan their own partition.
+    """
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend: {backend}")
+    path = Path(path)
+
+    if not partition_by:
+        if backend == 'chroma':
+            return open_chroma_collection(path)
+        return NumpyVectorStore(path / 'numpy', quantize=quantize)
+
+    scheme = '-'.join(partition_by)
+    manifest_path = path / f"partitions.{scheme}.json"
+    if not manifest_path.exists() and _unpartitioned_count(path, backend):
+        print(
+            f"Warning: {path} holds an unpartitioned index that VECTOR_PARTITION_BY={','.join(partition_by)} "
+            "ignores; every section will be re-embedded into new partitions. Unset VECTOR_PARTITION_BY "
+            "to keep using it, or delete it once the partitioned index is built."
+        )
+    if backend == 'chroma':
+        def open_partition(name):
+            return open_chroma_collection(path, _chroma_name(f"{COLLECTION_NAME}.{scheme}.{name}"))
+    else:
+        def open_partition(name):
+            return NumpyVectorStore(path / 'partitions' / scheme / name, quantize=quantize)
+    return PartitionedVectorStore(manifest_path, partition_by, open_partition)
+
+
+def _unpartitioned_count(path: Path, backend: str) -> int:
+    """Documents in the single, unpartitioned store at `path` (0 if there is none)"""
+    if backend == 'numpy':
+        return NumpyVectorStore(path / 'numpy').count() if (path / 'numpy').exists() else 0
+    if not path.exists():
+        return 0
+    import chromadb
+
+    try:
+        return chromadb.PersistentClient(path=str(path)).get_collection(COLLECTION_NAME).count()
+    except Exception:
+        return 0
+
+
+def open_chroma_collection(path: Path, name: str = COLLECTION_NAME):
+    """Get or create a Chroma collection in a persistent client at `path`"""
+    import chromadb
+
+    client = chromadb.PersistentClient(path=str(path))
+    try:
+        return client.get_collection(name)
+    except:
+        # Embeddings are normalised, so cosine is the natural space for new collections
+        return client.create_collection(name, metadata={"hnsw:space": "cosine"})
+
+
+class _Snapshot:
+    """Immutable view of the store contents; writers swap in a new one"""
+
+    def __init__(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]],
+                 vectors: np.ndarray, scales: Optional[np.ndarray]):
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.vectors = vectors
+        self.scales = scales
+        self.positions = {doc_id: i for i, doc_id in enumerate(ids)}
+        self._filters: Dict[tuple, np.ndarray] = {}
+
+    def rows_matching(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Row numbers whose metadata equals every key in `where` (None means all rows)"""
+        if not where:
+            return None
+        key = tuple(sorted(where.items()))
+        rows = self._filters.get(key)
+        if rows is None:
+            rows = np.array([
+                i for i, metadata in enumerate(self.metadatas)
+                if all(metadata.get(field) == value for field, value in where.items())
+            ], dtype=np.int64)
+            self._filters[key] = rows
+        return rows
+
+    def float_vectors(self, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        vectors = self.vectors if rows is None else self.vectors[rows]
+        if self.scales is None:
+            return np.asarray(vectors, dtype=np.float32)
+        scales = self.scales if rows is None else self.scales[rows]
+        return vectors.astype(np.float32) * scales[:, None]
+
+
+class NumpyVectorStore:
+    """Brute-force vector store backed by a memory-mapped .npy matrix.
+
+    Embeddings are stored L2-normalised as float32, or as int8 with a per-row scale when
+    `quantize='int8'`. Ids, documents and metadata live in a JSON sidecar. Queries are a
+    single matrix product, and because the matrix is opened with mmap every worker process
+    shares the same pages through the OS page cache.
+
+    Each write rewrites the files and swaps them in atomically, which suits corpora of a
+    few thousand sections that change in occasional batches.
+    """
+
+    def __init__(self, path: Path, quantize: Optional[str] = None):
+        if quantize not in (None, '', 'int8'):
+            raise ValueError(f"Unsupported quantization: {quantize}")
+        self.path = Path(path)
+        self.quantize = quantize or None
+        self.vectors_path = self.path / 'embeddings.npy'
+        self.scales_path = self.path / 'scales.npy'
+        self.metadata_path = self.path / 'metadata.json'
+        self._write_lock = threading.Lock()
+        self._snapshot = self._load()
+
+    def count(self) -> int:
+        return len(self._snapshot.ids)
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None) -> Dict[str, Any]:
+        """Fetch stored documents by id, or a page of all documents"""
+        snapshot = self._snapshot
+        include = ['metadatas', 'documents'] if include is None else include
+        if ids is not None:
+            rows = [snapshot.positions[doc_id] for doc_id in ids if doc_id in snapshot.positions]
+        else:
+            start = offset or 0
+            stop = len(snapshot.ids) if limit is None else start + limit
+            rows = list(range(start, min(stop, len(snapshot.ids))))
+
+        result: Dict[str, Any] = {'ids': [snapshot.ids[i] for i in rows]}
+        result['metadatas'] = [snapshot.metadatas[i] for i in rows] if 'metadatas' in include else None
+        result['documents'] = [snapshot.documents[i] for i in rows] if 'documents' in include else None
+        if 'embeddings' in include:
+            vectors = snapshot.float_vectors(np.array(rows, dtype=np.int64)) if rows else np.zeros((0, 0))
+            result['embeddings'] = vectors.tolist()
+        else:
+            result['embeddings'] = None
+        return result
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], documents: List[str],
+               metadatas: List[Dict[str, Any]]):
+        """Insert or replace documents with precomputed embeddings"""
+        if not ids:
+            return
+        new_vectors = _normalise(np.asarray(embeddings, dtype=np.float32))
+        with self._write_lock:
+            snapshot = self._snapshot
+            doc_ids = list(snapshot.ids)
+            docs = list(snapshot.documents)
+            metas = list(snapshot.metadatas)
+            if len(snapshot.ids):
+                vectors = np.array(snapshot.float_vectors(), dtype=np.float32)
+            else:
+                vectors = np.zeros((0, new_vectors.shape[1]), dtype=np.float32)
+
+            appended = []
+            for i, doc_id in enumerate(ids):
+                position = snapshot.positions.get(doc_id)
+                if position is None:
+                    appended.append(i)
+                    doc_ids.append(doc_id)
+                    docs.append(documents[i])
+                    metas.append(dict(metadatas[i]))
+                else:
+                    docs[position] = documents[i]
+                    metas[position] = dict(metadatas[i])
+                    vectors[position] = new_vectors[i]
+            if appended:
+                vectors = np.vstack([vectors, new_vectors[appended]])
+            self._write(doc_ids, docs, metas, vectors)
+
+    def delete(self, ids: List[str]):
+        """Remove documents by id"""
+        with self._write_lock:
+            snapshot = self._snapshot
+            removed = {snapshot.positions[doc_id] for doc_id in ids if doc_id in snapshot.positions}
+            if not removed:
+                return
+            keep = [i for i in range(len(snapshot.ids)) if i not in removed]
+            vectors = snapshot.float_vectors(np.array(keep, dtype=np.int64))
+            self._write(
+                [snapshot.ids[i] for i in keep],
+                [snapshot.documents[i] for i in keep],
+                [snapshot.metadatas[i] for i in keep],
+                vectors
+            )
+
+    def query(self, query_embeddings: List[List[float]], n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None) -> Dict[str, List]:
+        """Top-k cosine search; distances are 1 - cosine similarity, as in a cosine Chroma collection"""
+        snapshot = self._snapshot
+        result: Dict[str, List] = {'ids': [], 'documents': [], 'metadatas': [], 'distances': []}
+        queries = _normalise(np.asarray(query_embeddings, dtype=np.float32))
+        rows = snapshot.rows_matching(where)
+        candidates = len(snapshot.ids) if rows is None else len(rows)
+
+        if candidates == 0:
+            for _ in range(len(queries)):
+                for field in result:
+                    result[field].append([])
+            return result
+
+        vectors = snapshot.vectors if rows is None else snapshot.vectors[rows]
+        scores = vectors.astype(np.float32, copy=False) @ queries.T
+        if snapshot.scales is not None:
+            scales = snapshot.scales if rows is None else snapshot.scales[rows]
+            scores *= scales[:, None]
+
+        k = min(n_results, candidates)
+        for q in range(len(queries)):
+            column = scores[:, q]
+            top = np.argpartition(-column, k - 1)[:k] if k < candidates else np.arange(candidates)
+            top = top[np.argsort(-column[top])]
+            positions = top if rows is None else rows[top]
+            result['ids'].append([snapshot.ids[i] for i in positions])
+            result['documents'].append([snapshot.documents[i] for i in positions])
+            result['metadatas'].append([snapshot.metadatas[i] for i in positions])
+            result['distances'].append([float(1.0 - column[i]) for i in top])
+        return result
+
+    def _load(self) -> _Snapshot:
+        if not self.metadata_path.exists() or not self.vectors_path.exists():
+            return _Snapshot([], [], [], np.zeros((0, 0), dtype=np.float32), None)
+        with open(self.metadata_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+        vectors = np.load(self.vectors_path, mmap_mode='r')
+        scales = None
+        if sidecar.get('dtype') == 'int8':
+            scales = np.load(self.scales_path, mmap_mode='r')
+        return _Snapshot(sidecar['ids'], sidecar['documents'], sidecar['metadatas'], vectors, scales)
+
+    def _write(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]],
+               vectors: np.ndarray):
+        """Persist the full store and swap the new files in atomically"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        scales = None
+        if self.quantize == 'int8' and len(vectors):
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            stored = np.round(vectors / scales[:, None]).astype(np.int8)
+            _save_array(self.scales_path, scales.astype(np.float32))
+        else:
+            stored = vectors.astype(np.float32, copy=False)
+        _save_array(self.vectors_path, stored)
+
+        sidecar = {
+            'dtype': 'int8' if scales is not None else 'float32',
+            'dim': int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+            'ids': ids,
+            'documents': documents,
+            'metadatas': metadatas
+        }
+        tmp_path = self.metadata_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sidecar, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, self.metadata_path)
+        self._snapshot = self._load()
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _save_array(path: Path, array: np.ndarray):
+    tmp_path = path.with_name(path.stem + '.tmp.npy')
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+class PartitionedVectorStore:
+    """Routes documents to one sub-store per partition (e.g. per jurisdiction or act).
+
+    A query whose `where` names the partition fields only touches the matching partitions;
+    any other query fans out across all of them and the results are merged by distance.
+    Partition names and their field values are recorded in a small JSON manifest.
+    """
+
+    def __init__(self, manifest_path: Path, partition_by: Sequence[str],
+                 open_partition: Callable[[str], Any]):
+        self.manifest_path = Path(manifest_path)
+        self.partition_by = tuple(partition_by)
+        self._open_partition = open_partition
+        self._lock = threading.Lock()
+        self._stores: Dict[str, Any] = {}
+        self.partitions: Dict[str, Dict[str, str]] = self._load_manifest()
+
+    def count(self) -> int:
+        return sum(self._store(name).count() for name in sorted(self.partitions))
+
+    def get(self, ids: Optional[List[str]] = None, include: Optional[List[str]] = None,
+            limit: Optional[int] = None, offset: Optional[int] = None) -> Dict[str, Any]:
+        """Fetch documents by id from every partition, or page through all partitions in order"""
+        include = ['metadatas', 'documents'] if include is None else include
+        merged: Dict[str, Any] = {'ids': []}
+        for field in ('metadatas', 'documents', 'embeddings'):
+            merged[field] = [] if field in include else None
+
+        skip = offset or 0
+        remaining = limit
+        for name in sorted(self.partitions):
+            store = self._store(name)
+            if ids is not None:
+                page = store.get(ids=ids, include=include)
+            else:
+                size = store.count()
+                if skip >= size:
+                    skip -= size
+                    continue
+                page = store.get(include=include, limit=remaining, offset=skip)
+                skip = 0
+            merged['ids'].extend(page['ids'])
+            for field in ('metadatas', 'documents', 'embeddings'):
+                if merged[field] is not None and page.get(field) is not None:
+                    merged[field].extend(page[field])
+            if remaining is not None:
+                remaining -= len(page['ids'])
+                if remaining <= 0:
+                    break
+        return merged
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], documents: List[str],
+               metadatas: List[Dict[str, Any]]):
+        """Write each document into its partition, removing it from any partition it left"""
+        groups: Dict[str, List[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            groups.setdefault(self._partition_for(metadata), []).append(i)
+
+        for name, rows in groups.items():
+            group_ids = [ids[i] for i in rows]
+            for other in list(self.partitions):
+                if other != name:
+                    self._delete_present(other, group_ids)
+            self._store(name).upsert(
+                ids=group_ids,
+                embeddings=[embeddings[i] for i in rows],
+                documents=[documents[i] for i in rows],
+                metadatas=[metadatas[i] for i in rows]
+            )
+
+    def delete(self, ids: List[str]):
+        for name in list(self.partitions):
+            self._delete_present(name, ids)
+
+    def _delete_present(self, name: str, ids: List[str]):
+        """Delete only the ids the partition actually holds (Chroma warns about the rest)"""
+        store = self._store(name)
+        present = store.get(ids=ids, include=[])['ids']
+        if present:
+            store.delete(ids=present)
+
+    def query(self, query_embeddings: List[List[float]], n_results: int = 10,
+              where: Optional[Dict[str, Any]] = None) -> Dict[str, List]:
+        """Query the partitions selected by `where` and merge their results by distance"""
+        where = dict(where or {})
+        partition_filter = {field: where.pop(field) for field in self.partition_by if field in where}
+        targets = [
+            name for name, values in sorted(self.partitions.items())
+            if all(values.get(field) == str(value) for field, value in partition_filter.items())
+        ]
+
+        fields = ('ids', 'documents', 'metadatas', 'distances')
+        merged: List[List[tuple]] = [[] for _ in query_embeddings]
+        for name in targets:
+            store = self._store(name)
+            if store.count() == 0:
+                continue
+            page = store.query(query_embeddings=query_embeddings, n_results=n_results, where=where or None)
+            for q in range(len(query_embeddings)):
+                merged[q].extend(zip(*(page[field][q] for field in fields)))
+
+        result: Dict[str, List] = {field: [] for field in fields}
+        for hits in merged:
+            hits.sort(key=lambda hit: hit[3])
+            hits = hits[:n_results]
+            for position, field in enumerate(fields):
+                result[field].append([hit[position] for hit in hits])
+        return result
+
+    def _partition_for(self, metadata: Dict[str, Any]) -> str:
+        values = {field: str(metadata.get(field, '') or '') for field in self.partition_by}
+        name = '__'.join(_slug(values[field]) for field in self.partition_by)
+        if name not in self.partitions:
+            with self._lock:
+                if name not in self.partitions:
+                    partitions = dict(self.partitions)
+                    partitions[name] = values
+                    self._save_manifest(partitions)
+                    self.partitions = partitions
+        return name
+
+    def _store(self, name: str):
+        store = self._stores.get(name)
+        if store is None:
+            with self._lock:
+                store = self._stores.get(name)
+                if store is None:
+                    store = self._open_partition(name)
+                    self._stores[name] = store
+        return store
+
+    def _load_manifest(self) -> Dict[str, Dict[str, str]]:
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('partitions', {})
+
+    def _save_manifest(self, partitions: Dict[str, Dict[str, str]]):
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'partition_by': list(self.partition_by), 'partitions': partitions}, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+
+class IndexGenerations:
+    """Blue/green generations of the on-disk index under one root directory.
+
+    Each rebuild goes into its own directory under `generations/` and is promoted by
+    atomically rewriting `active.json`, which also remembers the previous generation for
+    rollback. Without a pointer file the root itself is the active index, which is where
+    indexes built before generations existed live.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.pointer_path = self.root / 'active.json'
+        self.generations_path = self.root / 'generations'
+
+    def state(self) -> Dict[str, Optional[str]]:
+        if not self.pointer_path.exists():
+            return {'active': None, 'previous': None}
+        with open(self.pointer_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def stamp(self) -> Optional[int]:
+        """Changes whenever a generation is promoted, by this or another process"""
+        try:
+            return self.pointer_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def path(self, name: Optional[str]) -> Path:
+        return self.generations_path / name if name else self.root
+
+    def active_path(self) -> Path:
+        return self.path(self.state().get('active'))
+
+    def create(self) -> str:
+        """Make an empty directory for a shadow generation and return its name"""
+        name = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.path(name).mkdir(parents=True)
+        return name
+
+    def promote(self, name: Optional[str]):
+        """Make `name` the active generation, keeping the current one as previous"""
+        current = self.state().get('active')
+        self._write_state({'active': name, 'previous': current})
+
+    def rollback(self) -> Optional[str]:
+        """Swap the active and previous generations and return the newly active one"""
+        state = self.state()
+        if not self.pointer_path.exists() or state.get('previous') == state.get('active'):
+            raise ValueError("No previous index generation to roll back to")
+        if not self.path(state.get('previous')).exists():
+            raise ValueError(f"Previous index generation {state.get('previous')} no longer exists")
+        self._write_state({'active': state.get('previous'), 'previous': state.get('active')})
+        return state.get('previous')
+
+    def discard(self, name: str):
+        shutil.rmtree(self.path(name), ignore_errors=True)
+
+    def prune(self):
+        """Delete every generation directory except the active and previous ones"""
+        state = self.state()
+        keep = {state.get('active'), state.get('previous')}
+        if not self.generations_path.exists():
+            return
+        for directory in self.generations_path.iterdir():
+            if directory.is_dir() and directory.name not in keep:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def _write_state(self, state: Dict[str, Optional[str]]):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.pointer_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(state, promoted_at=time.strftime('%Y-%m-%dT%H:%M:%S')), f, indent=2)
+        os.replace(tmp_path, self.pointer_path)
+
+
+def _slug(value: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '_', value).strip('_') or 'none'
+
+
+def _chroma_name(name: str) -> str:
+    """Fit a collection name into Chroma's 3-63 character [A-Za-z0-9._-] limit"""
+    name = re.sub(r'[^A-Za-z0-9._-]+', '_', name)
+    if len(name) <= 63:
+        return name
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()[:10]
+    return f"{name[:52]}_{digest}"
@@ -3,15 +3,16 @@ from pathlib import Path
 from typing import Any, Dict, List
 from uuid import uuid4
 
-import docx
-import fitz  # PyMuPDF
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
-
 from config import Config
 from services.compliance import ComplianceChecker
 from services.ocr import OCRService
+from services.pdf_styles import pdf_styles
+
+# Metadata patterns, compiled once at import
+DATE_PATTERN = re.compile(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}')
+AMOUNT_PATTERN = re.compile(r'[₹$€£]\s*\d+(?:,\d{3})*(?:\.\d{2})?')
+# Parties (simplified - looks for "Party A", "Company Name", etc.)
+PARTY_PATTERN = re.compile(r'(?:Party\s+[AB]|Company|Corporation|LLC|Pvt\.?\s+Ltd\.?)', re.IGNORECASE)
 
 class DocumentVerifier:
     """Verifies contracts for missing clauses and risks"""
@@ -93,6 +94,7 @@ class DocumentVerifier:
     def _extract_from_pdf(self, file_path: str) -> str:
         """Extract text from PDF"""
         try:
+            import fitz  # PyMuPDF
             doc = fitz.open(file_path)
             text = ""
             for page in doc:
@@ -106,6 +108,7 @@ class DocumentVerifier:
     def _extract_from_docx(self, file_path: str) -> str:
         """Extract text from DOCX"""
         try:
+            import docx
             doc = docx.Document(file_path)
             return '\n'.join([para.text for para in doc.paragraphs])
         except Exception as e:
@@ -128,16 +131,13 @@ class DocumentVerifier:
     def _extract_metadata(self, text: str) -> Dict[str, Any]:
         """Extract contract metadata"""
         # Extract dates
-        date_pattern = r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}'
-        dates = re.findall(date_pattern, text)
+        dates = DATE_PATTERN.findall(text)
         
         # Extract amounts (currency patterns)
-        amount_pattern = r'[₹$€£]\s*\d+(?:,\d{3})*(?:\.\d{2})?'
-        amounts = re.findall(amount_pattern, text)
+        amounts = AMOUNT_PATTERN.findall(text)
         
-        # Extract parties (simplified - looks for "Party A", "Company Name", etc.)
-        party_pattern = r'(?:Party\s+[AB]|Company|Corporation|LLC|Pvt\.?\s+Ltd\.?)'
-        parties = re.findall(party_pattern, text, re.IGNORECASE)
+        # Extract parties
+        parties = PARTY_PATTERN.findall(text)
         
         return {
             'dates': dates[:5],
@@ -291,8 +291,11 @@ class DocumentVerifier:
         report_id = uuid4().hex
         summary_path = self.reports_path / f"verification_{report_id}.pdf"
 
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer
+
         doc = SimpleDocTemplate(str(summary_path), pagesize=letter)
-        styles = getSampleStyleSheet()
+        styles = pdf_styles()
         story = []
 
         heading = Paragraph("LawBot 360 - Verification Summary", styles['Heading2'])
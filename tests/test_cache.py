@@ -0,0 +1,80 @@
+import unittest
+import time
+import tempfile
+import shutil
+from pathlib import Path
+from services.cache import LRUCache, SQLiteCache, content_key
+
+class LRUCacheTestCase(unittest.TestCase):
+    """Test cases for the in-memory LRU cache"""
+    
+    def test_evicts_least_recently_used(self):
+        """Test that the oldest untouched entry is evicted first"""
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+    
+    def test_entries_expire_after_ttl(self):
+        """Test that expired entries are treated as misses"""
+        cache = LRUCache(max_size=10, ttl=0.05)
+        cache.set('query', ['result'])
+        self.assertEqual(cache.get('query'), ['result'])
+        
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('query'))
+        self.assertEqual(len(cache), 0)
+    
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted"""
+        cache = LRUCache(max_size=10)
+        cache.get('missing')
+        cache.set('present', 1)
+        cache.get('present')
+        cache.get('present')
+        
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+        self.assertAlmostEqual(stats['hit_rate'], 2 / 3)
+
+class SQLiteCacheTestCase(unittest.TestCase):
+    """Test cases for the persistent SQLite cache"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = Path(self.temp_dir) / 'cache.sqlite3'
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_values_persist_across_instances(self):
+        """Test that another process (instance) sees stored entries"""
+        key = content_key('gpt-3.5-turbo', 'prompt')
+        SQLiteCache(self.path).set(key, 'polished')
+        
+        cache = SQLiteCache(self.path)
+        self.assertEqual(cache.get(key), 'polished')
+        self.assertIsNone(cache.get(content_key('gpt-3.5-turbo', 'other prompt')))
+        self.assertEqual(cache.stats()['hit_rate'], 0.5)
+    
+    def test_evicts_least_recently_used_beyond_max_bytes(self):
+        """Test size-based eviction keeps the recently used entries"""
+        cache = SQLiteCache(self.path, max_bytes=25)
+        cache.set('a', 'x' * 10)
+        cache.set('b', 'y' * 10)
+        time.sleep(0.01)
+        cache.get('a')
+        cache.set('c', 'z' * 10)
+        
+        self.assertEqual(cache.get('a'), 'x' * 10)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['bytes'], 20)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,15 @@
 import unittest
+import os
+import tempfile
+import shutil
+from pathlib import Path
+from unittest import mock
 from app import create_app
+from config import Config
 from models.db import db, User, Contract
 from routers.contracts import bp
+from services.exports import RENDER_LOCK_STRIPES, ContractExports
+from services.template_registry import TemplateRegistry
 import json
 
 class ContractTestCase(unittest.TestCase):
@@ -9,6 +17,15 @@ class ContractTestCase(unittest.TestCase):
     
     def setUp(self):
         """Set up test client and database"""
+        # Rendered exports go to a scratch folder, not data/exports, and polish is not cached
+        self.export_dir = tempfile.mkdtemp()
+        for patcher in (mock.patch.object(Config, 'EXPORT_FOLDER', self.export_dir),
+                        mock.patch('services.exports._exports', None),
+                        mock.patch('services.generator._generator', None),
+                        mock.patch.object(Config, 'POLISH_CACHE_PATH', '')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(shutil.rmtree, self.export_dir, ignore_errors=True)
         self.app = create_app()
         self.app.config['TESTING'] = True
         self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
@@ -65,6 +82,92 @@ class ContractTestCase(unittest.TestCase):
         )
         
         self.assertEqual(response.status_code, 400)
+    
+    def test_download_renders_export_on_demand(self):
+        """Test that the PDF is rendered on first download, not during generation"""
+        response = self.client.post('/api/contracts/generate',
+            json={'contract_type': 'NDA', 'parties': ['Lazy Export Co', 'Party B'], 'terms': {}},
+            headers={'X-User-Id': str(self.user_id)}
+        )
+        data = json.loads(response.data)
+        with self.app.app_context():
+            pdf_path = Path(db.session.get(Contract, data['contract_id']).pdf_path)
+        pdf_path.unlink(missing_ok=True)
+        
+        response = self.client.get(f"/api/contracts/{data['contract_id']}/pdf")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data.startswith(b'%PDF'))
+        response.close()
+        self.assertTrue(pdf_path.exists())
+
+class ContractExportsTestCase(unittest.TestCase):
+    """Test cases for content-addressed, lazily rendered contract exports"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.exports = ContractExports(Path(self.temp_dir) / 'contracts')
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_same_content_renders_once(self):
+        """Test that identical contracts share one rendered file"""
+        digest = self.exports.save('# NDA\n\n- Party A', '<h1>NDA</h1>')
+        self.assertEqual(self.exports.save('# NDA\n\n- Party A', '<h1>NDA</h1>'), digest)
+        self.assertFalse(self.exports.path(digest, 'docx').exists())
+        
+        docx_path = self.exports.ensure(str(self.exports.path(digest, 'docx')))
+        self.assertTrue(docx_path.exists())
+        self.exports.ensure(str(docx_path))
+        self.assertEqual(self.exports.stats(), {'rendered': 1, 'reused': 1})
+    
+    def test_unknown_paths_are_not_rendered(self):
+        """Test that only stored contracts can be rendered"""
+        self.assertIsNone(self.exports.ensure(str(self.exports.path('0' * 64, 'pdf'))))
+        self.assertIsNone(self.exports.ensure(str(Path(self.temp_dir) / 'elsewhere.pdf')))
+        self.assertIsNone(self.exports.ensure(None))
+    
+    def test_render_locks_do_not_grow(self):
+        """Test that rendering many contracts reuses a fixed set of locks"""
+        for i in range(5):
+            digest = self.exports.save(f'# Contract {i}', f'<h1>Contract {i}</h1>')
+            self.exports.render(digest, 'docx')
+        self.assertEqual(len(self.exports._locks), RENDER_LOCK_STRIPES)
+        self.assertIs(self.exports._lock_for('a.pdf'), self.exports._lock_for('a.pdf'))
+
+class TemplateRegistryTestCase(unittest.TestCase):
+    """Test cases for the compiled contract template registry"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = Path(self.temp_dir)
+        (self.path / 'nda.md').write_text('# NDA for {{ parties[0] }}', encoding='utf-8')
+        self.registry = TemplateRegistry(self.path, self.path / 'bytecode')
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_templates_are_compiled_once(self):
+        """Test that repeated lookups reuse the compiled template"""
+        template = self.registry.get('NDA')
+        self.assertIs(self.registry.get('nda'), template)
+        self.assertEqual(template.render(parties=['Acme']), '# NDA for Acme')
+    
+    def test_template_reloads_when_file_changes(self):
+        """Test that an edited template file is recompiled"""
+        self.registry.get('nda')
+        template_path = self.path / 'nda.md'
+        template_path.write_text('# Updated NDA', encoding='utf-8')
+        stat = template_path.stat()
+        os.utime(template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+        
+        self.assertEqual(self.registry.get('nda').render(), '# Updated NDA')
+    
+    def test_unknown_type_uses_default_template(self):
+        """Test the built-in fallback, including for names outside the template folder"""
+        rendered = self.registry.get('consulting').render(contract_type='Consulting', parties=['A', 'B'])
+        self.assertTrue(rendered.startswith('# CONSULTING AGREEMENT'))
+        self.assertIs(self.registry.get('../nda'), self.registry.get('consulting'))
 
 if __name__ == '__main__':
     unittest.main()
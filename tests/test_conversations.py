@@ -0,0 +1,121 @@
+import unittest
+from unittest import mock
+
+from app import create_app
+from models.db import db
+from services import conversations
+from services.conversations import ConversationStore, count_tokens
+
+class ConversationStoreTestCase(unittest.TestCase):
+    """Test cases for token-budgeted server-side chat history"""
+    
+    def setUp(self):
+        self.app = create_app()
+        self.context = self.app.app_context()
+        self.context.push()
+        self.store = ConversationStore(token_budget=120, summary_tokens=50)
+        self.conversation = self.store.create()
+        patcher = mock.patch.object(conversations, 'get_llm_client', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def tearDown(self):
+        self.store.delete(self.conversation)
+        self.context.pop()
+    
+    def test_prompt_stays_within_budget(self):
+        """Test that old turns are rolled into the summary once the budget is exceeded"""
+        for i in range(10):
+            self.store.add_turn(self.conversation, 'user', f"Question {i} about notice periods " + 'x' * 100)
+            self.store.add_turn(self.conversation, 'assistant', f"Answer {i} " + 'y' * 100)
+        
+        messages = self.store.build_messages(self.conversation, 'system prompt')
+        history = [m for m in messages[2:]]
+        
+        self.assertGreater(self.conversation.summarized_turns, 0)
+        self.assertIn('Summary of the earlier conversation', messages[1]['content'])
+        self.assertLessEqual(sum(count_tokens(m['content']) for m in history) + count_tokens(self.conversation.summary), 120)
+        self.assertEqual(history[-1]['content'], 'Answer 9 ' + 'y' * 100)
+    
+    def test_short_conversations_are_sent_verbatim(self):
+        """Test that nothing is summarised while the history fits"""
+        self.store.add_turn(self.conversation, 'user', 'Hi')
+        self.store.add_turn(self.conversation, 'assistant', 'Hello')
+        
+        messages = self.store.build_messages(self.conversation, 'system prompt')
+        self.assertEqual([m['role'] for m in messages], ['system', 'user', 'assistant'])
+        self.assertEqual(self.conversation.summarized_turns, 0)
+
+class ConversationEndpointTestCase(unittest.TestCase):
+    """Test cases for chat turns against a server-side conversation"""
+    
+    def setUp(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.llm = mock.Mock()
+        self.llm.chat.completions.create.return_value = mock.Mock(
+            choices=[mock.Mock(message=mock.Mock(content='Thirty days.'))],
+            usage=mock.Mock(prompt_tokens=40, completion_tokens=3, total_tokens=43)
+        )
+        patcher = mock.patch('routers.chat.get_llm_client', return_value=self.llm)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_history_is_kept_server_side(self):
+        """Test that turns and token counts accumulate on the session"""
+        conversation_id = self.client.post('/api/chat/conversations').get_json()['conversation_id']
+        self.addCleanup(self.client.delete, f'/api/chat/conversations/{conversation_id}')
+        
+        for message in ('What is the notice period?', 'And for probation?'):
+            response = self.client.post('/api/chat/', json={
+                'conversation_id': conversation_id,
+                'message': message,
+                'messages': [{'role': 'user', 'content': 'ignored client history'}]
+            })
+            self.assertEqual(response.status_code, 200)
+        
+        sent = self.llm.chat.completions.create.call_args.kwargs['messages']
+        self.assertEqual([m['content'] for m in sent[1:]],
+                         ['What is the notice period?', 'Thirty days.', 'And for probation?'])
+        
+        session = self.client.get(f'/api/chat/conversations/{conversation_id}').get_json()
+        self.assertEqual(session['turns'], 4)
+        self.assertEqual(session['total_tokens'], 86)
+    
+    def test_failed_cache_lookup_leaves_no_unanswered_turn(self):
+        """Test that the user turn is removed when the answer cache fails"""
+        conversation_id = self.client.post('/api/chat/conversations').get_json()['conversation_id']
+        self.addCleanup(self.client.delete, f'/api/chat/conversations/{conversation_id}')
+        answer_cache = mock.Mock()
+        answer_cache.lookup.side_effect = RuntimeError('embedding failed')
+        
+        with mock.patch('routers.chat.get_answer_cache', return_value=answer_cache):
+            for path in ('/api/chat/', '/api/chat/stream'):
+                response = self.client.post(path, json={'conversation_id': conversation_id, 'message': 'Hi'})
+                self.assertEqual(response.status_code, 500)
+        
+        session = self.client.get(f'/api/chat/conversations/{conversation_id}').get_json()
+        self.assertEqual(session['turns'], 0)
+    
+    def test_other_users_conversation_is_404(self):
+        """Test that a conversation can only be read, extended or deleted by its owner"""
+        owner = {'X-User-Id': '1'}
+        conversation_id = self.client.post('/api/chat/conversations', headers=owner).get_json()['conversation_id']
+        self.addCleanup(self.client.delete, f'/api/chat/conversations/{conversation_id}', headers=owner)
+        
+        for headers in ({'X-User-Id': '2'}, {}):
+            self.assertEqual(self.client.get(f'/api/chat/conversations/{conversation_id}', headers=headers).status_code, 404)
+            response = self.client.post('/api/chat/', headers=headers, json={'conversation_id': conversation_id, 'message': 'Hi'})
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(self.client.delete(f'/api/chat/conversations/{conversation_id}', headers=headers).status_code, 404)
+        
+        session = self.client.get(f'/api/chat/conversations/{conversation_id}', headers=owner).get_json()
+        self.assertEqual(session['turns'], 0)
+    
+    def test_unknown_conversation_is_404(self):
+        """Test that a missing session is reported, not silently recreated"""
+        response = self.client.post('/api/chat/', json={'conversation_id': 'missing', 'message': 'Hi'})
+        self.assertEqual(response.status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,397 @@
+import unittest
+import tempfile
+import time
+import shutil
+from pathlib import Path
+from unittest import mock
+
+from flask import request
+
+from app import create_app
+from config import Config
+from routers.chat import chat_stream
+from services import llm
+from services.answer_cache import SemanticAnswerCache
+from services.generator import ContractGenerator, get_generator, split_sections
+from services.streaming import CompletionStream, TextStream
+
+class LLMClientTestCase(unittest.TestCase):
+    """Test cases for the shared, pooled OpenAI client"""
+    
+    def tearDown(self):
+        llm.reset_llm_client()
+    
+    def test_no_client_without_api_key(self):
+        """Test that callers fall back when no API key is configured"""
+        with mock.patch.object(Config, 'OPENAI_API_KEY', ''):
+            self.assertIsNone(llm.get_llm_client())
+    
+    def test_client_is_shared_and_pooled(self):
+        """Test that every caller gets the same client and connection pool"""
+        with mock.patch.object(Config, 'OPENAI_API_KEY', 'sk-test'), \
+                mock.patch.object(Config, 'LLM_POOL_SIZE', 4):
+            client = llm.get_llm_client()
+            if client is None:
+                self.skipTest('openai SDK not installed')
+            self.assertIs(llm.get_llm_client(), client)
+            self.assertEqual(client._client._transport._pool._max_connections, 4)
+    
+    def test_client_is_recreated_after_fork(self):
+        """Test that a forked worker does not reuse the parent's client"""
+        with mock.patch.object(Config, 'OPENAI_API_KEY', 'sk-test'):
+            client = llm.get_llm_client()
+            if client is None:
+                self.skipTest('openai SDK not installed')
+            with mock.patch.object(llm.os, 'getpid', return_value=-1):
+                self.assertIsNot(llm.get_llm_client(), client)
+
+class GeneratorSingletonTestCase(unittest.TestCase):
+    """Test cases for the shared ContractGenerator"""
+    
+    def setUp(self):
+        for patcher in (mock.patch('services.generator._generator', None),
+                        mock.patch.object(Config, 'POLISH_CACHE_PATH', '')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def test_generator_is_shared(self):
+        """Test that routers reuse one generator instance"""
+        self.assertIs(get_generator(), get_generator())
+
+class PolishCacheTestCase(unittest.TestCase):
+    """Test cases for the content-addressed polish cache"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        with mock.patch.object(Config, 'POLISH_CACHE_PATH', str(Path(self.temp_dir) / 'polish.sqlite3')):
+            self.generator = ContractGenerator()
+        self.generator.client = mock.Mock()
+        self.generator.client.chat.completions.create.return_value = mock.Mock(
+            choices=[mock.Mock(message=mock.Mock(content='# Polished NDA'))]
+        )
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_identical_drafts_are_polished_once(self):
+        """Test that a repeated draft is served from the cache"""
+        for _ in range(2):
+            polished = self.generator._polish_with_llm('# NDA', 'NDA', 'IN')
+        
+        self.assertEqual(polished, '# Polished NDA')
+        self.assertEqual(self.generator.client.chat.completions.create.call_count, 1)
+        self.assertEqual(self.generator.polish_cache.stats()['hits'], 1)
+    
+    def test_different_drafts_are_polished_separately(self):
+        """Test that the cache key covers the rendered markdown"""
+        self.generator._polish_with_llm('# NDA', 'NDA', 'IN')
+        self.generator._polish_with_llm('# NDA v2', 'NDA', 'IN')
+        self.assertEqual(self.generator.client.chat.completions.create.call_count, 2)
+
+class SectionPolishTestCase(unittest.TestCase):
+    """Test cases for parallel, section-wise polishing"""
+    
+    CONTRACT = "# NDA\n\n**Date:** today\n\n## PARTIES\n- A\n- B\n\n## TERM\nTwo years.\n\n## FAILS\nKeep me.\n"
+    
+    def setUp(self):
+        with mock.patch.object(Config, 'POLISH_CACHE_PATH', ''):
+            self.generator = ContractGenerator()
+        self.generator.client = mock.Mock()
+        self.generator.client.chat.completions.create.side_effect = self._fake_completion
+    
+    def _fake_completion(self, messages, **kwargs):
+        section = messages[-1]['content'].split('Section:\n', 1)[1]
+        if '## FAILS' in section:
+            raise RuntimeError('upstream error')
+        time.sleep(0.2)
+        return mock.Mock(choices=[mock.Mock(message=mock.Mock(content=section.strip().upper()))])
+    
+    def test_split_sections_round_trips(self):
+        """Test that sections split at '##' headings rejoin to the original"""
+        sections = split_sections(self.CONTRACT)
+        self.assertEqual(len(sections), 4)
+        self.assertTrue(sections[1].startswith('## PARTIES'))
+        self.assertEqual(''.join(sections), self.CONTRACT)
+    
+    def test_sections_are_polished_in_parallel_and_in_order(self):
+        """Test ordering, per-section fallback and concurrent calls"""
+        started = time.perf_counter()
+        polished = self.generator._polish_with_llm(self.CONTRACT, 'NDA', 'IN')
+        elapsed = time.perf_counter() - started
+        
+        self.assertEqual(
+            polished,
+            "# NDA\n\n**DATE:** TODAY\n\n## PARTIES\n- A\n- B\n\n## TERM\nTWO YEARS.\n\n## FAILS\nKeep me.\n"
+        )
+        self.assertLess(elapsed, 0.5)
+    
+    def test_long_contracts_are_not_truncated(self):
+        """Test that text past the old 3000-character cut-off is still polished"""
+        contract = ''.join(f"## CLAUSE {i}\n{'word ' * 100}\n\n" for i in range(12))
+        self.assertGreater(len(contract), 3000)
+        polished = self.generator._polish_with_llm(contract, 'NDA', 'IN')
+        self.assertIn('## CLAUSE 11\nWORD', polished)
+    
+    def test_queued_sections_share_the_contract_deadline(self):
+        """Test that a section queued behind slow ones is skipped and the rest get only the time left"""
+        contract = "## ONE\na\n\n## TWO\nb\n\n## THREE\nc\n"
+        with mock.patch.object(Config, 'POLISH_WORKERS', 1), \
+                mock.patch.object(Config, 'POLISH_TIMEOUT', 0.3), \
+                mock.patch('builtins.print') as log:
+            polished = self.generator._polish_with_llm(contract, 'NDA', 'IN')
+        
+        self.assertTrue(polished.startswith('## ONE\nA\n'))
+        self.assertTrue(polished.endswith('## THREE\nc\n'))
+        create = self.generator.client.chat.completions.create
+        self.assertEqual(create.call_count, 2)
+        self.assertLessEqual(create.call_args.kwargs['timeout'], 0.15)
+        self.assertIn('timed out in the queue', str(log.call_args_list[-1]))
+    
+    def test_empty_reply_is_logged_as_such(self):
+        """Test that the skip reason names an empty reply rather than None"""
+        self.generator.client.chat.completions.create.side_effect = None
+        self.generator.client.chat.completions.create.return_value = mock.Mock(
+            choices=[mock.Mock(message=mock.Mock(content=''))]
+        )
+        with mock.patch('builtins.print') as log:
+            polished = self.generator._polish_with_llm("## TERM\nTwo years.\n", 'NDA', 'IN')
+        
+        self.assertEqual(polished, "## TERM\nTwo years.\n")
+        self.assertIn('skipped: empty reply', log.call_args.args[0])
+
+class _FakeStream:
+    """Streamed completion that records whether it was closed"""
+    
+    def __init__(self, deltas, usage=None):
+        self.deltas = deltas
+        self.usage = usage
+        self.closed = False
+    
+    def __iter__(self):
+        for delta in self.deltas:
+            yield mock.Mock(usage=None, choices=[mock.Mock(delta=mock.Mock(content=delta))])
+        if self.usage:
+            yield mock.Mock(usage=self.usage, choices=[])
+    
+    def close(self):
+        self.closed = True
+
+class StreamingTestCase(unittest.TestCase):
+    """Test cases for Server-Sent Event streaming of chat replies"""
+    
+    def setUp(self):
+        self.app = create_app()
+        self.client = self.app.test_client()
+        self.stream = _FakeStream(['Notice ', 'period ', 'is 30 days.'],
+                                  usage={'prompt_tokens': 12, 'completion_tokens': 5, 'total_tokens': 17})
+        self.llm = mock.Mock()
+        self.llm.chat.completions.create.return_value = self.stream
+        # Replies must come from the fake stream, not answers cached by earlier tests
+        answer_cache = mock.patch('routers.chat.get_answer_cache', return_value=None)
+        answer_cache.start()
+        self.addCleanup(answer_cache.stop)
+    
+    def test_completion_stream_collects_text_and_usage(self):
+        """Test that deltas are yielded in order and usage is kept"""
+        completion = CompletionStream(self.stream)
+        self.assertEqual(list(completion), ['Notice ', 'period ', 'is 30 days.'])
+        self.assertEqual(completion.usage['total_tokens'], 17)
+        self.assertTrue(self.stream.closed)
+    
+    def test_chat_stream_sends_tokens_then_done(self):
+        """Test the SSE framing of a streamed chat reply"""
+        with mock.patch('routers.chat.get_llm_client', return_value=self.llm):
+            response = self.client.post('/api/chat/stream', json={'message': 'notice period?'})
+            body = response.get_data(as_text=True)
+        
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(body.count('event: token'), 3)
+        self.assertTrue(body.rstrip().endswith('"total_tokens": 17}}'))
+        self.assertTrue(self.llm.chat.completions.create.call_args.kwargs['stream'])
+    
+    def test_client_disconnect_closes_upstream(self):
+        """Test that abandoning the response cancels the completion"""
+        with mock.patch('routers.chat.get_llm_client', return_value=self.llm):
+            response = self.client.post('/api/chat/stream', json={'message': 'notice period?'}, buffered=False)
+            self.assertIn(b'Notice', next(response.iter_encoded()))
+            response.close()
+        self.assertTrue(self.stream.closed)
+    
+    def test_closing_before_first_chunk_closes_upstream(self):
+        """Test that a response closed before it is iterated still releases the completion"""
+        with mock.patch('routers.chat.get_llm_client', return_value=self.llm), \
+                self.app.test_request_context('/api/chat/stream', method='POST', json={'message': 'notice period?'}):
+            response = chat_stream()
+            response.close()
+        self.assertTrue(self.stream.closed)
+    
+    def test_explain_stream_keeps_request_context(self):
+        """Test that the explain stream can still use the request while it is consumed"""
+        class _RequestStream(TextStream):
+            def __iter__(self):
+                yield request.path
+        
+        retrieval = mock.Mock()
+        retrieval.search.return_value = [{'section_code': '73'}]
+        generator = mock.Mock()
+        generator.stream_explanation.return_value = _RequestStream('')
+        with mock.patch('services.retrieval.get_retrieval', return_value=retrieval), \
+                mock.patch('services.generator.get_generator', return_value=generator):
+            body = self.client.post('/api/explain/stream', json={'text': 'breach'}).get_data(as_text=True)
+        
+        self.assertIn('"content": "/api/explain/stream"', body)
+        self.assertIn('"refs": ["73"]', body)
+
+class AnswerCacheTestCase(unittest.TestCase):
+    """Test cases for the semantic answer cache"""
+    
+    VECTORS = {
+        'what is gst': [1.0, 0.0, 0.0],
+        'what is the gst': [0.99, 0.1, 0.0],
+        'what is tds': [0.0, 1.0, 0.0]
+    }
+    
+    def setUp(self):
+        self.generation = 1
+        self.cache = SemanticAnswerCache(
+            embed=lambda question: self.VECTORS[question],
+            version=lambda: self.generation,
+            max_size=2,
+            threshold=0.95
+        )
+    
+    def test_near_identical_question_hits(self):
+        """Test that a paraphrase above the threshold reuses the answer"""
+        self.cache.store('chat', 'What is GST?', 'IN', 'A tax.')
+        self.assertEqual(self.cache.lookup('chat', 'what is the GST', 'IN'), 'A tax.')
+        self.assertIsNone(self.cache.lookup('chat', 'What is TDS?', 'IN'))
+        self.assertEqual(self.cache.stats()['hits'], 1)
+    
+    def test_scope_and_jurisdiction_must_match(self):
+        """Test that answers are not shared across scopes or jurisdictions"""
+        self.cache.store('chat', 'What is GST?', 'IN', 'A tax.')
+        self.assertIsNone(self.cache.lookup('chat', 'What is GST?', 'US'))
+        self.assertIsNone(self.cache.lookup('explain', 'What is GST?', 'IN'))
+    
+    def test_reindex_invalidates_answers(self):
+        """Test that a new index generation drops every entry"""
+        self.cache.store('chat', 'What is GST?', 'IN', 'A tax.')
+        self.generation = 2
+        self.assertIsNone(self.cache.lookup('chat', 'What is GST?', 'IN'))
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+    
+    def test_expiry_and_size_limit(self):
+        """Test that old and least recently used entries are dropped"""
+        self.cache.store('chat', 'What is GST?', 'IN', 'A tax.')
+        self.cache.store('chat', 'What is TDS?', 'IN', 'A deduction.')
+        self.cache.store('explain', 'What is TDS?', 'IN', 'Tax deducted at source.')
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.lookup('chat', 'What is GST?', 'IN'))
+        
+        self.cache.ttl = 0.01
+        self.cache.store('chat', 'What is GST?', 'IN', 'A tax.')
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.lookup('chat', 'What is GST?', 'IN'))
+    
+    def test_chat_serves_cached_answer(self):
+        """Test that a stand-alone chat question is answered from the cache"""
+        self.cache.store('chat', 'What is GST?', 'IN', 'A tax.')
+        client = mock.Mock()
+        with mock.patch('routers.chat.get_answer_cache', return_value=self.cache), \
+                mock.patch('routers.chat.get_llm_client', return_value=client):
+            response = create_app().test_client().post('/api/chat/', json={'message': 'what is the GST'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json['cached'])
+        self.assertEqual(response.json['message'], 'A tax.')
+        client.chat.completions.create.assert_not_called()
+
+class _UpstreamError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class LLMGatewayTestCase(unittest.TestCase):
+    """Test cases for the concurrency limits, retries and circuit breaker of LLM calls"""
+    
+    def setUp(self):
+        self.gateway = llm.LLMGateway(max_concurrency=1, queue_timeout=0.05, max_retries=2,
+                                      retry_backoff=0, breaker_threshold=2, breaker_reset=60)
+        self.client = mock.Mock()
+    
+    def test_rate_limit_is_retried(self):
+        """Test that a 429 is retried and the call then succeeds"""
+        self.client.chat.completions.create.side_effect = [_UpstreamError(429), 'reply']
+        self.assertEqual(self.gateway.chat_completion(self.client, model='m'), 'reply')
+        self.assertEqual(self.gateway.stats()['retries'], 1)
+        self.assertIn('timeout', self.client.chat.completions.create.call_args.kwargs)
+    
+    def test_client_errors_are_not_retried(self):
+        """Test that a 400 fails at once and does not count against the circuit"""
+        self.client.chat.completions.create.side_effect = _UpstreamError(400)
+        with self.assertRaises(_UpstreamError):
+            self.gateway.chat_completion(self.client, model='m')
+        self.assertEqual(self.client.chat.completions.create.call_count, 1)
+        self.assertEqual(self.gateway.state, 'closed')
+    
+    def test_circuit_opens_and_fails_fast(self):
+        """Test that repeated upstream failures open the circuit until a trial call succeeds"""
+        self.client.chat.completions.create.side_effect = _UpstreamError(503)
+        for _ in range(2):
+            with self.assertRaises(_UpstreamError):
+                self.gateway.chat_completion(self.client, model='m')
+        self.assertEqual(self.gateway.state, 'open')
+        
+        calls = self.client.chat.completions.create.call_count
+        with self.assertRaises(llm.LLMUnavailable):
+            self.gateway.chat_completion(self.client, model='m')
+        self.assertEqual(self.client.chat.completions.create.call_count, calls)
+        
+        self.gateway.breaker_reset = 0
+        self.client.chat.completions.create.side_effect = None
+        self.client.chat.completions.create.return_value = 'reply'
+        self.assertEqual(self.gateway.chat_completion(self.client, model='m'), 'reply')
+        self.assertEqual(self.gateway.state, 'closed')
+    
+    def test_stream_holds_its_slot_until_closed(self):
+        """Test that the queue deadline applies while a stream occupies the only slot"""
+        stream = _FakeStream(['a', 'b'])
+        self.client.chat.completions.create.return_value = stream
+        governed = self.gateway.chat_completion(self.client, model='m', stream=True)
+        with self.assertRaises(llm.LLMUnavailable):
+            self.gateway.chat_completion(self.client, model='m')
+        self.assertEqual(self.gateway.stats()['queue_timeouts'], 1)
+        
+        CompletionStream(governed).close()
+        self.assertTrue(stream.closed)
+        self.assertEqual(self.gateway.stats()['in_flight'], 0)
+    
+    def test_stream_failing_midway_counts_as_failure(self):
+        """Test that a stream that breaks while being read is recorded against the circuit"""
+        def broken():
+            yield 'a'
+            raise _UpstreamError(502)
+        
+        self.client.chat.completions.create.side_effect = lambda **kwargs: broken()
+        for _ in range(2):
+            governed = self.gateway.chat_completion(self.client, model='m', stream=True)
+            with self.assertRaises(_UpstreamError):
+                list(governed)
+        self.assertEqual(self.gateway.stats()['failures'], 2)
+        self.assertEqual(self.gateway.stats()['in_flight'], 0)
+        self.assertEqual(self.gateway.state, 'open')
+    
+    def test_explain_falls_back_when_circuit_is_open(self):
+        """Test that an open circuit sends explain straight to the non-LLM answer"""
+        with mock.patch.object(Config, 'POLISH_CACHE_PATH', ''):
+            generator = ContractGenerator()
+        with mock.patch.object(generator, 'client', self.client), \
+                mock.patch.object(self.gateway, '_opened_at', time.monotonic()), \
+                mock.patch('services.generator.get_llm_gateway', return_value=self.gateway), \
+                mock.patch('services.generator.get_answer_cache', return_value=None):
+            explanation = generator.explain_clause('notice period', context=[])
+        self.assertIn('notice period', explanation)
+        self.client.chat.completions.create.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,21 @@
+import csv
+import os
 import unittest
+import zlib
+from unittest import mock
 from app import create_app
+from config import Config
 from models.db import db, User
-from services.retrieval import KnowledgeRetrieval
+from services import retrieval as retrieval_module
+from services.retrieval import KnowledgeRetrieval, LexicalIndex
+from services.vector_store import NumpyVectorStore
+from services.embedding_artifacts import EmbeddingArtifact, artifact_dir, write_artifact
+from services.embedding_server import EmbeddingClient, EmbeddingServer, EmbeddingServerError
+from services.law_loader import LawFileError, LawSection, iter_law_file, join_passages
 import tempfile
 import shutil
+import threading
+import numpy as np
 from pathlib import Path
 
 class RetrievalTestCase(unittest.TestCase):
@@ -41,6 +53,397 @@ class RetrievalTestCase(unittest.TestCase):
                 self.assertIn('text', results[0])
                 self.assertIn('section_code', results[0])
 
+class LexicalIndexTestCase(unittest.TestCase):
+    """Test cases for the BM25 lexical index"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.index = LexicalIndex(Path(self.temp_dir) / 'lexical_index.json')
+        self.index.add('contract_73', 'Compensation for loss or damage caused by breach of contract',
+                       {'section_code': 'Section 73', 'act_name': 'Contract Act 1872', 'jurisdiction': 'IN'})
+        self.index.add('gst_22', 'Every supplier shall obtain GSTIN registration in the State',
+                       {'section_code': 'Section 22', 'act_name': 'CGST Act 2017', 'jurisdiction': 'IN'})
+        self.index.add('uk_73', 'Loss of right to object under the arbitration agreement',
+                       {'section_code': 'Section 73', 'act_name': 'Arbitration Act 1996', 'jurisdiction': 'UK'})
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_bm25_ranks_matching_terms(self):
+        """Test that rare query terms pick out the right section"""
+        results = self.index.search('GSTIN registration', jurisdiction='IN', limit=2)
+        self.assertEqual(results[0][0], 'gst_22')
+    
+    def test_citation_lookup_respects_jurisdiction(self):
+        """Test exact section citations resolve within the requested jurisdiction"""
+        results = self.index.search_citations('What does Section 73 say?', jurisdiction='IN')
+        self.assertEqual([doc_id for doc_id, _ in results], ['contract_73'])
+    
+    def test_remove_and_persist(self):
+        """Test removed documents stay gone after a save/load round trip"""
+        self.index.remove('gst_22')
+        self.index.save()
+        
+        reloaded = LexicalIndex(self.index.path)
+        self.assertTrue(reloaded.load())
+        self.assertEqual(len(reloaded), 2)
+        self.assertEqual(reloaded.search('GSTIN', limit=5), [])
+        self.assertEqual(len(reloaded.search_citations('section 73')), 2)
+
+class EmbeddingArtifactTestCase(unittest.TestCase):
+    """Test cases for precomputed embedding artifacts"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        write_artifact(Path(self.temp_dir), 'test-model', 'abc123', ['ipc_302_0'], ['hash-1'], [[0.6, 0.8]])
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_lookup_requires_matching_content_hash(self):
+        """Test that only unchanged sections reuse their precomputed embedding"""
+        artifact = EmbeddingArtifact.load(Path(self.temp_dir), 'test-model')
+        self.assertEqual(artifact.csv_hash, 'abc123')
+        self.assertAlmostEqual(artifact.lookup('ipc_302_0', 'hash-1')[1], 0.8, places=5)
+        self.assertIsNone(artifact.lookup('ipc_302_0', 'hash-2'))
+        self.assertIsNone(artifact.lookup('ipc_300_0', 'hash-1'))
+    
+    def test_other_model_is_ignored(self):
+        """Test that an artifact is never used for a different embedding model"""
+        self.assertIsNone(EmbeddingArtifact.load(Path(self.temp_dir), 'other-model'))
+    
+    def test_interrupted_overwrite_keeps_the_old_artifact(self):
+        """Test that a write dying before its manifest never pairs old ids with new vectors"""
+        with mock.patch('services.embedding_artifacts.json.dump', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                write_artifact(Path(self.temp_dir), 'test-model', 'def456', ['ipc_300_0'], ['hash-9'], [[1.0, 0.0]])
+        artifact = EmbeddingArtifact.load(Path(self.temp_dir), 'test-model')
+        self.assertEqual(artifact.csv_hash, 'abc123')
+        self.assertAlmostEqual(artifact.lookup('ipc_302_0', 'hash-1')[1], 0.8, places=5)
+        
+        write_artifact(Path(self.temp_dir), 'test-model', 'def456', ['ipc_300_0'], ['hash-9'], [[1.0, 0.0]])
+        artifact = EmbeddingArtifact.load(Path(self.temp_dir), 'test-model')
+        self.assertAlmostEqual(artifact.lookup('ipc_300_0', 'hash-9')[0], 1.0, places=5)
+        self.assertIsNone(artifact.lookup('ipc_302_0', 'hash-1'))
+        self.assertEqual(len(list(artifact_dir(Path(self.temp_dir), 'test-model').glob('*.npy'))), 1)
+
+class LawLoaderTestCase(unittest.TestCase):
+    """Test cases for the streaming law CSV loader"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def write_csv(self, content):
+        path = Path(self.temp_dir) / 'test_act.csv'
+        path.write_text(content, encoding='utf-8')
+        return path
+    
+    def test_rows_become_typed_sections(self):
+        """Test defaults for missing columns, skipped empty rows and repeated section ids"""
+        path = self.write_csv(
+            'title,section_code,text\n'
+            'Murder,Section 302,"Whoever commits murder, shall be punished."\n'
+            'Blank,Section 303,\n'
+            'Murder,Section 302,Second row with the same code\n'
+        )
+        sections = list(iter_law_file(path))
+        
+        self.assertEqual([s.id for s in sections], ['test_act_Section 302_0', 'test_act_Section 302_1'])
+        self.assertEqual(sections[0].jurisdiction, 'IN')
+        self.assertEqual(sections[0].text, 'Murder Whoever commits murder, shall be punished.')
+        self.assertEqual(sections[0].metadata()['content_hash'], sections[0].content_hash)
+    
+    def test_missing_text_column_rejects_file(self):
+        """Test that the header is validated before any row is yielded"""
+        path = self.write_csv('title,section_code\nMurder,Section 302\n')
+        with self.assertRaises(LawFileError):
+            list(iter_law_file(path))
+    
+    def test_long_section_splits_into_overlapping_passages(self):
+        """Test passage windows, their parent section metadata and reassembly"""
+        body = ' '.join(f'w{i}' for i in range(25))
+        section = LawSection('act_1_0', 'Title', 'Section 1', 'IN', 'Act', body, 'act.csv')
+        passages = section.passages(window=10, overlap=3)
+        
+        self.assertEqual([p.id for p in passages], ['act_1_0#0', 'act_1_0#1', 'act_1_0#2', 'act_1_0#3'])
+        self.assertEqual(passages[1].text, 'Title w7 w8 w9 w10 w11 w12 w13 w14 w15 w16')
+        self.assertEqual(passages[1].metadata()['section_id'], 'act_1_0')
+        self.assertEqual(join_passages([(p.start, p.body) for p in passages]), body)
+        self.assertEqual(section.passages(window=50, overlap=3), [section])
+
+class _CountingModel:
+    """Stand-in embedding model: one-hot on text length, counting encode calls"""
+    
+    def __init__(self):
+        self.calls = 0
+    
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        vectors = np.zeros((len(texts), 8), dtype=np.float32)
+        for i, text in enumerate(texts):
+            vectors[i, len(text) % 8] = 1.0
+        return vectors
+
+class _HashingModel:
+    """Stand-in embedding model: normalised bag of hashed words, counting encoded texts"""
+    
+    def __init__(self):
+        self.encoded = 0
+    
+    def encode(self, texts, **kwargs):
+        self.encoded += len(texts)
+        vectors = np.zeros((len(texts), 64), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[i, zlib.crc32(word.encode('utf-8')) % 64] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+class _IndexTestCase(unittest.TestCase):
+    """Builds a KnowledgeRetrieval over temporary law CSVs with the hashing model"""
+    
+    ROWS = [
+        ('Contract Act', '10', 'Valid contracts', 'All agreements are contracts if made by free consent of parties competent to contract'),
+        ('Contract Act', '73', 'Compensation for breach', 'When a contract has been broken the party who suffers is entitled to compensation'),
+        ('Contract Act', '74', 'Penalty clauses', ' '.join(f'penalty{i}' for i in range(20))),
+        ('Companies Act', '2', 'Definitions', 'In this Act unless the context otherwise requires a company means a company incorporated')
+    ]
+    
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.laws_path = self.temp_dir / 'laws'
+        self.laws_path.mkdir()
+        self.write_laws(self.ROWS)
+        self.model = _HashingModel()
+        patchers = [
+            mock.patch.multiple(
+                Config,
+                LAWS_DATA_PATH=self.laws_path,
+                VECTOR_DB_PATH=self.temp_dir / 'vector_store',
+                EMBEDDING_ARTIFACT_PATH=self.temp_dir / 'embeddings',
+                EMBEDDING_SERVER_SOCKET='',
+                VECTOR_BACKEND='numpy',
+                VECTOR_PARTITION_BY=[],
+                PASSAGE_WINDOW=8,
+                PASSAGE_OVERLAP=0,
+                INDEX_CHUNK_SIZE=512
+            ),
+            mock.patch('services.retrieval.load_embedding_model', return_value=self.model)
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def write_laws(self, rows):
+        with open(self.laws_path / 'acts.csv', 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['act_name', 'section_code', 'title', 'text'])
+            writer.writerows(rows)
+    
+    def indexed_ids(self, retrieval):
+        return set(retrieval._get_indexed_metadata())
+
+class IndexSyncTestCase(_IndexTestCase):
+    """Test cases for incremental index syncing against the law CSVs"""
+    
+    def test_unchanged_reindex_embeds_nothing(self):
+        """Test that a rebuild with no CSV changes re-embeds no sections"""
+        retrieval = KnowledgeRetrieval()
+        ids = self.indexed_ids(retrieval)
+        self.model.encoded = 0
+        
+        stats = retrieval.reindex()
+        
+        self.assertEqual(self.model.encoded, 0)
+        self.assertEqual((stats['added'], stats['updated'], stats['deleted']), (0, 0, 0))
+        self.assertEqual(self.indexed_ids(retrieval), ids)
+    
+    def test_one_row_edit_embeds_only_that_section(self):
+        """Test that editing one row re-embeds it and deletes only its stale passages"""
+        retrieval = KnowledgeRetrieval()
+        before = self.indexed_ids(retrieval)
+        stale = {doc_id for doc_id in before if doc_id.startswith('Contract Act_74_0#')}
+        self.assertGreater(len(stale), 1)
+        self.model.encoded = 0
+        
+        rows = list(self.ROWS)
+        rows[2] = ('Contract Act', '74', 'Penalty clauses', 'Reasonable compensation not exceeding the penalty stipulated')
+        self.write_laws(rows)
+        stats = retrieval.reindex()
+        
+        self.assertEqual(self.model.encoded, 1)
+        self.assertEqual(stats['deleted'], len(stale))
+        self.assertEqual(self.indexed_ids(retrieval), (before - stale) | {'Contract Act_74_0'})
+    
+    def test_unforced_reindex_syncs_the_live_index(self):
+        """Test that reindex(force=False) applies CSV edits in place and reports them"""
+        retrieval = KnowledgeRetrieval()
+        index_path = retrieval.index_path
+        
+        self.write_laws(self.ROWS[:-1])
+        stats = retrieval.reindex(force=False)
+        
+        self.assertGreater(stats['deleted'], 0)
+        self.assertEqual(retrieval.index_path, index_path)
+        self.assertFalse(any(doc_id.startswith('Companies Act_') for doc_id in self.indexed_ids(retrieval)))
+    
+    def test_manual_section_survives_forced_rebuild(self):
+        """Test that sections added through add_section() are kept by a rebuild"""
+        retrieval = KnowledgeRetrieval()
+        retrieval.add_section('Arbitration', '7', 'An arbitration agreement shall be in writing', act_name='Arbitration Act')
+        removed = {doc_id for doc_id in self.indexed_ids(retrieval) if doc_id.startswith('Companies Act_')}
+        
+        self.write_laws(self.ROWS[:-1])
+        stats = retrieval.reindex(force=True)
+        
+        self.assertEqual(stats['deleted'], len(removed))
+        ids = self.indexed_ids(retrieval)
+        self.assertIn('Arbitration Act_7', ids)
+        self.assertFalse(ids & removed)
+        self.assertEqual(retrieval.search('arbitration agreement writing', mode='lexical')[0]['id'], 'Arbitration Act_7')
+
+    def test_build_writes_in_bounded_chunks(self):
+        """Test that a corpus larger than INDEX_CHUNK_SIZE is embedded and upserted chunk by chunk"""
+        update = retrieval_module._IndexProgress.update
+        upsert = NumpyVectorStore.upsert
+        with mock.patch.object(Config, 'INDEX_CHUNK_SIZE', 2), \
+                mock.patch.object(retrieval_module._IndexProgress, 'update', autospec=True, side_effect=update) as progress, \
+                mock.patch.object(NumpyVectorStore, 'upsert', autospec=True, side_effect=upsert) as upserts:
+            retrieval = KnowledgeRetrieval()
+        
+        # Sections of 2, 2, 3 and 2 passages: each flush happens once a chunk is full
+        self.assertEqual(retrieval.collection.count(), 9)
+        self.assertEqual(self.model.encoded, 9)
+        self.assertEqual([len(c.kwargs['ids']) for c in upserts.call_args_list], [2, 2, 3, 2])
+        self.assertEqual([c.args[1] for c in progress.call_args_list], [2, 2, 3, 2])
+        self.assertEqual(retrieval.index_stats['added'], 9)
+
+class RetrievalCacheTestCase(_IndexTestCase):
+    """Test cases for the query embedding and search result caches"""
+    
+    def test_writes_invalidate_cached_results(self):
+        """Test that add_section() and reindex() bump the generation and miss the result cache"""
+        retrieval = KnowledgeRetrieval()
+        query = 'compensation for breach of contract'
+        retrieval.search(query, mode='dense')
+        retrieval.search(query, mode='dense')
+        stats = retrieval.cache_stats()
+        self.assertEqual((stats['results']['hits'], stats['results']['misses']), (1, 1))
+        self.assertEqual((stats['embeddings']['hits'], stats['embeddings']['misses']), (0, 1))
+        
+        retrieval.add_section('Breach', '75', 'Compensation for breach of contract on rescission', act_name='Contract Act')
+        self.assertEqual(retrieval.cache_stats()['generation'], 1)
+        results = retrieval.search(query, mode='dense')
+        self.assertIn('Contract Act_75', [section['id'] for section in results])
+        
+        retrieval.reindex()
+        retrieval.search(query, mode='dense')
+        stats = retrieval.cache_stats()
+        self.assertEqual(stats['generation'], 2)
+        self.assertEqual((stats['results']['hits'], stats['results']['misses']), (1, 3))
+        # The query embedding does not depend on the index, so it stays cached
+        self.assertEqual(stats['embeddings']['hits'], 2)
+
+class BatchSearchTestCase(_IndexTestCase):
+    """Test cases for batched retrieval and /api/explain/batch"""
+    
+    QUERIES = ['company incorporated definitions', 'compensation when a contract is broken', 'free consent of parties']
+    
+    def test_results_follow_query_order_with_one_dense_query(self):
+        """Test that search_many embeds and queries once and keeps the query order"""
+        retrieval = KnowledgeRetrieval()
+        with mock.patch.object(retrieval.collection, 'query', wraps=retrieval.collection.query) as query:
+            results = retrieval.search_many(self.QUERIES, limit=1, mode='dense')
+        
+        query.assert_called_once()
+        self.assertEqual(len(query.call_args.kwargs['query_embeddings']), 3)
+        self.assertEqual([r[0]['section_code'] for r in results], ['2', '73', '10'])
+        retrieval._result_cache.clear()
+        self.assertEqual(results, [retrieval.search(q, limit=1, mode='dense') for q in self.QUERIES])
+    
+    def test_batch_endpoint(self):
+        """Test the batch endpoint's ordering and request validation"""
+        retrieval = KnowledgeRetrieval()
+        client = create_app().test_client()
+        with mock.patch('services.retrieval.get_retrieval', return_value=retrieval):
+            response = client.post('/api/explain/batch', json={'queries': self.QUERIES, 'limit': 1})
+            self.assertEqual(response.status_code, 200)
+            results = response.get_json()['results']
+            self.assertEqual([r['query'] for r in results], self.QUERIES)
+            self.assertEqual([r['refs'] for r in results], [['2'], ['73'], ['10']])
+            
+            for body in ({'queries': []}, {'queries': ['q'] * 51}, {'queries': ['q'], 'limit': 0}, {}):
+                self.assertEqual(client.post('/api/explain/batch', json=body).status_code, 400)
+
+@unittest.skipIf(EmbeddingServer is None, "Unix sockets not available")
+class EmbeddingServerTestCase(unittest.TestCase):
+    """Test cases for the shared embedding server"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.socket_path = str(Path(self.temp_dir) / 'embeddings.sock')
+        self.model = _CountingModel()
+        self.server = EmbeddingServer(self.socket_path, self.model, 'test-model', max_wait=0.05)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_concurrent_requests_are_coalesced(self):
+        """Test that requests from several clients share model calls and get their own rows"""
+        results = {}
+        
+        def encode(i):
+            results[i] = EmbeddingClient(self.socket_path, 'test-model').encode(['a' * i, 'bb'])
+        
+        threads = [threading.Thread(target=encode, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertLess(self.model.calls, 8)
+        for i, vectors in results.items():
+            self.assertEqual(vectors.shape, (2, 8))
+            self.assertEqual(vectors[0, i % 8], 1.0)
+            self.assertEqual(vectors[1, 2], 1.0)
+    
+    def test_unreachable_server_raises_and_backs_off(self):
+        """Test that callers get EmbeddingServerError so they can encode in-process"""
+        client = EmbeddingClient(str(Path(self.temp_dir) / 'missing.sock'), 'test-model')
+        with self.assertRaises(EmbeddingServerError):
+            client.encode(['text'])
+        self.assertFalse(client.available())
+    
+    @unittest.skipUnless(hasattr(os, 'fork'), "fork not available")
+    def test_forked_process_opens_its_own_connection(self):
+        """Test that a worker forked after an encode does not share the parent's socket"""
+        client = EmbeddingClient(self.socket_path, 'test-model')
+        client.encode(['a'])
+        parent_sock = client._local.sock
+        
+        pid = os.fork()
+        if pid == 0:
+            try:
+                vectors = client.encode(['bb'])
+                ok = client._local.sock is not parent_sock and vectors[0, 2] == 1.0
+            except Exception:
+                ok = False
+            os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+        
+        self.assertEqual(os.WEXITSTATUS(status), 0)
+        self.assertEqual(client.encode(['ccc'])[0, 3], 1.0)
+        self.assertIs(client._local.sock, parent_sock)
+
 if __name__ == '__main__':
     unittest.main()
 
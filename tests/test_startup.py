@@ -0,0 +1,79 @@
+import gc
+import unittest
+from unittest import mock
+
+from app import create_app
+from config import Config
+from services import retrieval, startup
+from services.startup import StartupProfile
+from services.pdf_styles import pdf_styles
+
+class StartupProfileTestCase(unittest.TestCase):
+    """Test cases for the startup profiler"""
+    
+    def test_records_phases_and_imports(self):
+        """Test that phases are timed and new imports are recorded"""
+        profile = StartupProfile()
+        profile.enable()
+        try:
+            with profile.phase('imports'):
+                import xml.dom.minidom  # noqa: F401
+        finally:
+            profile.stop_import_timing()
+        
+        report = profile.report()
+        self.assertIn('imports', report['phases_ms'])
+        self.assertGreater(report['modules_loaded'], 0)
+    
+    def test_disabled_profile_records_nothing(self):
+        """Test that phases are not recorded unless profiling is enabled"""
+        profile = StartupProfile()
+        with profile.phase('ignored'):
+            pass
+        self.assertEqual(profile.phases, [])
+
+class WarmupTestCase(unittest.TestCase):
+    """Test cases for the pre-fork warmup"""
+    
+    def test_warmup_runs_every_step(self):
+        """Test that warmup loads the model, index, templates, rules and PDF styles without failing"""
+        app = create_app()
+        with mock.patch.object(Config, 'VECTOR_BACKEND', 'numpy'), \
+                mock.patch.object(startup, '_warm_embedding_model') as warm_model, \
+                mock.patch.object(startup, '_warm_retrieval') as warm_retrieval:
+            timings = startup.warmup(app, freeze=False)
+        
+        warm_model.assert_called_once()
+        warm_retrieval.assert_called_once()
+        self.assertEqual(set(timings), {'embedding model', 'retrieval', 'page templates', 'contract templates', 'compliance rules', 'pdf styles'})
+        self.assertIs(pdf_styles(), pdf_styles())
+    
+    def test_chroma_is_not_opened_before_fork(self):
+        """Test that with Chroma only the embedding model is loaded pre-fork, and reused afterwards"""
+        model = mock.Mock()
+        retrieval.load_embedding_model.cache_clear()
+        self.addCleanup(retrieval.load_embedding_model.cache_clear)
+        with mock.patch.object(Config, 'VECTOR_BACKEND', 'chroma'), \
+                mock.patch.object(Config, 'EMBEDDING_SERVER_SOCKET', ''), \
+                mock.patch('sentence_transformers.SentenceTransformer', return_value=model) as load, \
+                mock.patch.object(startup, '_warm_retrieval') as warm_retrieval:
+            timings = startup.warmup(freeze=False)
+            self.assertIs(retrieval.load_embedding_model(Config.EMBEDDING_MODEL), model)
+        
+        warm_retrieval.assert_not_called()
+        self.assertNotIn('retrieval', timings)
+        load.assert_called_once()
+        model.encode.assert_called_once()
+    
+    def test_warmup_freezes_the_heap(self):
+        """Test that warmup moves loaded objects into the permanent generation"""
+        with mock.patch.object(startup, '_warm_embedding_model'), \
+                mock.patch.object(startup, '_warm_retrieval'):
+            startup.warmup()
+        try:
+            self.assertGreater(gc.get_freeze_count(), 0)
+        finally:
+            gc.unfreeze()
+
+if __name__ == '__main__':
+    unittest.main()
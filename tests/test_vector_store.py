@@ -0,0 +1,144 @@
+import unittest
+import tempfile
+import shutil
+from pathlib import Path
+from unittest import mock
+from services.vector_store import IndexGenerations, NumpyVectorStore, create_vector_store
+
+class NumpyVectorStoreTestCase(unittest.TestCase):
+    """Test cases for the memory-mapped NumPy vector backend"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = Path(self.temp_dir) / 'numpy'
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def _populate(self, store):
+        store.upsert(
+            ids=['in_1', 'in_2', 'uk_1'],
+            embeddings=[[1.0, 0.0, 0.0], [0.6, 0.8, 0.0], [0.9, 0.1, 0.0]],
+            documents=['first', 'second', 'third'],
+            metadatas=[{'jurisdiction': 'IN'}, {'jurisdiction': 'IN'}, {'jurisdiction': 'UK'}]
+        )
+    
+    def test_query_ranks_by_cosine_and_filters(self):
+        """Test top-k ordering and metadata filtering"""
+        store = NumpyVectorStore(self.path)
+        self._populate(store)
+        
+        results = store.query(query_embeddings=[[1.0, 0.0, 0.0]], n_results=2)
+        self.assertEqual(results['ids'][0], ['in_1', 'uk_1'])
+        self.assertAlmostEqual(results['distances'][0][0], 0.0, places=5)
+        
+        filtered = store.query(query_embeddings=[[1.0, 0.0, 0.0]], n_results=5, where={'jurisdiction': 'IN'})
+        self.assertEqual(filtered['ids'][0], ['in_1', 'in_2'])
+    
+    def test_writes_persist_across_reopen(self):
+        """Test upserts and deletes are visible to a freshly opened store"""
+        store = NumpyVectorStore(self.path)
+        self._populate(store)
+        store.upsert(ids=['in_2'], embeddings=[[0.0, 0.0, 1.0]], documents=['changed'],
+                     metadatas=[{'jurisdiction': 'IN'}])
+        store.delete(ids=['uk_1'])
+        
+        reopened = NumpyVectorStore(self.path)
+        self.assertEqual(reopened.count(), 2)
+        self.assertEqual(reopened.get(ids=['in_2'])['documents'], ['changed'])
+        results = reopened.query(query_embeddings=[[0.0, 0.0, 1.0]], n_results=1)
+        self.assertEqual(results['ids'][0], ['in_2'])
+    
+    def test_int8_quantization_keeps_ranking(self):
+        """Test that int8-quantised embeddings rank like float32"""
+        store = NumpyVectorStore(self.path, quantize='int8')
+        self._populate(store)
+        
+        results = store.query(query_embeddings=[[0.6, 0.8, 0.0]], n_results=3)
+        self.assertEqual(results['ids'][0][0], 'in_2')
+        self.assertLess(results['distances'][0][0], 0.01)
+
+class PartitionedVectorStoreTestCase(unittest.TestCase):
+    """Test cases for jurisdiction-partitioned indexes"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = create_vector_store(Path(self.temp_dir), backend='numpy', partition_by=['jurisdiction'])
+        self.store.upsert(
+            ids=['in_1', 'uk_1', 'us_1'],
+            embeddings=[[1.0, 0.0], [0.9, 0.1], [0.8, 0.2]],
+            documents=['india', 'england', 'united states'],
+            metadatas=[{'jurisdiction': 'IN'}, {'jurisdiction': 'UK'}, {'jurisdiction': 'US'}]
+        )
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_filtered_query_scans_one_partition(self):
+        """Test that a jurisdiction filter only returns that partition's documents"""
+        results = self.store.query(query_embeddings=[[1.0, 0.0]], n_results=5, where={'jurisdiction': 'UK'})
+        self.assertEqual(results['ids'][0], ['uk_1'])
+        self.assertEqual(len(self.store.partitions), 3)
+    
+    def test_unfiltered_query_merges_partitions(self):
+        """Test that cross-jurisdiction search fans out and merges by distance"""
+        results = self.store.query(query_embeddings=[[1.0, 0.0]], n_results=2)
+        self.assertEqual(results['ids'][0], ['in_1', 'uk_1'])
+    
+    def test_changed_jurisdiction_moves_document(self):
+        """Test that re-upserting with a new jurisdiction leaves no stale copy behind"""
+        self.store.upsert(ids=['uk_1'], embeddings=[[0.9, 0.1]], documents=['moved'],
+                          metadatas=[{'jurisdiction': 'IN'}])
+        
+        self.assertEqual(self.store.count(), 3)
+        uk = self.store.query(query_embeddings=[[1.0, 0.0]], n_results=5, where={'jurisdiction': 'UK'})
+        self.assertEqual(uk['ids'][0], [])
+
+    def test_unpartitioned_index_is_reported(self):
+        """Test that switching an existing single index to partitions warns instead of silently ignoring it"""
+        path = Path(self.temp_dir) / 'existing'
+        create_vector_store(path, backend='numpy').upsert(
+            ids=['in_1'], embeddings=[[1.0, 0.0]], documents=['india'], metadatas=[{'jurisdiction': 'IN'}]
+        )
+        with mock.patch('builtins.print') as printed:
+            store = create_vector_store(path, backend='numpy', partition_by=['jurisdiction'])
+        self.assertIn('unpartitioned index', printed.call_args.args[0])
+        
+        store.upsert(ids=['in_1'], embeddings=[[1.0, 0.0]], documents=['india'], metadatas=[{'jurisdiction': 'IN'}])
+        with mock.patch('builtins.print') as printed:
+            create_vector_store(path, backend='numpy', partition_by=['jurisdiction'])
+        printed.assert_not_called()
+
+class IndexGenerationsTestCase(unittest.TestCase):
+    """Test cases for blue/green index generations"""
+    
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.generations = IndexGenerations(Path(self.temp_dir))
+    
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    
+    def test_root_is_active_until_a_generation_is_promoted(self):
+        """Test that indexes built before generations keep working"""
+        self.assertEqual(self.generations.active_path(), Path(self.temp_dir))
+        with self.assertRaises(ValueError):
+            self.generations.rollback()
+    
+    def test_promote_rollback_and_prune(self):
+        """Test the pointer swap, rollback to the previous generation and pruning"""
+        first = self.generations.create()
+        self.generations.promote(first)
+        second = self.generations.create()
+        self.generations.promote(second)
+        third = self.generations.create()
+        self.generations.promote(third)
+        self.generations.prune()
+        
+        self.assertEqual(self.generations.active_path(), self.generations.path(third))
+        self.assertFalse(self.generations.path(first).exists())
+        self.assertEqual(self.generations.rollback(), second)
+        self.assertEqual(self.generations.state()['previous'], third)
+
+if __name__ == '__main__':
+    unittest.main()